@@ -3,6 +3,7 @@ from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import StreamingResponse, JSONResponse, RedirectResponse, HTMLResponse
 from fastapi.staticfiles import StaticFiles
 import io, json
+from itertools import chain
 from . import redact
 
 app = FastAPI(title="File Redaction Hackathon")
@@ -15,17 +16,24 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
-    expose_headers=["X-Redacted", "X-Regions-Count", "X-Phrases-Count", "X-First-Region", "Content-Disposition"],
+    expose_headers=["X-Redacted", "X-Regions-Count", "X-Phrases-Count", "X-First-Region", "X-Scan-Incomplete", "X-Redaction-Warning", "X-Page-Geometry", "Content-Disposition"],
 )
 
 
 @app.on_event("startup")
 def on_startup():
+    # memory-map the compiled deny/allow dictionaries (REDACT_DICTIONARY_DIR), if any
+    try:
+        redact.reload_dictionaries()
+    except Exception as e:
+        print(f"[app] dictionaries not loaded: {e}")
     print("[app] startup complete")
 
 
 @app.on_event("shutdown")
 def on_shutdown():
+    redact.shutdown_pdf_pools()
+    redact.shutdown_ocr()
     print("[app] shutdown")
 
 
@@ -34,8 +42,18 @@ def health():
     return JSONResponse({'status': 'ok'})
 
 
+@app.post('/dictionaries/reload')
+def dictionaries_reload():
+    """Re-open the server-side dictionaries now (other workers pick changes up on their own)."""
+    try:
+        return JSONResponse(redact.reload_dictionaries().summary())
+    except Exception as e:
+        return JSONResponse({'error': str(e)}, status_code=500)
+
+
 @app.post("/redact/image")
-async def redact_image(file: UploadFile = File(...), regions: str = Form(None), phrases: str = Form(None), mode: str = Form("blackout")):
+async def redact_image(file: UploadFile = File(...), regions: str = Form(None), phrases: str = Form(None), mode: str = Form("blackout"),
+                       format: str = Form(None), quality: int = Form(None), fast: bool = Form(None)):
     data = await file.read()
     regions_list = json.loads(regions) if regions else []
     phrases_list = json.loads(phrases) if phrases else []
@@ -43,7 +61,7 @@ async def redact_image(file: UploadFile = File(...), regions: str = Form(None),
     # If phrases provided, attempt to locate them via OCR (server-side) and add to regions
     try:
         if phrases_list:
-            # detect words/boxes in image using pytesseract (if available)
+            # detect words/boxes in image using OCR (if available)
             try:
                 matches = redact.detect_image_bytes(data)
                 if isinstance(matches, dict):
@@ -53,26 +71,46 @@ async def redact_image(file: UploadFile = File(...), regions: str = Form(None),
                         matches = matches.get('matches', [])
             except Exception:
                 matches = []
-            for ph in phrases_list:
-                if not ph: continue
-                for m in (matches or []):
-                    try:
-                        txt = (m.get('text') or '')
-                        if txt and ph.lower() in txt.lower():
-                            rect = m.get('rect')
-                            if rect and len(rect) == 4:
-                                regions_list.append(rect)
-                    except Exception:
-                        continue
+            # one case-insensitive pass over each detected text for all phrases
+            matcher = redact.PhraseMatcher(phrases_list, case_fold=True)
+            for m in (matches or []):
+                try:
+                    txt = (m.get('text') or '')
+                    if txt and matcher.search(txt):
+                        rect = m.get('rect')
+                        if rect and len(rect) == 4:
+                            regions_list.append(rect)
+                except Exception:
+                    continue
     except Exception:
         pass
-    out_bytes = redact.redact_image_bytes(data, regions_list, mode)
-    headers = {"Content-Disposition": f'attachment; filename="redacted-{file.filename}"'}
-    return StreamingResponse(io.BytesIO(out_bytes), media_type=file.content_type, headers=headers)
+    # format: keep (default) / png / jpeg / webp; metadata is stripped either way
+    if format and format != 'keep' and format not in redact.IMAGE_FORMATS:
+        return JSONResponse({'error': f"unknown format '{format}'", 'formats': ['keep'] + list(redact.IMAGE_FORMATS)}, status_code=400)
+    out_bytes = redact.redact_image_bytes(data, regions_list, mode, fmt=format, quality=quality, fast=fast)
+    return _image_response(out_bytes, file.filename)
+
+
+_IMAGE_EXTS = {'png': ('.png',), 'jpeg': ('.jpg', '.jpeg'), 'webp': ('.webp',)}
+
+
+def _image_response(out, filename, headers=None):
+    # label the image by what was written, and fix the extension if the format changed
+    fmt = redact.sniff_image_format(out) or 'png'
+    if not filename.lower().endswith(_IMAGE_EXTS[fmt]):
+        filename = filename.rsplit('.', 1)[0] + _IMAGE_EXTS[fmt][0]
+    headers = dict(headers or {}, **{"Content-Disposition": f'attachment; filename="redacted-{filename}"'})
+    return StreamingResponse(io.BytesIO(out), media_type=redact.IMAGE_FORMATS[fmt], headers=headers)
 
 
 @app.post("/redact/pdf")
-async def redact_pdf(file: UploadFile = File(...), regions: str = Form(None), phrases: str = Form(None)):
+async def redact_pdf(file: UploadFile = File(...), regions: str = Form(None), phrases: str = Form(None), save_mode: str = Form(None),
+                     pages: str = Form(None), scope: str = Form(None)):
+    if save_mode and save_mode not in redact.PDF_REQUEST_SAVE_MODES:
+        return _save_mode_error(save_mode)
+    # scope=regions: automatic detection only on the pages that have explicit regions
+    if scope and scope not in ('all', 'regions'):
+        return JSONResponse({'error': f"unknown scope '{scope}' (expected all or regions)"}, status_code=400)
     try:
         data = await file.read()
         # log raw incoming form values for debug
@@ -80,65 +118,83 @@ async def redact_pdf(file: UploadFile = File(...), regions: str = Form(None), ph
         print(f"[redact_pdf] raw phrases_str={phrases}")
         regions_obj = json.loads(regions) if regions else []
         phrases_list = json.loads(phrases) if phrases else []
+    except Exception as e:
+        import traceback
+        tb = traceback.format_exc()
+        print(f"[redact_pdf] ERROR: {e}\n{tb}")
+        return JSONResponse({"error": str(e), "trace": tb}, status_code=500)
+    try:
+        # the document is parsed once; every stage below shares its pages and text
+        session = redact.PdfSession(data)
+    except Exception as e:
+        # not a readable PDF: hand the original back, as redact_pdf_bytes does
+        print(f"[redact_pdf] cannot open {file.filename}: {e}")
+        headers = {"Content-Disposition": f'attachment; filename="redacted-{file.filename}"', "X-Redacted": "false"}
+        return StreamingResponse(io.BytesIO(data), media_type="application/octet-stream", headers=headers)
+    with session:
+        try:
+            page_list = _page_list(pages, len(session))
+        except ValueError as e:
+            return JSONResponse({'error': str(e)}, status_code=400)
+        return _redact_pdf_session(session, file.filename, regions_obj, phrases_list, save_mode, page_list, scope == 'regions')
+
+
+def _save_mode_error(save_mode):
+    if save_mode == 'incremental':
+        msg = "save_mode 'incremental' keeps the unredacted original in the file and is not accepted"
+    else:
+        msg = f"unknown save_mode '{save_mode}'"
+    return JSONResponse({'error': msg, 'save_modes': list(redact.PDF_REQUEST_SAVE_MODES)}, status_code=400)
+
+
+def _revision_headers(out, data, headers):
+    # REDACT_PDF_SAVE_MODE=incremental: the original revision is still in the output
+    if redact.keeps_original_revision(out, data):
+        headers["X-Redacted"] = "false"
+        headers["X-Redaction-Warning"] = "incremental save: the unredacted original can be recovered from this file"
+    return headers
+
+
+def _page_list(pages, count):
+    # None (every page) or the pages picked by a `pages` form field: "0-3,7,10-" or a JSON list
+    return redact.parse_page_ranges(pages, count) if pages else None
+
+
+def _redact_pdf_session(session, filename, regions_obj, phrases_list, save_mode=None, pages=None, regions_only=False):
+    data = session.data
+    try:
         # If phrases provided, search PDF pages for those phrases and add to regions
         if phrases_list:
             try:
-                doc = redact.fitz.open(stream=data, filetype='pdf')
-                for pno in range(len(doc)):
-                    page = doc.load_page(pno)
-                    for ph in phrases_list:
+                # find which phrases occur on a page in one pass over its text (search_for
+                # ignores case and line breaks, so the matcher does too); only those are located
+                matcher = redact.PhraseMatcher(phrases_list, case_fold=True, normalize_space=True)
+                for pno in (range(len(session)) if pages is None else pages):
+                    page = session.page(pno)
+                    on_page = matcher.found(session.text(pno))
+                    for ph in [p for p in phrases_list if isinstance(p, str) and p in on_page]:
                             try:
                                 found_any = False
                                 # try direct search first
                                 try:
                                     areas = page.search_for(ph)
                                     for r in areas:
-                                        regions_obj.append({"page": pno, "rect": [r.x0, r.y0, r.x1, r.y1]})
+                                        regions_obj.append({"page": pno, "rect": [r.x0, r.y0, r.x1, r.y1], "text": True})
                                         found_any = True
                                 except Exception:
                                     pass
                                 if not found_any:
-                                    # fallback: match using word boxes (case-insensitive)
+                                    # fallback: the page's word index (case-insensitive, ignores punctuation)
                                     try:
-                                        words = page.get_text("words")  # list of tuples: x0,y0,x1,y1,word
-                                        import re as _re
-                                        # normalize phrase
-                                        phrase_norm = _re.sub(r"\s+", " ", _re.sub(r"[^\w\s]", " ", ph)).strip().lower()
-                                        if words and phrase_norm:
-                                            # build list of normalized words
-                                            norm_words = [_re.sub(r"[^\w]", "", w[4]).lower() for w in words]
-                                            pw = [pw for pw in phrase_norm.split() if pw]
-                                            plen = len(pw)
-                                            if plen == 0:
-                                                pass
-                                            else:
-                                                for i in range(0, max(0, len(norm_words) - 0)):
-                                                    # build a window string from i to i+max_window
-                                                    for end in range(i + 1, min(len(norm_words), i + plen + 6) + 1):
-                                                        seq = norm_words[i:end]
-                                                        joined = " ".join(seq)
-                                                        if pw == seq or phrase_norm in joined or joined in phrase_norm:
-                                                            # compute bounding box across words i..end-1
-                                                            try:
-                                                                x0 = min(words[k][0] for k in range(i, end))
-                                                                y0 = min(words[k][1] for k in range(i, end))
-                                                                x1 = max(words[k][2] for k in range(i, end))
-                                                                y1 = max(words[k][3] for k in range(i, end))
-                                                                regions_obj.append({"page": pno, "rect": [x0, y0, x1, y1]})
-                                                                found_any = True
-                                                                break
-                                                            except Exception:
-                                                                continue
-                                                    if found_any:
-                                                        break
+                                        for rect in session.word_index(pno).rects(ph):
+                                            regions_obj.append({"page": pno, "rect": rect, "text": True})
                                     except Exception:
                                         pass
                             except Exception:
                                 continue
-                doc.close()
             except Exception:
                 pass
-        print(f"[redact_pdf] filename={file.filename} parsed_regions={regions_obj} phrases={phrases_list}")
+        print(f"[redact_pdf] filename={filename} parsed_regions={regions_obj} phrases={phrases_list}")
         # Normalize incoming regions format:
         # - If client sent a list of simple [x,y,w,h] arrays, convert to {page:0, rect:[x0,y0,x1,y1]}
         try:
@@ -148,34 +204,7 @@ async def redact_pdf(file: UploadFile = File(...), regions: str = Form(None), ph
                 if isinstance(regions_obj[0], list) and (len(regions_obj[0]) >= 4) and not isinstance(regions_obj[0][0], dict):
                     try:
                         # convert canvas pixel boxes into per-page PDF rects assuming preview used zoom=2.0
-                        zoom = 2.0
-                        import fitz as _fitz
-                        _doc = _fitz.open(stream=data, filetype='pdf')
-                        page_pix_heights = []
-                        for pno in range(len(_doc)):
-                            pg = _doc.load_page(pno)
-                            pix = pg.get_pixmap(matrix=_fitz.Matrix(zoom, zoom))
-                            page_pix_heights.append(pix.height)
-                        # cumulative heights to locate page by y coordinate
-                        cum = [0]
-                        for hgt in page_pix_heights:
-                            cum.append(cum[-1] + hgt)
-                        total_pages = len(page_pix_heights)
-                        for r in regions_obj:
-                            try:
-                                x = float(r[0]); y = float(r[1]); w = float(r[2]); h = float(r[3])
-                                # find page index by y coordinate
-                                pidx = 0
-                                for i in range(total_pages):
-                                    if y >= cum[i] and y < cum[i+1]:
-                                        pidx = i; break
-                                y_in_page = y - cum[pidx]
-                                x0 = x / zoom; y0 = y_in_page / zoom; x1 = (x + w) / zoom; y1 = (y_in_page + h) / zoom
-                                norm_regions.append({"page": pidx, "rect": [x0, y0, x1, y1]})
-                            except Exception:
-                                continue
-                        try: _doc.close()
-                        except Exception: pass
+                        norm_regions = redact.canvas_regions_to_pdf(session, regions_obj, zoom=2.0)
                     except Exception:
                         # fallback to naive conversion if anything fails
                         for r in regions_obj:
@@ -190,33 +219,38 @@ async def redact_pdf(file: UploadFile = File(...), regions: str = Form(None), ph
                         if isinstance(item, dict) and item.get('rect'):
                             norm_regions.append(item)
             regions_obj = norm_regions
+            if regions_only:
+                with_regions = {int(r.get('page', 0)) for r in regions_obj}
+                pages = sorted(with_regions if pages is None else with_regions.intersection(pages))
             # If still no regions, fallback to server-side detection
-            if not regions_obj:
-                detected = redact.detect_pdf_bytes(data)
+            if not regions_obj and pages != []:
+                detected = redact.detect_pdf_session(session, pages=pages)
                 if detected:
                     for pg in detected:
                         pno = pg.get('page', 0)
                         for m in (pg.get('matches') or []):
                             rect = m.get('rect')
                             if rect:
-                                regions_obj.append({"page": pno, "rect": rect})
+                                regions_obj.append({"page": pno, "rect": rect, "text": True})
                     print(f"[redact_pdf] auto-detected regions count={len(regions_obj)}")
         except Exception as e:
             print(f"[redact_pdf] normalize/detect fallback error: {e}")
-        out_bytes = redact.redact_pdf_bytes(data, regions_obj)
-        modified = (out_bytes != data)
+        out_bytes = redact.redact_pdf_session(session, regions_obj, save_mode=save_mode, pages=pages)
+        # the original object comes back when no page changed
+        modified = out_bytes is not data
         # expose debug headers: count of regions and first region JSON (if small)
         rcount = len(regions_obj) if regions_obj else 0
         pcount = len(phrases_list) if phrases_list else 0
         first_region = json.dumps(regions_obj[0]) if rcount>0 else ""
         headers = {
-            "Content-Disposition": f'attachment; filename="redacted-{file.filename}"',
+            "Content-Disposition": f'attachment; filename="redacted-{filename}"',
             "X-Redacted": ("true" if modified else "false"),
             "X-Regions-Count": str(rcount),
             "X-Phrases-Count": str(pcount),
             "X-First-Region": first_region
         }
-        print(f"[redact_pdf] filename={file.filename} modified={modified} regions_count={rcount} phrases_count={pcount}")
+        _revision_headers(out_bytes, data, headers)
+        print(f"[redact_pdf] filename={filename} modified={modified} regions_count={rcount} phrases_count={pcount}")
         # Return as octet-stream to encourage download in browsers
         return StreamingResponse(io.BytesIO(out_bytes), media_type="application/octet-stream", headers=headers)
     except Exception as e:
@@ -258,12 +292,73 @@ def home():
 async def preview_pdf(file: UploadFile = File(...)):
     data = await file.read()
     try:
-        out = redact.preview_pdf_first_page(data)
-        return StreamingResponse(io.BytesIO(out), media_type='image/png')
+        with redact.PdfSession(data) as session:
+            out = redact.preview_pdf_session(session)
+            geo = redact.pdf_page_geometry(session)
+        # where each page sits on the stacked canvas, so boxes drawn on it map back to pages
+        manifest = {'doc': geo['doc'], 'zoom': geo['zoom'],
+                    'offsets': [p['offset'] for p in geo['pages']], 'heights': [p['pixel_height'] for p in geo['pages']]}
+        headers = {'X-Page-Geometry': json.dumps(manifest, separators=(',', ':'))}
+        return StreamingResponse(io.BytesIO(out), media_type='image/png', headers=headers)
     except Exception as e:
         return JSONResponse({'error': str(e)}, status_code=500)
 
 
+@app.post('/preview/pdf/geometry')
+async def preview_pdf_geometry(file: UploadFile = File(...), zoom: float = Form(2.0)):
+    """Page-geometry manifest of the /preview/pdf canvas, without rendering anything."""
+    data = await file.read()
+    try:
+        with redact.PdfSession(data) as session:
+            return JSONResponse(redact.pdf_page_geometry(session, zoom))
+    except Exception as e:
+        return JSONResponse({'error': str(e)}, status_code=500)
+
+
+@app.post('/preview/pdf/pages')
+async def preview_pdf_pages(file: UploadFile = File(...), zoom: float = Form(2.0)):
+    """Register a PDF for paged preview: returns its id, page count and geometry; pages and
+    thumbnails are then fetched one by one from /preview/pdf/{doc}/pages|thumbs/{page}."""
+    data = await file.read()
+    if len(data) > redact.PREVIEW_DOCS_BYTES:
+        msg = f"document too large for the paged preview (limit {redact.PREVIEW_DOCS_BYTES // 2 ** 20} MB)"
+        return JSONResponse({'error': msg}, status_code=413)
+    try:
+        with redact.PdfSession(data) as session:
+            geo = redact.pdf_page_geometry(session, zoom)
+            redact.register_pdf_preview(session)
+        return JSONResponse(dict(geo, page_count=len(geo['pages']), formats=list(redact.PREVIEW_FORMATS)))
+    except Exception as e:
+        return JSONResponse({'error': str(e)}, status_code=500)
+
+
+def _preview_page_response(doc, page, fmt, quality, zoom=2.0, width=None):
+    fmt = 'jpeg' if fmt == 'jpg' else fmt
+    try:
+        out = redact.render_pdf_page(doc, page, zoom=zoom, fmt=fmt, quality=quality, width=width)
+    except KeyError:
+        return JSONResponse({'error': 'unknown document, upload it to /preview/pdf/pages again'}, status_code=404)
+    except IndexError as e:
+        return JSONResponse({'error': str(e)}, status_code=404)
+    except ValueError as e:
+        return JSONResponse({'error': str(e)}, status_code=400)
+    except Exception as e:
+        return JSONResponse({'error': str(e)}, status_code=500)
+    # the id is the content hash, so a rendered page never changes
+    headers = {'Cache-Control': 'private, max-age=86400, immutable'}
+    return StreamingResponse(io.BytesIO(out), media_type=redact.PREVIEW_FORMATS[fmt], headers=headers)
+
+
+@app.get('/preview/pdf/{doc}/pages/{page}')
+async def preview_pdf_page(doc: str, page: int, zoom: float = 2.0, format: str = 'png', quality: int = 80):
+    return _preview_page_response(doc, page, format, quality, zoom=zoom)
+
+
+@app.get('/preview/pdf/{doc}/thumbs/{page}')
+async def preview_pdf_thumb(doc: str, page: int, width: int = redact.PREVIEW_THUMB_WIDTH, format: str = 'jpeg', quality: int = 70):
+    return _preview_page_response(doc, page, format, quality, width=max(16, min(width, 1024)))
+
+
 @app.post('/preview/docx')
 async def preview_docx(file: UploadFile = File(...), format: str = Form(None)):
     data = await file.read()
@@ -293,26 +388,102 @@ async def preview_xlsx(file: UploadFile = File(...), format: str = Form(None), m
         return JSONResponse({'error': str(e)}, status_code=500)
 
 
+def _scan_plan(categories: str, profile: str):
+    # categories may be a JSON list or a comma-separated string
+    if categories:
+        try:
+            categories = json.loads(categories)
+        except Exception:
+            pass
+    return redact.resolve_scan_plan(categories, profile or None)
+
+
+def _scan_budget(seconds: float, limit: float):
+    # per-document CPU allowance (limit: None is unlimited, 0 allows nothing); a request may
+    # only lower it
+    if seconds is not None and seconds >= 0:
+        limit = seconds if limit is None else min(seconds, limit)
+    return redact.ScanBudget(limit) if limit is not None else None
+
+
+def _scan_headers(budget, headers=None):
+    headers = dict(headers or {})
+    if budget is not None and budget.exhausted:
+        print(f"[scan] budget of {budget.seconds}s spent, result is incomplete")
+        headers["X-Scan-Incomplete"] = "true"
+    return headers
+
+
+def _budget_error(budget):
+    # redaction never hands back a file whose scan stopped part-way: that would leak whatever
+    # was not reached, to any client that ignores X-Scan-Incomplete.  Large documents need a
+    # larger request `budget`, up to REDACT_AUTO_BUDGET_SECONDS
+    limit = redact.AUTO_REDACT_BUDGET_SECONDS
+    msg = (f"scan budget of {budget.seconds}s spent before detection finished; nothing was redacted. "
+           f"Retry with a larger budget (server limit: {'none' if limit is None else f'{limit}s'})")
+    return JSONResponse({'error': msg, 'incomplete': True}, status_code=422, headers=_scan_headers(budget))
+
+
+def _detect_response(res, budget):
+    # a partial result is flagged in a header, and in the body when it is an object
+    if isinstance(res, dict) and budget is not None and budget.exhausted:
+        res = dict(res, incomplete=True)
+    return JSONResponse(res, headers=_scan_headers(budget))
+
+
+async def _stream_matches(matches, budget):
+    # {"matches": [...], "incomplete": ...} written out as the scan yields; the scan runs on
+    # this thread (the budget counts its CPU time), one window per step
+    sep = ''
+    yield '{"matches": ['
+    for m in matches:
+        yield sep + json.dumps(m)
+        sep = ', '
+    yield '], "incomplete": %s}' % json.dumps(budget is not None and budget.exhausted)
+
+
 @app.post('/detect')
-async def detect(file: UploadFile = File(...)):
+async def detect(file: UploadFile = File(...), categories: str = Form(None), profile: str = Form(None), budget: float = Form(None), ocr: bool = Form(None),
+                 pages: str = Form(None)):
     try:
-        data = await file.read()
+        # optional category selection: JSON list / comma-separated names, or a named profile
+        try:
+            plan = _scan_plan(categories, profile)
+        except ValueError as e:
+            return JSONResponse({'error': str(e)}, status_code=400)
+        scan_budget = _scan_budget(budget, redact.SCAN_BUDGET_SECONDS)
         name = file.filename.lower()
+        if name.endswith('.txt'):
+            # plain-text exports can be huge: scan the upload as a stream and send matches as
+            # they are found.  Headers go out first, so X-Scan-Incomplete is only set when the
+            # budget ran out before the first match; the closing "incomplete" field is definitive
+            matches = redact.detect_text_file(file.file, plan=plan, budget=scan_budget)
+            first = next(matches, None)
+            if first is not None:
+                matches = chain((first,), matches)
+            return StreamingResponse(_stream_matches(matches, scan_budget), media_type='application/json',
+                                     headers=_scan_headers(scan_budget))
+        data = await file.read()
         if name.endswith('.pdf'):
-            res = redact.detect_pdf_bytes(data)
-            return JSONResponse(res)
+            with redact.PdfSession(data) as session:
+                try:
+                    page_list = _page_list(pages, len(session))
+                except ValueError as e:
+                    return JSONResponse({'error': str(e)}, status_code=400)
+                res = redact.detect_pdf_session(session, plan=plan, budget=scan_budget, ocr=ocr, pages=page_list)
+            return _detect_response(res, scan_budget)
         if name.endswith('.docx'):
-            res = redact.detect_docx_bytes(data)
-            return JSONResponse(res)
+            res = redact.detect_docx_bytes(data, plan=plan, budget=scan_budget)
+            return _detect_response(res, scan_budget)
         if name.endswith('.xlsx'):
-            res = redact.detect_xlsx_bytes(data)
-            return JSONResponse(res)
+            res = redact.detect_xlsx_bytes(data, plan=plan, budget=scan_budget)
+            return _detect_response(res, scan_budget)
         # image
-        res = redact.detect_image_bytes(data)
+        res = redact.detect_image_bytes(data, plan=plan, budget=scan_budget)
         # detect_image_bytes may return {'matches': [...], 'full_text': '...'} or an error dict
         if isinstance(res, dict) and ('matches' in res or 'error' in res):
-            return JSONResponse(res)
-        return JSONResponse({'matches': res})
+            return _detect_response(res, scan_budget)
+        return _detect_response({'matches': res}, scan_budget)
     except Exception as e:
         import traceback
         tb = traceback.format_exc()
@@ -321,7 +492,7 @@ async def detect(file: UploadFile = File(...)):
 
 
 @app.post('/extract')
-async def extract_text(file: UploadFile = File(...)):
+async def extract_text(file: UploadFile = File(...), pages: str = Form(None)):
     """Return extracted full text for a file (pdf, image, docx, xlsx) to populate the 'Redact more' panel."""
     try:
         data = await file.read()
@@ -329,15 +500,17 @@ async def extract_text(file: UploadFile = File(...)):
         if name.endswith('.pdf'):
             # concatenate page text
             try:
-                doc = redact.fitz.open(stream=data, filetype='pdf')
-                parts = []
-                for pno in range(len(doc)):
+                with redact.PdfSession(data) as session:
                     try:
-                        page = doc.load_page(pno)
-                        parts.append(page.get_text())
-                    except Exception:
-                        continue
-                doc.close()
+                        page_list = _page_list(pages, len(session))
+                    except ValueError as e:
+                        return JSONResponse({'error': str(e)}, status_code=400)
+                    parts = []
+                    for pno in (range(len(session)) if page_list is None else page_list):
+                        try:
+                            parts.append(session.text(pno))
+                        except Exception:
+                            continue
                 return JSONResponse({'full_text': '\n'.join(parts)})
             except Exception:
                 return JSONResponse({'full_text': ''})
@@ -367,13 +540,13 @@ async def extract_text(file: UploadFile = File(...)):
                 return JSONResponse({'full_text': '\n'.join(rows)})
             except Exception:
                 return JSONResponse({'full_text': ''})
-        # image: try server-side pytesseract if available, else return empty so client can fallback
+        # image: try server-side OCR if available, else return empty so client can fallback
         text = ''
         try:
-            if redact.pytesseract is not None:
+            if redact.ocr_available():
                 from PIL import Image
                 img = Image.open(io.BytesIO(data))
-                text = redact.pytesseract.image_to_string(img)
+                text = redact.ocr_text(img)
         except Exception:
             text = ''
         return JSONResponse({'full_text': text})
@@ -385,29 +558,44 @@ async def extract_text(file: UploadFile = File(...)):
 
 
 @app.post('/redact/auto')
-async def redact_auto(file: UploadFile = File(...), mode: str = Form('blackout')):
+async def redact_auto(file: UploadFile = File(...), mode: str = Form('blackout'), categories: str = Form(None), profile: str = Form(None), budget: float = Form(None), save_mode: str = Form(None), ocr: bool = Form(None)):
     """Detect and redact all sensitive data found in the uploaded file automatically."""
+    if save_mode and save_mode not in redact.PDF_REQUEST_SAVE_MODES:
+        return _save_mode_error(save_mode)
     try:
+        try:
+            plan = _scan_plan(categories, profile)
+        except ValueError as e:
+            return JSONResponse({'error': str(e)}, status_code=400)
+        scan_budget = _scan_budget(budget, redact.AUTO_REDACT_BUDGET_SECONDS)
         data = await file.read()
         name = file.filename.lower()
         # PDF: detect text matches and convert to regions, then redact
         if name.endswith('.pdf'):
-            detected = redact.detect_pdf_bytes(data)
-            regions = []
-            if detected:
-                for pg in detected:
-                    pno = pg.get('page', 0)
-                    for m in (pg.get('matches') or []):
-                        rect = m.get('rect')
-                        if rect:
-                            regions.append({"page": pno, "rect": rect})
-            out = redact.redact_pdf_bytes(data, regions)
-            headers = {"Content-Disposition": f'attachment; filename="redacted-{file.filename}"'}
+            session = redact.PdfSession(data)
+            with session:
+                # scanned pages are OCR-ed (unless ocr=false), so their text is redacted too
+                detected = redact.detect_pdf_session(session, plan=plan, budget=scan_budget, ocr=ocr)
+                if scan_budget is not None and scan_budget.exhausted:
+                    return _budget_error(scan_budget)
+                regions = []
+                if detected:
+                    for pg in detected:
+                        pno = pg.get('page', 0)
+                        for m in (pg.get('matches') or []):
+                            rect = m.get('rect')
+                            if rect:
+                                regions.append({"page": pno, "rect": rect, "text": True})
+                out = redact.redact_pdf_session(session, regions, save_mode=save_mode)
+            headers = _scan_headers(scan_budget, {"Content-Disposition": f'attachment; filename="redacted-{file.filename}"'})
+            _revision_headers(out, data, headers)
             return StreamingResponse(io.BytesIO(out), media_type='application/pdf', headers=headers)
         # DOCX: extract text, scan for sensitive phrases, and redact via redact_docx_bytes
         if name.endswith('.docx'):
             # Detect text and embedded image matches, then redact text phrases and selectively blur matching images
-            detected = redact.detect_docx_bytes(data)
+            detected = redact.detect_docx_bytes(data, plan=plan, budget=scan_budget)
+            if scan_budget is not None and scan_budget.exhausted:
+                return _budget_error(scan_budget)
             phrases = []
             for m in (detected.get('text_matches') or []):
                 if isinstance(m, dict):
@@ -426,11 +614,13 @@ async def redact_auto(file: UploadFile = File(...), mode: str = Form('blackout')
             # dedupe phrases
             phrases = [p for p in dict.fromkeys([p for p in phrases if p])]
             out = redact.redact_docx_bytes(data, phrases, media_to_blur=media_to_blur)
-            headers = {"Content-Disposition": f'attachment; filename="redacted-{file.filename}"'}
+            headers = _scan_headers(scan_budget, {"Content-Disposition": f'attachment; filename="redacted-{file.filename}"'})
             return StreamingResponse(io.BytesIO(out), media_type="application/vnd.openxmlformats-officedocument.wordprocessingml.document", headers=headers)
         # XLSX: scan sheet text for sensitive phrases and redact via redact_xlsx_bytes
         if name.endswith('.xlsx'):
-            detected = redact.detect_xlsx_bytes(data)
+            detected = redact.detect_xlsx_bytes(data, plan=plan, budget=scan_budget)
+            if scan_budget is not None and scan_budget.exhausted:
+                return _budget_error(scan_budget)
             phrases = []
             for item in (detected.get('text_matches') or []):
                 if isinstance(item, dict):
@@ -448,11 +638,13 @@ async def redact_auto(file: UploadFile = File(...), mode: str = Form('blackout')
             # dedupe
             phrases = [p for p in dict.fromkeys([p for p in phrases if p])]
             out = redact.redact_xlsx_bytes(data, cells=[], columns=[], rows=None, phrases=phrases, media_to_blur=media_to_blur)
-            headers = {"Content-Disposition": f'attachment; filename="redacted-{file.filename}"'}
+            headers = _scan_headers(scan_budget, {"Content-Disposition": f'attachment; filename="redacted-{file.filename}"'})
             return StreamingResponse(io.BytesIO(out), media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet", headers=headers)
         # Image: try server OCR to detect matches and redact by drawing boxes
-        if name.endswith('.png') or name.endswith('.jpg') or name.endswith('.jpeg') or name.endswith('.tiff') or name.endswith('.bmp'):
-            matches = redact.detect_image_bytes(data)
+        if name.endswith('.png') or name.endswith('.jpg') or name.endswith('.jpeg') or name.endswith('.webp') or name.endswith('.tiff') or name.endswith('.bmp'):
+            matches = redact.detect_image_bytes(data, plan=plan, budget=scan_budget)
+            if scan_budget is not None and scan_budget.exhausted:
+                return _budget_error(scan_budget)
             rects = []
             if isinstance(matches, dict):
                 matches = matches.get('matches', [])
@@ -466,8 +658,7 @@ async def redact_auto(file: UploadFile = File(...), mode: str = Form('blackout')
                     # fallback if rect was [x0,y0,x1,y1]
                     rects.append([r[0], r[1], r[2]-r[0], r[3]-r[1]])
             out = redact.redact_image_bytes(data, rects, mode)
-            headers = {"Content-Disposition": f'attachment; filename="redacted-{file.filename}"'}
-            return StreamingResponse(io.BytesIO(out), media_type='image/png', headers=headers)
+            return _image_response(out, file.filename, _scan_headers(scan_budget))
         # fallback: return original
         return JSONResponse({'error': 'unsupported file type for auto redact'}, status_code=400)
     except Exception as e:
@@ -1,138 +1,631 @@
+import codecs
+import hashlib
 import io
+import json
+import os
 import cv2
 import numpy as np
 import fitz
 from docx import Document
 from openpyxl import load_workbook
 from PIL import Image, ImageDraw, ImageFont, ImageFilter
+import queue
 import re
+import shutil
+import tempfile
+import threading
+import time
+import multiprocessing
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from functools import lru_cache
+from itertools import accumulate, chain
 try:
     import pytesseract
 except Exception:
     pytesseract = None
+try:
+    import tesserocr
+except Exception:
+    tesserocr = None
 try:
     import phonenumbers
 except Exception:
     phonenumbers = None
 
 
-def redact_image_bytes(data: bytes, regions: list, mode: str = "blackout") -> bytes:
+# Redacted images keep the upload's format unless another is asked for (formats cv2 cannot
+# write, e.g. GIF or TIFF, come out as PNG).  Encoding through cv2 writes pixels only, so
+# EXIF (GPS, camera, thumbnails), XMP, comments and ICC profiles are dropped; the EXIF
+# orientation is applied to the pixels first so the picture still shows the right way up.
+IMAGE_FORMATS = {'png': 'image/png', 'jpeg': 'image/jpeg', 'webp': 'image/webp'}
+IMAGE_FORMAT = os.environ.get('REDACT_IMAGE_FORMAT', 'keep')
+JPEG_QUALITY = int(os.environ.get('REDACT_JPEG_QUALITY', '90'))
+WEBP_QUALITY = int(os.environ.get('REDACT_WEBP_QUALITY', '90'))
+PNG_COMPRESSION = int(os.environ.get('REDACT_PNG_COMPRESSION', '3'))
+IMAGE_FAST_ENCODE = os.environ.get('REDACT_IMAGE_FAST', '0') == '1'
+# EXIF orientation -> how to turn the stored pixels upright
+_ORIENT = {
+    2: lambda im: cv2.flip(im, 1),
+    3: lambda im: cv2.rotate(im, cv2.ROTATE_180),
+    4: lambda im: cv2.flip(im, 0),
+    5: lambda im: cv2.transpose(im),
+    6: lambda im: cv2.rotate(im, cv2.ROTATE_90_CLOCKWISE),
+    7: lambda im: cv2.rotate(cv2.transpose(im), cv2.ROTATE_180),
+    8: lambda im: cv2.rotate(im, cv2.ROTATE_90_COUNTERCLOCKWISE),
+}
+
+
+def sniff_image_format(data: bytes):
+    """'jpeg', 'png' or 'webp' from the file signature, else None."""
+    if data[:3] == b'\xff\xd8\xff':
+        return 'jpeg'
+    if data[:8] == b'\x89PNG\r\n\x1a\n':
+        return 'png'
+    if data[:4] == b'RIFF' and data[8:12] == b'WEBP':
+        return 'webp'
+    return None
+
+
+def _exif_orientation(data: bytes) -> int:
+    try:
+        # Image.open only reads the header here
+        return int(Image.open(io.BytesIO(data)).getexif().get(0x0112, 1))
+    except Exception:
+        return 1
+
+
+def encode_image(img, fmt: str, quality: int = None, fast: bool = None) -> bytes:
+    """cv2 image -> `fmt` bytes (see IMAGE_FORMATS).  `fast` trades size for encode time:
+    PNG with cv2's own (speed-oriented) settings, JPEG without Huffman optimisation, WebP
+    at quality 75 at most."""
+    fast = IMAGE_FAST_ENCODE if fast is None else fast
+    if fmt != 'png':
+        if img.dtype != np.uint8:
+            img = (img / 257).astype(np.uint8)
+        if img.ndim == 3 and img.shape[2] == 4 and fmt == 'jpeg':
+            # no alpha in JPEG: flatten onto white
+            alpha = img[:, :, 3:4].astype(np.float32) / 255
+            img = (img[:, :, :3] * alpha + 255 * (1 - alpha)).astype(np.uint8)
+    if fmt == 'jpeg':
+        params = [cv2.IMWRITE_JPEG_QUALITY, quality or JPEG_QUALITY, cv2.IMWRITE_JPEG_OPTIMIZE, 0 if fast else 1]
+    elif fmt == 'webp':
+        q = quality or WEBP_QUALITY
+        params = [cv2.IMWRITE_WEBP_QUALITY, min(q, 75) if fast else q]
+    else:
+        params = [] if fast else [cv2.IMWRITE_PNG_COMPRESSION, PNG_COMPRESSION]
+    success, out = cv2.imencode('.' + ('jpg' if fmt == 'jpeg' else fmt), img, params)
+    if not success:
+        raise ValueError("Failed to encode image")
+    return out.tobytes()
+
+
+# blackout: solid black; blur: Gaussian (cost grows with the kernel, i.e. region width);
+# boxblur: mean over the same window from an integral image, constant cost per pixel;
+# pixelate: block means by downscale/upscale.  Blurred or pixelated text can sometimes be
+# recovered, blackout is the only one that destroys it.
+IMAGE_REDACT_MODES = ('blackout', 'blur', 'boxblur', 'pixelate')
+_PIXELATE_MIN_BLOCK = 12
+
+
+def coalesce_rects(regions: list, width: int, height: int, gap: int = 1) -> list:
+    """[x, y, w, h] boxes clipped to the image, with boxes that overlap or lie within `gap`
+    pixels of each other merged into their bounding box (repeated until nothing touches),
+    so OCR hits reported several times are only processed once."""
+    boxes = []
+    for r in regions or []:
+        try:
+            x, y, w, h = (int(v) for v in r[:4])
+        except Exception:
+            continue
+        x0, y0, x1, y1 = max(0, x), max(0, y), min(width, x + w), min(height, y + h)
+        if x1 > x0 and y1 > y0:
+            boxes.append((x0, y0, x1, y1))
+    if not boxes:
+        return []
+    b = np.array(boxes, dtype=np.int64)
+    while len(b) > 1:
+        # pairs that touch (only boxes starting before the other one ends can: sort by x0)
+        b = b[np.argsort(b[:, 0], kind='stable')]
+        reach = np.searchsorted(b[:, 0], b[:, 2] + gap, side='right')
+        parent = list(range(len(b)))
+
+        def root(i):
+            while parent[i] != i:
+                parent[i] = parent[parent[i]]
+                i = parent[i]
+            return i
+        counts = np.maximum(reach - np.arange(len(b)) - 1, 0)
+        first = np.repeat(np.arange(len(b)), counts)
+        second = first + 1 + np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        hit = (b[second, 1] <= b[first, 3] + gap) & (b[first, 1] <= b[second, 3] + gap)
+        merged = False
+        for i, j in zip(first[hit].tolist(), second[hit].tolist()):
+            ri, rj = root(i), root(j)
+            if ri != rj:
+                parent[max(ri, rj)] = min(ri, rj)
+                merged = True
+        if not merged:
+            break
+        label = np.array([root(i) for i in range(len(b))])
+        order = np.argsort(label, kind='stable')
+        starts = np.flatnonzero(np.r_[True, np.diff(label[order]) != 0])
+        b = b[order]
+        b = np.stack([np.minimum.reduceat(b[:, 0], starts), np.minimum.reduceat(b[:, 1], starts),
+                      np.maximum.reduceat(b[:, 2], starts), np.maximum.reduceat(b[:, 3], starts)], axis=1)
+    return [[int(x0), int(y0), int(x1 - x0), int(y1 - y0)] for x0, y0, x1, y1 in b]
+
+
+def _box_blur(roi, k: int):
+    # mean of the k x k window around every pixel from one integral image (edges replicated)
+    r = k // 2
+    pad = cv2.copyMakeBorder(roi, r, r, r, r, cv2.BORDER_REPLICATE)
+    s = cv2.integral(pad, sdepth=cv2.CV_64F)
+    h, w = roi.shape[:2]
+    total = s[k:k + h, k:k + w] - s[:h, k:k + w] - s[k:k + h, :w] + s[:h, :w]
+    return np.rint(total / (k * k)).reshape(roi.shape).astype(roi.dtype)
+
+
+def _pixelate(roi):
+    h, w = roi.shape[:2]
+    block = max(_PIXELATE_MIN_BLOCK, min(w, h) // 3)
+    small = cv2.resize(roi, (max(1, w // block), max(1, h // block)), interpolation=cv2.INTER_AREA)
+    return cv2.resize(small, (w, h), interpolation=cv2.INTER_NEAREST)
+
+
+def obfuscate_regions(img, regions: list, mode: str = "blackout"):
+    """Apply `mode` (see IMAGE_REDACT_MODES; anything else is blackout) to the [x, y, w, h]
+    `regions` of a cv2 image, after coalescing them; returns the image."""
+    rects = coalesce_rects(regions, img.shape[1], img.shape[0])
+    if mode in ("blur", "boxblur", "pixelate"):
+        for x, y, w, h in rects:
+            roi = img[y:y+h, x:x+w]
+            k = max(3, (w//7)|1)
+            if mode == "blur":
+                roi = cv2.GaussianBlur(roi, (k, k), 0)
+            elif mode == "boxblur":
+                roi = _box_blur(roi, k)
+            else:
+                roi = _pixelate(roi)
+            img[y:y+h, x:x+w] = roi
+        return img
+    # blackout: coalesced boxes are disjoint, so filling them slice by slice touches every
+    # pixel once (a whole-image mask composite costs more than the boxes themselves)
+    for x, y, w, h in rects:
+        if img.ndim == 3:
+            img[y:y+h, x:x+w, :3] = 0
+            if img.shape[2] == 4:
+                # opaque black, not a transparent hole
+                img[y:y+h, x:x+w, 3] = np.iinfo(img.dtype).max
+        else:
+            img[y:y+h, x:x+w] = 0
+    return img
+
+
+def redact_image_bytes(data: bytes, regions: list, mode: str = "blackout", fmt: str = None, quality: int = None,
+                       fast: bool = None) -> bytes:
+    """Black out (or blur) `regions` and re-encode without metadata.  `fmt` is 'keep' (the
+    input's format, REDACT_IMAGE_FORMAT by default) or one of IMAGE_FORMATS; `quality` is
+    for JPEG/WebP."""
     arr = np.frombuffer(data, np.uint8)
     img = cv2.imdecode(arr, cv2.IMREAD_UNCHANGED)
     if img is None:
         raise ValueError("Unable to decode image")
+    # IMREAD_UNCHANGED ignores the EXIF orientation; regions are given on the upright image
+    # (as shown by browsers and as detect_image_bytes sees it)
+    orient = _ORIENT.get(_exif_orientation(data))
+    if orient is not None:
+        img = orient(img)
+    img = obfuscate_regions(img, regions, mode)
+    fmt = fmt or IMAGE_FORMAT
+    if fmt == 'keep':
+        fmt = sniff_image_format(data) or 'png'
+    if fmt not in IMAGE_FORMATS:
+        raise ValueError(f"unknown image format '{fmt}' (expected keep or one of {', '.join(IMAGE_FORMATS)})")
+    return encode_image(img, fmt, quality, fast)
+
+
+class PdfSession:
+    """One parsed PDF shared by every stage of a request.
+
+    Phrase search, canvas-coordinate mapping, detection and redaction all take the session
+    instead of the raw bytes, so the document is opened once and each page's objects and
+    extracted text are built at most once.  Use it as a context manager (or call close()).
+    Redaction draws on the cached pages, so it should be the last stage.  PdfSession(path=...)
+    lets MuPDF read a file on disk as it needs it; `data` is then None.
+    """
+    __slots__ = ('data', 'path', 'doc', '_pages', '_textpages', '_text', '_words', '_word_index', '_chars', '_digest')
+
+    def __init__(self, data: bytes = None, path: str = None):
+        self.data = data
+        self.path = path
+        self.doc = fitz.open(path, filetype="pdf") if path is not None else fitz.open(stream=data, filetype="pdf")
+        self._pages = {}
+        self._textpages = {}
+        self._text = {}
+        self._words = {}
+        self._word_index = {}
+        self._chars = {}
+        self._digest = None
+
+    def __len__(self):
+        return len(self.doc)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def page(self, pno: int):
+        page = self._pages.get(pno)
+        if page is None:
+            page = self._pages[pno] = self.doc.load_page(pno)
+        return page
+
+    def textpage(self, pno: int):
+        # the flags of get_text() and get_text("words"), so one TextPage serves both
+        tp = self._textpages.get(pno)
+        if tp is None:
+            tp = self._textpages[pno] = self.page(pno).get_textpage(flags=fitz.TEXTFLAGS_TEXT)
+        return tp
+
+    def text(self, pno: int) -> str:
+        text = self._text.get(pno)
+        if text is None:
+            text = self._text[pno] = self.textpage(pno).extractText()
+        return text
+
+    def words(self, pno: int) -> list:
+        words = self._words.get(pno)
+        if words is None:
+            words = self._words[pno] = self.textpage(pno).extractWORDS()
+        return words
+
+    def word_index(self, pno: int) -> 'PdfWordIndex':
+        index = self._word_index.get(pno)
+        if index is None:
+            index = self._word_index[pno] = PdfWordIndex(self.words(pno))
+        return index
+
+    def chars(self, pno: int):
+        """(boxes, line) for every character of text(pno), or None if they cannot be lined up.
+
+        boxes is an (n, 4) float array of x0, y0, x1, y1 (NaN for the line breaks the text
+        extraction adds) and line the index of the text line each character is on.
+        """
+        if pno in self._chars:
+            return self._chars[pno]
+        boxes = []
+        line = []
+        out = []
+        nan = (np.nan, np.nan, np.nan, np.nan)
+        ln = 0
+        for b in self.textpage(pno).extractRAWDICT()['blocks']:
+            if b.get('type') != 0:
+                continue
+            for l in b['lines']:
+                for sp in l['spans']:
+                    for ch in sp['chars']:
+                        out.append(ch['c'])
+                        boxes.append(ch['bbox'])
+                        line.append(ln)
+                out.append('\n')
+                boxes.append(nan)
+                line.append(ln)
+                ln += 1
+        chars = None
+        # extractText writes exactly these characters plus a newline per line; anything else
+        # (and the caller falls back to searching for the text)
+        if ''.join(out) == self.text(pno):
+            chars = (np.array(boxes, dtype=float).reshape(-1, 4), np.array(line, dtype=np.int64))
+        self._chars[pno] = chars
+        return chars
+
+    @property
+    def digest(self) -> str:
+        if self._digest is None:
+            if self.data is None:
+                with open(self.path, 'rb') as fh:
+                    self._digest = hashlib.sha256(fh.read()).hexdigest()
+            else:
+                self._digest = hashlib.sha256(self.data).hexdigest()
+        return self._digest
+
+    def close(self):
+        self._textpages.clear()
+        self._pages.clear()
+        try:
+            self.doc.close()
+        except Exception:
+            pass
+
+
+# page geometry manifests by (document sha256, zoom), most recent last
+_GEOMETRY_CACHE = {}
+_GEOMETRY_CACHE_SIZE = 256
+
+
+def pdf_page_geometry(session: PdfSession, zoom: float = 2.0) -> dict:
+    """Where every page sits on the preview canvas (pages stacked vertically at `zoom`).
+
+    Computed from page metadata only: a page renders to its (rotated) page rect times the
+    zoom, rounded outwards to whole pixels, exactly like get_pixmap, so nothing is
+    rasterised.  Returns {'doc': sha256, 'zoom', 'pages': [{'width', 'height',
+    'pixel_width', 'pixel_height', 'offset'}], 'pixel_width', 'pixel_height'}, sizes in PDF
+    points and canvas pixels; manifests are cached by document hash.
+    """
+    key = (session.digest, float(zoom))
+    geo = _GEOMETRY_CACHE.pop(key, None)
+    if geo is None:
+        mat = fitz.Matrix(zoom, zoom)
+        pages = []
+        offset = 0
+        for pno in range(len(session)):
+            rect = session.page(pno).rect
+            pix = (rect * mat).irect
+            pages.append({'width': rect.width, 'height': rect.height,
+                          'pixel_width': pix.width, 'pixel_height': pix.height, 'offset': offset})
+            offset += pix.height
+        geo = {'doc': session.digest, 'zoom': float(zoom), 'pages': pages,
+               'pixel_width': max((p['pixel_width'] for p in pages), default=0), 'pixel_height': offset}
+        while len(_GEOMETRY_CACHE) >= _GEOMETRY_CACHE_SIZE:
+            del _GEOMETRY_CACHE[next(iter(_GEOMETRY_CACHE))]
+    _GEOMETRY_CACHE[key] = geo
+    return geo
+
+
+_WORD_NORM_RE = re.compile(r"[^\w]")
+# index key: the first few characters of a token (or the whole token if it is shorter)
+_WORD_HEAD = 4
+
+
+class PdfWordIndex:
+    """The words of one page (get_text("words")) indexed by normalised token.
+
+    Tokens are lowercased with non-word characters removed.  A phrase is looked up by the
+    same normalisation with its spaces dropped: the index gives the words that could start
+    it (hash probes on the token head) and a match is a run of consecutive words whose
+    tokens join up to exactly the phrase, however the PDF split it into words
+    ("+91 98765 43210", "ravi.kumar92@example.com" as one word or several).
+    """
+    __slots__ = ('words', 'tokens', '_heads')
+
+    def __init__(self, words: list):
+        self.words = words
+        self.tokens = [_WORD_NORM_RE.sub('', w[4]).lower() for w in words]
+        heads = {}
+        for i, t in enumerate(self.tokens):
+            if t:
+                heads.setdefault(t[:_WORD_HEAD], []).append(i)
+        self._heads = heads
+
+    def find(self, phrase: str) -> list:
+        """(first, last + 1) word positions of every non-overlapping occurrence of `phrase`."""
+        target = _WORD_NORM_RE.sub('', phrase).lower()
+        if not target:
+            return []
+        starts = set()
+        for k in range(1, min(_WORD_HEAD, len(target)) + 1):
+            starts.update(self._heads.get(target[:k], ()))
+        tokens = self.tokens
+        spans = []
+        after = 0
+        for i in sorted(starts):
+            if i < after:
+                continue
+            acc = ''
+            j = i
+            while j < len(tokens) and len(acc) < len(target):
+                acc += tokens[j]
+                j += 1
+                if not target.startswith(acc):
+                    break
+            if acc == target:
+                spans.append((i, j))
+                after = j
+        return spans
+
+    def rects(self, phrase: str) -> list:
+        """Bounding box [x0, y0, x1, y1] of every occurrence of `phrase`."""
+        words = self.words
+        out = []
+        for i, j in self.find(phrase):
+            run = words[i:j]
+            out.append([min(w[0] for w in run), min(w[1] for w in run), max(w[2] for w in run), max(w[3] for w in run)])
+        return out
+
+
+def canvas_regions_to_pdf(session: PdfSession, regions: list, zoom: float = 2.0) -> list:
+    """Map preview-canvas boxes [x, y, w, h] (pages stacked vertically, rendered at `zoom`)
+    to {"page": n, "rect": [x0, y0, x1, y1]} in PDF coordinates."""
+    geo = pdf_page_geometry(session, zoom)
+    cum = [p['offset'] for p in geo['pages']] + [geo['pixel_height']]
+    total_pages = len(geo['pages'])
+    norm = []
     for r in regions:
-        # r expected [x, y, w, h]
-        x, y, w, h = r
-        x, y, w, h = int(x), int(y), int(w), int(h)
-        if mode == "blur":
-            roi = img[y:y+h, x:x+w]
-            k = max(3, (w//7)|1)
-            roi = cv2.GaussianBlur(roi, (k, k), 0)
-            img[y:y+h, x:x+w] = roi
-        else:
-            if img.ndim == 3:
-                img[y:y+h, x:x+w] = (0, 0, 0)
+        try:
+            x = float(r[0]); y = float(r[1]); w = float(r[2]); h = float(r[3])
+            pidx = 0
+            for i in range(total_pages):
+                if y >= cum[i] and y < cum[i+1]:
+                    pidx = i; break
+            y_in_page = y - cum[pidx]
+            x0 = x/zoom; y0 = y_in_page/zoom; x1 = (x+w)/zoom; y1 = (y_in_page + h)/zoom
+            norm.append({"page": pidx, "rect": [x0, y0, x1, y1]})
+        except Exception:
+            continue
+    return norm
+
+
+def _pdf_auto_marks(session: PdfSession, pno: int, budget=None):
+    """Boxes redact_pdf_session always covers on a page: ([(x0, y0, x1, y1, masked email)],
+    [(x0, y0, x1, y1) of phone numbers])."""
+    page = session.page(pno)
+    text = session.text(pno)
+    emails = []
+    phones = []
+    # emails
+    for m in EMAIL_RE.findall(text):
+        try:
+            if not isinstance(m, str):
+                try:
+                    m = str(m)
+                except Exception:
+                    print(f"[redact_pdf_bytes] coercion failed for email match type={type(m)} repr={m}")
+            masked = mask_email_addr(m)
+            for r in page.search_for(m):
+                emails.append((r.x0, r.y0, r.x1, r.y1, masked))
+        except Exception as ex:
+            print(f"[redact_pdf_bytes] search_for failed for email match repr={repr(m)} type={type(m)} error={ex}")
+            continue
+    # phone numbers -> black boxes
+    for ph in PHONE_RE.findall(text):
+        try:
+            if not isinstance(ph, str):
+                try:
+                    ph = str(ph)
+                except Exception:
+                    print(f"[redact_pdf_bytes] coercion failed for phone match type={type(ph)} repr={ph}")
+            for r in page.search_for(ph):
+                phones.append((r.x0, r.y0, r.x1, r.y1))
+        except Exception as ex:
+            print(f"[redact_pdf_bytes] search_for failed for phone match repr={repr(ph)} type={type(ph)} error={ex}")
+            continue
+    return (emails, phones) if emails or phones else None
+
+
+# character boxes of adjacent text lines overlap by a point or two, and apply_redactions
+# removes every character whose box touches a redaction; line-sized rects of located text
+# are therefore trimmed top and bottom.  Regions the user drew are used exactly as drawn.
+_REDACT_LINE_HEIGHT = 40.0
+_REDACT_LINE_TRIM = 0.15
+
+
+def apply_pdf_redactions(page, marks: list) -> int:
+    """Redact one page in a single batch; `marks` are (rect, fill colour, replacement text or
+    None, whether the rect is a located text box that may be trimmed).  Returns how many
+    marks were applied."""
+    added = 0
+    for rect, fill, text, located in marks:
+        try:
+            r = fitz.Rect(rect).normalize()
+            if r.is_empty:
+                continue
+            fontsize = max(6, r.height * 0.7)
+            if located and r.height < _REDACT_LINE_HEIGHT:
+                trim = r.height * _REDACT_LINE_TRIM
+                r = fitz.Rect(r.x0, r.y0 + trim, r.x1, r.y1 - trim)
+            if text:
+                page.add_redact_annot(r, text=text, fontsize=fontsize, fill=fill, text_color=(0, 0, 0))
             else:
-                img[y:y+h, x:x+w] = 0
-    ext = ".png"
-    success, out = cv2.imencode(ext, img)
-    if not success:
-        raise ValueError("Failed to encode image")
-    return out.tobytes()
+                page.add_redact_annot(r, fill=fill)
+            added += 1
+        except Exception as e:
+            print(f"[redact_pdf_bytes] skipped rect {rect} on page {page.number}: {e}")
+    if added:
+        page.apply_redactions()
+    return added
+
+
+# How a redacted PDF is written (REDACT_PDF_SAVE_MODE, or save_mode per call):
+#   full         plain rewrite of the document
+#   compact      unused objects dropped, streams deflated, objects packed into object
+#                streams; smallest output, some extra CPU
+#   incremental  only the changed objects appended to the original bytes; cheapest for big
+#                files with few edits, but the previous revision (with the redacted content)
+#                is still in the file, so only for callers that strip or re-save it later
+PDF_SAVE_MODES = ('full', 'compact', 'incremental')
+# an incremental save appends to the original, so the unredacted revision can still be
+# recovered from the output: requests may only pick these, 'incremental' is left to the
+# server setting (and its responses say the file is not redacted, see keeps_original_revision)
+PDF_REQUEST_SAVE_MODES = ('full', 'compact')
+PDF_SAVE_MODE = os.environ.get('REDACT_PDF_SAVE_MODE', 'full')
+
+
+def keeps_original_revision(out: bytes, data: bytes) -> bool:
+    """True when `out` is `data` with changes appended (an incremental save), i.e. the
+    original content is still in the file."""
+    return out is not data and len(out) > len(data) and memoryview(out)[:len(data)] == memoryview(data)
+
+
+def save_pdf(doc, mode: str = 'full') -> bytes:
+    """Serialise `doc` as 'full' or 'compact' (incremental saves go through the file the
+    document was opened from, see redact_pdf_session)."""
+    buf = io.BytesIO()
+    if mode == 'compact':
+        doc.save(buf, garbage=3, deflate=True, use_objstms=1)
+    else:
+        doc.save(buf)
+    return buf.getvalue()
+
+
+def redact_pdf_bytes(data: bytes, regions: list, save_mode: str = None, pages: list = None) -> bytes:
+    # regions: list of {"page": int, "rect": [x0,y0,x1,y1]} (plus "text": true for located text boxes)
+    try:
+        session = PdfSession(data)
+    except Exception as e:
+        print(f"[redact_pdf_bytes] ERROR: {e}")
+        return data
+    with session:
+        return redact_pdf_session(session, regions, save_mode=save_mode, pages=pages)
 
 
-def redact_pdf_bytes(data: bytes, regions: list) -> bytes:
-    # regions: list of {"page": int, "rect": [x0,y0,x1,y1]}
+def _session_bytes(session: PdfSession) -> bytes:
+    """The PDF a session was opened from, as bytes (session.data itself when it has them)."""
+    if session.data is not None:
+        return session.data
+    with open(session.path, 'rb') as fh:
+        return fh.read()
+
+
+def redact_pdf_session(session: PdfSession, regions: list, save_mode: str = None, pages: list = None) -> bytes:
+    """redact_pdf_bytes on an open PdfSession (reuses its pages and extracted text).  When no
+    page changes the input object itself (session.data) is returned without saving, so
+    callers can test `out is session.data` instead of comparing bytes (a session opened from
+    a path returns the file's bytes instead).  With `pages` the automatic email/phone boxes
+    are only looked for on those pages (`regions` are always applied); other pages are never
+    loaded.  The output is still a full save of the whole document."""
+    data = session.data
+    mode = save_mode or PDF_SAVE_MODE
+    if mode not in PDF_SAVE_MODES:
+        raise ValueError(f"unknown PDF save mode '{mode}' (expected one of {', '.join(PDF_SAVE_MODES)})")
+    incremental = incremental_path = None
     try:
         try:
             print(f"[redact_pdf_bytes] incoming regions type={type(regions)} count={len(regions) if regions else 0} preview_sample={regions[0] if regions else ''}")
         except Exception:
             print(f"[redact_pdf_bytes] incoming regions: {regions}")
-        doc = fitz.open(stream=data, filetype="pdf")
+        doc = session.doc
         # Normalize regions if they are simple [x,y,w,h] canvas coords coming from the preview
         try:
             if isinstance(regions, list) and regions and isinstance(regions[0], (list, tuple)):
-                zoom = 2.0
-                page_pix_heights = []
-                for pno in range(len(doc)):
-                    pg = doc.load_page(pno)
-                    pix = pg.get_pixmap(matrix=fitz.Matrix(zoom, zoom))
-                    page_pix_heights.append(pix.height)
-                cum = [0]
-                for hgt in page_pix_heights:
-                    cum.append(cum[-1] + hgt)
-                total_pages = len(page_pix_heights)
-                norm = []
-                for r in regions:
-                    try:
-                        x = float(r[0]); y = float(r[1]); w = float(r[2]); h = float(r[3])
-                        pidx = 0
-                        for i in range(total_pages):
-                            if y >= cum[i] and y < cum[i+1]:
-                                pidx = i; break
-                        y_in_page = y - cum[pidx]
-                        x0 = x/zoom; y0 = y_in_page/zoom; x1 = (x+w)/zoom; y1 = (y_in_page + h)/zoom
-                        norm.append({"page": pidx, "rect": [x0, y0, x1, y1]})
-                    except Exception:
-                        continue
-                regions = norm
+                regions = canvas_regions_to_pdf(session, regions)
         except Exception:
             pass
-        # First, redact any email addresses by replacing them with a masked username and
-        # redact phone numbers by drawing a black rectangle over their areas.
+        # Boxes are collected per page first: masked emails (white, with the masked address
+        # written over them) and phone numbers found on every page (in worker processes for
+        # long documents), then the requested regions (black).
+        marks = {}
         try:
-            for pno in range(len(doc)):
-                page = doc.load_page(pno)
-                text = page.get_text()
-                # emails
-                for m in EMAIL_RE.findall(text):
-                    try:
-                        if not isinstance(m, str):
-                            try:
-                                m = str(m)
-                            except Exception:
-                                print(f"[redact_pdf_bytes] coercion failed for email match type={type(m)} repr={m}")
-                        areas = page.search_for(m)
-                        for r in areas:
-                            try:
-                                # clear area then insert masked email (preserve domain)
-                                shape = page.new_shape()
-                                shape.draw_rect(r)
-                                shape.finish(fill=(1, 1, 1))
-                                shape.commit()
-                                masked = mask_email_addr(m)
-                                fontsize = max(6, (r.y1 - r.y0) * 0.7)
-                                page.insert_textbox(r, masked, fontsize=fontsize, color=(0, 0, 0))
-                            except Exception:
-                                pass
-                    except Exception as ex:
-                        print(f"[redact_pdf_bytes] search_for failed for email match repr={repr(m)} type={type(m)} error={ex}")
-                        continue
-                # phone numbers -> black boxes
-                for ph in PHONE_RE.findall(text):
-                    try:
-                        if not isinstance(ph, str):
-                            try:
-                                ph = str(ph)
-                            except Exception:
-                                print(f"[redact_pdf_bytes] coercion failed for phone match type={type(ph)} repr={ph}")
-                        areas = page.search_for(ph)
-                        for r in areas:
-                            shape = page.new_shape()
-                            shape.draw_rect(r)
-                            shape.finish(fill=(0, 0, 0))
-                            shape.commit()
-                    except Exception as ex:
-                        print(f"[redact_pdf_bytes] search_for failed for phone match repr={repr(ph)} type={type(ph)} error={ex}")
-                        continue
+            for pno, auto in enumerate(pdf_map_pages(session, _pdf_auto_marks, pages=pages)):
+                if not auto:
+                    continue
+                emails, phones = auto
+                page_marks = marks.setdefault(pno, [])
+                for x0, y0, x1, y1, masked in emails:
+                    page_marks.append(((x0, y0, x1, y1), (1, 1, 1), masked, True))
+                for rect in phones:
+                    page_marks.append((rect, (0, 0, 0), None, True))
         except Exception:
             pass
         for item in regions:
-            # support both dict items and fallback list rects
+            # support both dict items and fallback list rects; {"text": true} marks a box the
+            # server located around text (phrase search, detection), anything else was drawn
+            located = False
             if isinstance(item, dict):
                 page_no = int(item.get("page", 0))
                 rect = item.get("rect")
+                located = bool(item.get("text"))
             elif isinstance(item, (list, tuple)) and len(item) >= 4:
                 page_no = 0
                 rect = [item[0], item[1], item[0] + item[2], item[1] + item[3]]
@@ -140,21 +633,42 @@ def redact_pdf_bytes(data: bytes, regions: list) -> bytes:
                 continue
             if rect is None:
                 continue
-            x0, y0, x1, y1 = map(float, rect)
-            page = doc.load_page(page_no)
-            shape = page.new_shape()
-            shape.draw_rect(fitz.Rect(x0, y0, x1, y1))
-            shape.finish(fill=(0, 0, 0))
-            shape.commit()
-        buf = io.BytesIO()
-        doc.save(buf)
-        out_bytes = buf.getvalue()
-        try:
-            modified_flag = (out_bytes != data)
-            print(f"[redact_pdf_bytes] saved bytes len={len(out_bytes)} modified={modified_flag}")
-        except Exception:
-            print("[redact_pdf_bytes] saved bytes computed, but failed to compare to original")
-        doc.close()
+            marks.setdefault(page_no, []).append((tuple(map(float, rect[:4])), (0, 0, 0), None, located))
+        if not marks:
+            print("[redact_pdf_bytes] nothing to redact, returning the original")
+            return _session_bytes(session)
+        if mode == 'incremental':
+            # PyMuPDF only appends to the file a document was opened from, so the edits go
+            # to a file-backed copy; the session's document is only read
+            with tempfile.NamedTemporaryFile(suffix='.pdf', delete=False) as fh:
+                incremental_path = fh.name
+                if session.path is not None:
+                    with open(session.path, 'rb') as src:
+                        shutil.copyfileobj(src, fh)
+                else:
+                    fh.write(data)
+            incremental = fitz.open(incremental_path)
+            if not incremental.can_save_incrementally():
+                print("[redact_pdf_bytes] cannot append to this PDF, saving it in full")
+                mode = 'full'
+            else:
+                doc = incremental
+        # one batch per page: redaction annotations, then a single apply_redactions pass,
+        # which removes the text (and image pixels) underneath instead of painting over it
+        changed = 0
+        for pno in sorted(marks):
+            page = doc.load_page(pno) if doc is incremental else session.page(pno)
+            changed += apply_pdf_redactions(page, marks[pno])
+        if not changed:
+            print("[redact_pdf_bytes] no page changed, returning the original")
+            return _session_bytes(session)
+        if doc is incremental:
+            doc.saveIncr()
+            with open(incremental_path, 'rb') as fh:
+                out_bytes = fh.read()
+        else:
+            out_bytes = save_pdf(doc, mode)
+        print(f"[redact_pdf_bytes] saved ({mode}) bytes len={len(out_bytes)} from {len(data) if data is not None else os.path.getsize(session.path)} changed_rects={changed}")
         return out_bytes
     except Exception as e:
         # Log the error and fall back to returning the original data so the user still
@@ -164,14 +678,22 @@ def redact_pdf_bytes(data: bytes, regions: list) -> bytes:
             print(f"[redact_pdf_bytes] ERROR: {e}\n" + traceback.format_exc())
         except Exception:
             print(f"[redact_pdf_bytes] ERROR: {e}")
-        return data
+        return _session_bytes(session)
+    finally:
+        if incremental is not None:
+            incremental.close()
+        if incremental_path:
+            try:
+                os.unlink(incremental_path)
+            except Exception:
+                pass
 
 
 def redact_docx_bytes(data: bytes, phrases: list, media_to_blur: list = None) -> bytes:
     buf = io.BytesIO(data)
     doc = Document(buf)
-    def mask_text(s):
-        return "█" * len(s)
+    # all phrases are matched in one pass per paragraph/cell
+    matcher = PhraseMatcher(phrases)
     # replace email addresses and phone numbers across paragraphs
     try:
         for p in doc.paragraphs:
@@ -180,9 +702,7 @@ def redact_docx_bytes(data: bytes, phrases: list, media_to_blur: list = None) ->
             new_text = EMAIL_RE.sub(lambda m: mask_email_addr(m.group(0)), text)
             # replace phone numbers with black box characters
             new_text = PHONE_RE.sub(lambda m: '█' * len(m.group(0)), new_text)
-            for ph in phrases:
-                if ph in new_text:
-                    new_text = new_text.replace(ph, mask_text(ph))
+            new_text = matcher.mask(new_text)
             if new_text != text:
                 for r in list(p.runs):
                     r.text = ""
@@ -197,9 +717,7 @@ def redact_docx_bytes(data: bytes, phrases: list, media_to_blur: list = None) ->
                     text = cell.text
                     new_text = EMAIL_RE.sub(lambda m: mask_email_addr(m.group(0)), text)
                     new_text = PHONE_RE.sub(lambda m: '█' * len(m.group(0)), new_text)
-                    for ph in phrases:
-                        if ph in new_text:
-                            new_text = new_text.replace(ph, mask_text(ph))
+                    new_text = matcher.mask(new_text)
                     if new_text != text:
                         for cp in list(cell.paragraphs):
                             for r in list(cp.runs):
@@ -222,6 +740,7 @@ def redact_docx_bytes(data: bytes, phrases: list, media_to_blur: list = None) ->
 def redact_xlsx_bytes(data: bytes, cells: list, columns: list, rows: list = None, phrases: list = None, media_to_blur: list = None) -> bytes:
     buf = io.BytesIO(data)
     wb = load_workbook(filename=buf)
+    matcher = PhraseMatcher(phrases)
     for ws in wb.worksheets:
         # first, redact email addresses in all string cells
         for row in ws.iter_rows(values_only=False):
@@ -239,13 +758,11 @@ def redact_xlsx_bytes(data: bytes, cells: list, columns: list, rows: list = None
                     except Exception:
                         pass
                 # redact any user-specified phrases inside cells
-                if phrases and isinstance(val, str):
+                if matcher and isinstance(val, str):
                     try:
-                        for ph in phrases:
-                            if not ph: continue
-                            if ph in cell.value:
-                                repl = '█' * len(ph)
-                                cell.value = cell.value.replace(ph, repl)
+                        masked = matcher.mask(cell.value)
+                        if masked != cell.value:
+                            cell.value = masked
                     except Exception:
                         pass
         # mask specific cells like "A1", "B2"
@@ -337,6 +854,8 @@ MASKED_CARD_RE = re.compile(r"(?:\*{4}[ \-]?){1,3}\d{4}")
 CVV_RE = re.compile(r"\b\d{3,4}\b")
 PIN_RE = re.compile(r"\b\d{4,6}\b")
 JWT_RE = re.compile(r"\beyJ[A-Za-z0-9_\-]+\.[A-Za-z0-9_\-]+\.[A-Za-z0-9_\-]+\b")
+_JWT_SEGMENT_RE = re.compile(r"[A-Za-z0-9_\-]*")
+_JWT_TAIL_RE = re.compile(r"\.[A-Za-z0-9_\-]+\.[A-Za-z0-9_\-]+\b")
 
 # OTP / 2FA codes (detect with context)
 OTP_RE = re.compile(r"\b\d{4,8}\b")
@@ -401,47 +920,156 @@ def iban_check(iban: str) -> bool:
         return False
 
 
+# Verhoeff tables: multiplication (d), permutation (p) and inverse
+_VERHOEFF_D = [
+    [0,1,2,3,4,5,6,7,8,9],
+    [1,2,3,4,0,6,7,8,9,5],
+    [2,3,4,0,1,7,8,9,5,6],
+    [3,4,0,1,2,8,9,5,6,7],
+    [4,0,1,2,3,9,5,6,7,8],
+    [5,9,8,7,6,0,4,3,2,1],
+    [6,5,9,8,7,1,0,4,3,2],
+    [7,6,5,9,8,2,1,0,4,3],
+    [8,7,6,5,9,3,2,1,0,4],
+    [9,8,7,6,5,4,3,2,1,0]
+]
+_VERHOEFF_P = [
+    [0,1,2,3,4,5,6,7,8,9],
+    [1,5,7,6,2,8,3,0,9,4],
+    [5,8,0,3,7,9,6,1,4,2],
+    [8,9,1,6,0,4,3,5,2,7],
+    [9,4,5,3,1,2,6,8,7,0],
+    [4,2,8,6,5,7,3,9,0,1],
+    [2,7,9,3,8,0,6,4,1,5],
+    [7,0,4,6,9,1,3,2,5,8]
+]
+_VERHOEFF_INV = [0,4,3,2,1,5,6,7,8,9]
+
+
 def verhoeff_check(num: str) -> bool:
     """Validate a numeric string using the Verhoeff algorithm (used for Aadhaar)."""
     try:
         s = _digits_only(num)
         if not s or not s.isdigit():
             return False
-        # multiplication table d
-        d_table = [
-            [0,1,2,3,4,5,6,7,8,9],
-            [1,2,3,4,0,6,7,8,9,5],
-            [2,3,4,0,1,7,8,9,5,6],
-            [3,4,0,1,2,8,9,5,6,7],
-            [4,0,1,2,3,9,5,6,7,8],
-            [5,9,8,7,6,0,4,3,2,1],
-            [6,5,9,8,7,1,0,4,3,2],
-            [7,6,5,9,8,2,1,0,4,3],
-            [8,7,6,5,9,3,2,1,0,4],
-            [9,8,7,6,5,4,3,2,1,0]
-        ]
-        # permutation table p
-        p_table = [
-            [0,1,2,3,4,5,6,7,8,9],
-            [1,5,7,6,2,8,3,0,9,4],
-            [5,8,0,3,7,9,6,1,4,2],
-            [8,9,1,6,0,4,3,5,2,7],
-            [9,4,5,3,1,2,6,8,7,0],
-            [4,2,8,6,5,7,3,9,0,1],
-            [2,7,9,3,8,0,6,4,1,5],
-            [7,0,4,6,9,1,3,2,5,8]
-        ]
-        # inverse table
-        inv = [0,4,3,2,1,5,6,7,8,9]
         c = 0
         # process digits from right to left
         for i, ch in enumerate(reversed(s)):
-            c = d_table[c][p_table[i % 8][int(ch)]]
+            c = _VERHOEFF_D[c][_VERHOEFF_P[i % 8][int(ch)]]
         return c == 0
     except Exception:
         return False
 
 
+# --- batch checksum validation ---------------------------------------------------------
+# luhn_check_many / verhoeff_check_many / iban_check_many return a boolean mask equal to
+# [*_check(c) for c in candidates].  ASCII candidates are normalised, grouped by length into
+# digit matrices and checked column by column with NumPy (luhn_mask, verhoeff_mask,
+# iban_mask take such matrices directly); anything else goes through the scalar check.
+
+_LUHN_DOUBLE = np.array([0, 2, 4, 6, 8, 1, 3, 5, 7, 9], dtype=np.int64)
+_VERHOEFF_D_NP = np.array(_VERHOEFF_D, dtype=np.intp)
+_VERHOEFF_P_NP = np.array(_VERHOEFF_P, dtype=np.intp)
+# ASCII byte -> IBAN value (digits 0-9, letters A=10 .. Z=35)
+_IBAN_VALUE = np.zeros(256, dtype=np.int64)
+_IBAN_VALUE[48:58] = np.arange(10)
+_IBAN_VALUE[65:91] = np.arange(10, 36)
+_IBAN_ALNUM = np.zeros(256, dtype=bool)
+_IBAN_ALNUM[48:58] = _IBAN_ALNUM[65:91] = True
+# every ASCII non-digit but NUL, the batch separator (deleting them == _digits_only for ASCII)
+_ASCII_NON_DIGITS = bytes(c for c in range(1, 128) if not 48 <= c <= 57)
+
+
+def luhn_mask(digits: np.ndarray) -> np.ndarray:
+    """Luhn test for each row of an (n, width) matrix of digit values."""
+    d = np.asarray(digits, dtype=np.int64)[:, ::-1]
+    return (d[:, 0::2].sum(axis=1) + _LUHN_DOUBLE[d[:, 1::2]].sum(axis=1)) % 10 == 0
+
+
+def verhoeff_mask(digits: np.ndarray) -> np.ndarray:
+    """Verhoeff test for each row of an (n, width) matrix of digit values."""
+    d = np.asarray(digits, dtype=np.intp)
+    width = d.shape[1]
+    c = np.zeros(len(d), dtype=np.intp)
+    for i in range(width):
+        c = _VERHOEFF_D_NP[c, _VERHOEFF_P_NP[i % 8, d[:, width - 1 - i]]]
+    return c == 0
+
+
+def iban_mask(values: np.ndarray) -> np.ndarray:
+    """mod-97 test for each row of an (n, width) matrix of rearranged IBAN values (0-35)."""
+    v = np.asarray(values, dtype=np.int64)
+    r = np.zeros(len(v), dtype=np.int64)
+    for j in range(v.shape[1]):
+        col = v[:, j]
+        # letters stand for two decimal digits, digits for one
+        r = np.where(col >= 10, r * 100 + col, r * 10 + col) % 97
+    return r == 1
+
+
+def _batch_by_length(cands, strip, mask_rows, scalar, lo, hi, valid=None):
+    """Shared driver of the *_check_many functions.
+
+    `strip` normalises all candidates (ASCII bytes, joined by NUL) in one call; results of equal length are
+    checked as a matrix by `mask_rows`, lengths outside [lo, hi] are rejected.  Non-ASCII
+    candidates, and rows with bytes the `valid` table rejects, are left to `scalar`.
+    """
+    cands = list(cands)
+    out = np.zeros(len(cands), dtype=bool)
+    if not cands:
+        return out
+    joined = '\0'.join(cands)
+    if not joined.isascii() or joined.count('\0') != len(cands) - 1:
+        plain = [i for i, c in enumerate(cands) if c.isascii() and '\0' not in c]
+        for i in sorted(set(range(len(cands))).difference(plain)):
+            out[i] = scalar(cands[i])
+        if plain:
+            out[plain] = _batch_by_length([cands[i] for i in plain], strip, mask_rows, scalar, lo, hi, valid)
+        return out
+    norm = strip(joined.encode('ascii')).split(b'\0')
+    lens = np.fromiter(map(len, norm), dtype=np.intp, count=len(norm))
+    flat = np.frombuffer(b''.join(norm), dtype=np.uint8)
+    starts = np.cumsum(lens) - lens
+    for width in np.unique(lens[(lens >= lo) & (lens <= hi)]).tolist():
+        rows = np.flatnonzero(lens == width)
+        mat = flat[starts[rows, None] + np.arange(width)]
+        if valid is not None:
+            ok = valid[mat].all(axis=1)
+            for i in rows[~ok].tolist():
+                out[i] = scalar(cands[i])
+            rows, mat = rows[ok], mat[ok]
+        out[rows] = mask_rows(mat)
+    return out
+
+
+def _iban_rows(rows):
+    # move the country code and check digits to the end, as iban_check does
+    return iban_mask(_IBAN_VALUE[np.concatenate([rows[:, 4:], rows[:, :4]], axis=1)])
+
+
+def _strip_non_digits(joined: bytes) -> bytes:
+    return joined.translate(None, _ASCII_NON_DIGITS)
+
+
+def _iban_normalise(joined: bytes) -> bytes:
+    return joined.replace(b' ', b'').upper()
+
+
+def luhn_check_many(nums) -> np.ndarray:
+    """Batch luhn_check over a sequence of candidate strings."""
+    return _batch_by_length(nums, _strip_non_digits, lambda rows: luhn_mask(rows - 48), luhn_check, 13, 19)
+
+
+def verhoeff_check_many(nums) -> np.ndarray:
+    """Batch verhoeff_check over a sequence of candidate strings."""
+    return _batch_by_length(nums, _strip_non_digits, lambda rows: verhoeff_mask(rows - 48), verhoeff_check, 1, 1 << 30)
+
+
+def iban_check_many(ibans) -> np.ndarray:
+    """Batch iban_check over a sequence of candidate strings."""
+    return _batch_by_length(ibans, _iban_normalise, _iban_rows, iban_check, 5, 1 << 30, valid=_IBAN_ALNUM)
+
+
 _CONTEXT_TOKENS = {
     'account': ['account', 'acct', 'iban', 'routing', 'bank', 'acct no', 'account no', 'accno'],
     'card': ['card', 'credit', 'visa', 'mastercard', 'amex', 'cvv', 'card number'],
@@ -455,6 +1083,10 @@ _CONTEXT_TOKENS['routing'] = ['routing', 'aba', 'routing number', 'sort code']
 _CONTEXT_TOKENS['biometric'] = ['fingerprint', 'retina', 'iris', 'voice', 'dna', 'biometric', 'facial']
 _CONTEXT_TOKENS['phone'] = ['phone', 'tel', 'mobile', 'msisdn', 'contact']
 _CONTEXT_TOKENS['aadhaar'] = ['aadhaar', 'aadhar', 'uid']
+# short-window context used by the scanner for bare digit words
+_CONTEXT_TOKENS['ssn_digits'] = ['ssn', 'social security', 'ssn:']
+_CONTEXT_TOKENS['cvv'] = ['cvv', 'cvc', 'security code', 'cvv:']
+_CONTEXT_TOKENS['pin'] = ['pin', 'passcode', 'pin:']
 
 
 def _has_context(text: str, start: int, end: int, tokens: list, window: int = 80) -> bool:
@@ -467,330 +1099,1670 @@ def _has_context(text: str, start: int, end: int, tokens: list, window: int = 80
     return False
 
 
-def scan_text_for_sensitive_data(text: str, require_context_for=('acc',)) -> list:
-    """Return list of matches: {'category','match','start','end'}"""
-    out = []
-    if not text:
+class _ContextIndex:
+    """Every _CONTEXT_TOKENS occurrence in one text, collected once on first use.
+
+    `near(kind, start, end, window)` answers the same question as `_has_context` with the
+    kind's token list (is a whole token inside text[start-window:end+window]) by a binary
+    search over the sorted occurrences instead of slicing and lowercasing a window per
+    candidate; `near_many` does the same for arrays of candidates at once.  One index
+    serves every rule of a scan.
+    """
+    __slots__ = ('_text', '_starts', '_min_ends')
+
+    def __init__(self, text: str):
+        self._text = text
+        self._starts = None
+        self._min_ends = None
+
+    def _build(self):
+        text = self._text
+        # _has_context lowercases with str.lower(); only U+0130 changes length there, and it
+        # lowercases to 'i' + a combining dot, which no token can match, so blank it out
+        low = (text.replace('\u0130', '\x00') if '\u0130' in text else text).lower()
+        found = {}
+        for tok in _CONTEXT_TOKEN_SET:
+            # step one character past each hit so overlapping occurrences are all kept
+            hits = []
+            i = low.find(tok)
+            while i != -1:
+                hits.append(i)
+                i = low.find(tok, i + 1)
+            found[tok] = hits
+        starts = {}
+        min_ends = {}
+        for kind, toks in _CONTEXT_TOKENS.items():
+            occ = np.array(sorted((i, i + len(tok)) for tok in toks for i in found[tok]), dtype=np.int64).reshape(-1, 2)
+            starts[kind] = occ[:, 0]
+            # min_ends[i] is the smallest end of any occurrence from i onwards, so "a token
+            # starts at or after lo and ends by hi" is one bisect and one comparison
+            min_ends[kind] = np.minimum.accumulate(occ[::-1, 1])[::-1]
+        self._starts = starts
+        self._min_ends = min_ends
+
+    def near_many(self, kind: str, start, end, window: int = 80):
+        """Boolean array: does each (start[i], end[i]) candidate have a `kind` token nearby."""
+        if self._starts is None:
+            self._build()
+        starts = self._starts[kind]
+        start = np.asarray(start, dtype=np.int64)
+        out = np.zeros(len(start), dtype=bool)
+        if not len(starts) or not len(start):
+            return out
+        idx = np.searchsorted(starts, start - window, side='left')
+        inside = idx < len(starts)
+        hi = np.minimum(np.asarray(end, dtype=np.int64) + window, len(self._text))
+        out[inside] = self._min_ends[kind][idx[inside]] <= hi[inside]
         return out
-    # emails
-    for m in EMAIL_RE.finditer(text):
-        out.append({'category': 'email', 'match': m.group(0), 'start': m.start(), 'end': m.end()})
-    # phones
-    for m in PHONE_RE.finditer(text):
-        # include obvious phone matches (contain separators or leading +) or require context
-        s = m.group(0)
-        if s.strip().startswith('+') or _has_context(text, m.start(), m.end(), _CONTEXT_TOKENS.get('phone', []), window=40):
-            out.append({'category': 'phone', 'match': s, 'start': m.start(), 'end': m.end()})
-    # also catch E.164-like sequences but require context unless a + is present
-    for m in E164_RE.finditer(text):
-        s = m.group(0)
-        if s.startswith('+') or _has_context(text, m.start(), m.end(), _CONTEXT_TOKENS.get('phone', []), window=40):
-            out.append({'category': 'phone', 'match': s, 'start': m.start(), 'end': m.end()})
-    # IBAN
-    for m in IBAN_RE.finditer(text):
-        if iban_check(m.group(0)):
-            out.append({'category': 'iban', 'match': m.group(0), 'start': m.start(), 'end': m.end()})
-    # credit cards (use Luhn)
-    for m in CARD_RE.finditer(text):
-        candidate = _digits_only(m.group(0))
-        if luhn_check(candidate):
-            out.append({'category': 'credit_card', 'match': m.group(0), 'start': m.start(), 'end': m.end()})
-    # SSN (US) patterns
-    for m in SSN_RE.finditer(text):
-        out.append({'category': 'ssn', 'match': m.group(0), 'start': m.start(), 'end': m.end()})
-    for m in SSN_RE2.finditer(text):
-        # numeric-only 9-digit could be SSN but check context
-        if _has_context(text, m.start(), m.end(), ['ssn', 'social security', 'ssn:'], window=50):
-            out.append({'category': 'ssn', 'match': m.group(0), 'start': m.start(), 'end': m.end()})
-    # PAN (India)
-    for m in PAN_RE.finditer(text):
-        out.append({'category': 'pan', 'match': m.group(0), 'start': m.start(), 'end': m.end()})
-    # Aadhaar (India) 12-digit - validate with Verhoeff checksum when possible
-    for m in AADHAAR_RE.finditer(text):
-        digits = _digits_only(m.group(0))
-        if verhoeff_check(digits):
-            out.append({'category': 'aadhaar', 'match': m.group(0), 'start': m.start(), 'end': m.end()})
-    # CVV / PIN: only include when context nearby mentions cvv/pin/cvc
-    for m in CVV_RE.finditer(text):
-        if _has_context(text, m.start(), m.end(), ['cvv', 'cvc', 'security code', 'cvv:'], window=20):
-            out.append({'category': 'cvv', 'match': m.group(0), 'start': m.start(), 'end': m.end()})
-    for m in PIN_RE.finditer(text):
-        if _has_context(text, m.start(), m.end(), ['pin', 'passcode', 'pin:'], window=20):
-            out.append({'category': 'pin', 'match': m.group(0), 'start': m.start(), 'end': m.end()})
-    # masked card numbers like **** **** **** 1234
-    for m in MASKED_CARD_RE.finditer(text):
-        out.append({'category': 'credit_card_masked', 'match': m.group(0), 'start': m.start(), 'end': m.end()})
-    # JWT-like tokens and high-entropy strings (credentials/secrets)
-    for m in JWT_RE.finditer(text):
-        out.append({'category': 'jwt', 'match': m.group(0), 'start': m.start(), 'end': m.end()})
-    for m in API_KEY_RE.finditer(text):
-        tok = m.group(0)
-        if len(tok) >= 20 or _shannon_entropy(tok) > 4.0:
-            out.append({'category': 'api_key', 'match': tok, 'start': m.start(), 'end': m.end()})
-    # Credentials: look for password patterns like 'password: xyz' or 'pwd='
-    for m in re.finditer(r"(?:password|pwd|pass|secret)\s*[:=]\s*(\S{4,})", text, re.IGNORECASE):
-        out.append({'category': 'credential', 'match': m.group(1), 'start': m.start(1), 'end': m.end(1)})
-    # Health / PHI heuristics: keyword detection
-    health_keywords = ['medical', 'patient', 'diagnosis', 'prescription', 'mrn', 'medical record', 'lab result']
-    for hk in health_keywords:
-        for m in re.finditer(re.escape(hk), text, re.IGNORECASE):
-            # include surrounding line
-            lo = max(0, text.rfind('\n', 0, m.start()))
-            hi = text.find('\n', m.end())
-            if hi == -1: hi = min(len(text), m.end() + 120)
-            snippet = text[lo:hi].strip()
-            out.append({'category': 'health_info', 'match': snippet, 'start': lo, 'end': hi})
-    # account-like numbers (require nearby context to reduce false positives)
-    for pat in (ACC_RE, ACC_GENERIC_RE):
-        for m in pat.finditer(text):
-            if _has_context(text, m.start(), m.end(), _CONTEXT_TOKENS.get('account', []), window=60):
-                out.append({'category': 'account', 'match': m.group(0), 'start': m.start(), 'end': m.end()})
-    # routing numbers (9-digit) - require context
-    for m in ROUTING_RE.finditer(text):
-        if _has_context(text, m.start(), m.end(), _CONTEXT_TOKENS.get('routing', []), window=60):
-            out.append({'category': 'routing', 'match': m.group(0), 'start': m.start(), 'end': m.end()})
-    # sort codes (UK) - require context
-    for m in SORTCODE_RE.finditer(text):
-        if _has_context(text, m.start(), m.end(), _CONTEXT_TOKENS.get('routing', []), window=60):
-            out.append({'category': 'sort_code', 'match': m.group(0), 'start': m.start(), 'end': m.end()})
-    # generic digit sequences (long) - include only with context
-    for m in DIGITSEQ_RE.finditer(text):
-        if _has_context(text, m.start(), m.end(), _CONTEXT_TOKENS.get('account', []), window=60):
-            out.append({'category': 'digit_sequence', 'match': m.group(0), 'start': m.start(), 'end': m.end()})
-    # API keys / high-entropy tokens (simple heuristic)
-    for m in API_KEY_RE.finditer(text):
-        tok = m.group(0)
-        if len(tok) >= 20:
-            out.append({'category': 'api_key', 'match': tok, 'start': m.start(), 'end': m.end()})
-    # OTP / two-factor codes: only include when nearby context suggests OTP/2FA
-    for m in OTP_RE.finditer(text):
-        if _has_context(text, m.start(), m.end(), _CONTEXT_TOKENS.get('otp', []), window=30):
-            out.append({'category': 'otp', 'match': m.group(0), 'start': m.start(), 'end': m.end()})
-    # SWIFT/BIC
-    for m in SWIFT_RE.finditer(text):
-        out.append({'category': 'swift', 'match': m.group(0), 'start': m.start(), 'end': m.end()})
-    # IFSC / bank codes (India)
-    for m in IFSC_RE.finditer(text):
-        out.append({'category': 'ifsc', 'match': m.group(0), 'start': m.start(), 'end': m.end()})
-    # biometric / passport / driver's license heuristics
-    for kw in BIOMETRIC_KEYWORDS:
-        for m in re.finditer(re.escape(kw), text, re.IGNORECASE):
-            lo = max(0, text.rfind('\n', 0, m.start()))
-            hi = text.find('\n', m.end())
-            if hi == -1: hi = min(len(text), m.end() + 120)
-            snippet = text[lo:hi].strip()
-            out.append({'category': 'biometric', 'match': snippet, 'start': lo, 'end': hi})
-    # passports / driver's license: look for nearby keywords and an alnum token
-    for m in re.finditer(r"passport\s*[:#\-]?\s*([A-Z0-9\-]{6,9})", text, re.IGNORECASE):
-        out.append({'category': 'passport', 'match': m.group(1), 'start': m.start(1), 'end': m.end(1)})
-    for m in re.finditer(r"driver(?:'s)?\s+licen[cs]e\s*[:#\-]?\s*([A-Z0-9\-]{5,12})", text, re.IGNORECASE):
-        out.append({'category': 'driver_license', 'match': m.group(1), 'start': m.start(1), 'end': m.end(1)})
-    return out
 
+    def near(self, kind: str, start: int, end: int, window: int = 80) -> bool:
+        return bool(self.near_many(kind, [start], [end], window)[0])
 
-def mask_email_addr(s: str) -> str:
-    try:
-        parts = s.split('@', 1)
-        if len(parts) != 2:
-            return s
-        local, domain = parts
-        if not local:
-            return s
-        return ('*' * max(3, len(local))) + '@' + domain
-    except Exception:
-        return s
 
+_CONTEXT_TOKEN_SET = sorted({tok for toks in _CONTEXT_TOKENS.values() for tok in toks})
 
-def preview_pdf_first_page(data: bytes, zoom: float = 2.0) -> bytes:
-    # Render all pages and concatenate vertically into one PNG
-    doc = fitz.open(stream=data, filetype="pdf")
-    images = []
-    try:
-        for pno in range(len(doc)):
-            page = doc.load_page(pno)
-            mat = fitz.Matrix(zoom, zoom)
-            pix = page.get_pixmap(matrix=mat)
-            img = Image.open(io.BytesIO(pix.tobytes("png"))).convert("RGB")
-            images.append(img)
-        if not images:
-            return b""
-        # concatenate vertically
-        widths = [im.width for im in images]
-        heights = [im.height for im in images]
-        maxw = max(widths)
-        totalh = sum(heights)
-        out_img = Image.new('RGB', (maxw, totalh), color='white')
-        y = 0
-        for im in images:
-            out_img.paste(im, (0, y))
-            y += im.height
-        out = io.BytesIO()
-        out_img.save(out, format='PNG')
-        return out.getvalue()
-    finally:
-        doc.close()
-
-
-def detect_pdf_bytes(data: bytes):
-    doc = fitz.open(stream=data, filetype="pdf")
-    results = []
-    for pno in range(len(doc)):
-        page = doc.load_page(pno)
-        text = page.get_text()
-        matches = []
-        for m in scan_text_for_sensitive_data(text):
-            txt = m.get('match')
-            try:
-                areas = page.search_for(txt)
-                if areas:
-                    for r in areas:
-                        matches.append({"text": txt, "rect": [r.x0, r.y0, r.x1, r.y1], "category": m.get('category')})
-                else:
-                    # fallback: use word boxes and sliding-window to find multi-word matches
-                    try:
-                        words = page.get_text("words")
-                        import re as _re
-                        phrase_norm = _re.sub(r"\s+", " ", _re.sub(r"[^\w\s]", " ", txt)).strip().lower()
-                        if words and phrase_norm:
-                            norm_words = [_re.sub(r"[^\w]", "", w[4]).lower() for w in words]
-                            pw = [pw for pw in phrase_norm.split() if pw]
-                            plen = len(pw)
-                            if plen > 0:
-                                for i in range(0, max(0, len(norm_words) - 0)):
-                                    found_any = False
-                                    for end in range(i + 1, min(len(norm_words), i + plen + 6) + 1):
-                                        seq = norm_words[i:end]
-                                        joined = " ".join(seq)
-                                        if pw == seq or phrase_norm in joined or joined in phrase_norm:
-                                            try:
-                                                x0 = min(words[k][0] for k in range(i, end))
-                                                y0 = min(words[k][1] for k in range(i, end))
-                                                x1 = max(words[k][2] for k in range(i, end))
-                                                y1 = max(words[k][3] for k in range(i, end))
-                                                matches.append({"text": txt, "rect": [x0, y0, x1, y1], "category": m.get('category')})
-                                                found_any = True
-                                                break
-                                            except Exception:
-                                                continue
-                                    if found_any:
-                                        break
-                    except Exception:
-                        pass
-            except Exception:
-                continue
-        if matches:
-            results.append({"page": pno, "matches": matches})
-    doc.close()
-    return results
 
+# --- compiled detector engine ---------------------------------------------------------
+# The scanner used to run one finditer pass per pattern plus one per health/biometric
+# keyword (~40 passes over the same text).  The engine collapses them into a few passes
+# whose hits are dispatched to per-rule validators:
+#   * a keyword automaton over the lowercased text finds every literal-led rule (health and
+#     biometric keywords, password/passport/driver's licence, JWT, masked cards); each hit
+#     is confirmed with the rule's own pattern at that offset;
+#   * the whole-word letter rules (IBAN, SWIFT, PAN, IFSC) never match the same word, so
+#     they share one named-group pattern;
+#   * the digit-led rules only ever match inside runs of digits/separators, so they run over
+#     a packed "numeric view" of the text; every `\b\d{m,n}\b` rule (CVV, PIN, OTP, account,
+#     routing, 9-digit SSN, digit sequence) is one digit-word pass dispatched by length;
+#   * API_KEY_RE runs once and feeds both api_key rules.
+# Hits land in per-rule buckets that are concatenated in _SCAN_RULES order, so categories,
+# offsets and ordering are exactly what the old per-pattern loops produced.
+#
+# Which rules run is decided by a ScanPlan (see compile_scan_plan): a plan only compiles and
+# runs the passes its categories need, and inside a pass cheap filters (length, leading '+')
+# run before context lookups, which run before checksum/entropy validators.
 
-def detect_docx_bytes(data: bytes):
-    buf = io.BytesIO(data)
-    doc = Document(buf)
-    found = []
-    # check paragraphs
-    for p in doc.paragraphs:
-        t = p.text
-        for m in scan_text_for_sensitive_data(t):
-            found.append({'match': m.get('match'), 'category': m.get('category')})
-    # check tables (cells)
-    try:
-        for table in doc.tables:
-            for row in table.rows:
-                for cell in row.cells:
-                    t = cell.text
-                    for m in scan_text_for_sensitive_data(t):
-                        found.append({'match': m.get('match'), 'category': m.get('category')})
-    except Exception:
-        pass
-    # also report embedded images (filenames) if present
-    imgs = []
-    img_matches = []
-    try:
-        # inspect package for word/media
-        import zipfile
-        z = zipfile.ZipFile(io.BytesIO(data))
-        for name in z.namelist():
-            if name.startswith('word/media/'):
-                base = name.split('/')[-1]
-                imgs.append(base)
-                # attempt OCR on embedded image if pytesseract available
-                try:
-                    raw = z.read(name)
-                    if pytesseract is not None:
-                        det = detect_image_bytes(raw)
-                        if isinstance(det, dict):
-                            matches = det.get('matches', [])
-                            ft = det.get('full_text', '')
-                        else:
-                            matches = det
-                            ft = ''
-                        if matches:
-                            img_matches.append({'image': base, 'matches': matches, 'full_text': ft})
-                except Exception:
-                    pass
-        z.close()
-    except Exception:
-        pass
-    # dedupe while preserving order
-    seen = set()
-    unique = []
-    for it in found:
-        try:
-            if isinstance(it, dict):
-                key = (it.get('match'), it.get('category'))
-            else:
-                key = (it, None)
-        except Exception:
-            key = (str(it), None)
-        if key not in seen:
-            seen.add(key)
-            unique.append(it)
-    return {'text_matches': unique, 'images': imgs, 'image_matches': img_matches}
+HEALTH_KEYWORDS = ['medical', 'patient', 'diagnosis', 'prescription', 'mrn', 'medical record', 'lab result']
+CREDENTIAL_RE = re.compile(r"(?:password|pwd|pass|secret)\s*[:=]\s*(\S{4,})", re.IGNORECASE)
+PASSPORT_CTX_RE = re.compile(r"passport\s*[:#\-]?\s*([A-Z0-9\-]{6,9})", re.IGNORECASE)
+DL_CTX_RE = re.compile(r"driver(?:'s)?\s+licen[cs]e\s*[:#\-]?\s*([A-Z0-9\-]{5,12})", re.IGNORECASE)
+DIGIT_WORD_RE = re.compile(r"\b\d+\b")
 
+# detector registry: every rule (one former finditer loop) and the category it reports.
+# Dict order is the legacy output order.
+_RULE_CATEGORY = {
+    'email': 'email', 'phone': 'phone', 'phone_e164': 'phone', 'iban': 'iban',
+    'credit_card': 'credit_card', 'ssn': 'ssn', 'ssn_digits': 'ssn', 'pan': 'pan',
+    'aadhaar': 'aadhaar', 'cvv': 'cvv', 'pin': 'pin', 'credit_card_masked': 'credit_card_masked',
+    'jwt': 'jwt', 'api_key': 'api_key', 'credential': 'credential',
+    **{'health:' + kw: 'health_info' for kw in HEALTH_KEYWORDS},
+    'account': 'account', 'account_generic': 'account', 'routing': 'routing', 'sort_code': 'sort_code',
+    'digit_sequence': 'digit_sequence', 'api_key_long': 'api_key', 'otp': 'otp', 'swift': 'swift',
+    'ifsc': 'ifsc',
+    **{'biometric:' + kw: 'biometric' for kw in BIOMETRIC_KEYWORDS},
+    'passport': 'passport', 'driver_license': 'driver_license',
+    'denylist': 'denylist',
+}
+_SCAN_RULES = tuple(_RULE_CATEGORY)
+DETECTOR_CATEGORIES = tuple(dict.fromkeys(_RULE_CATEGORY.values()))
 
-def detect_xlsx_bytes(data: bytes):
-    buf = io.BytesIO(data)
-    wb = load_workbook(filename=buf)
-    found = []
-    for ws in wb.worksheets:
-        for row in ws.iter_rows(values_only=False):
-            for cell in row:
-                val = cell.value
-                if not isinstance(val, str):
-                    continue
-                for m in scan_text_for_sensitive_data(val):
-                    found.append({"sheet": ws.title, "cell": cell.coordinate, "match": m.get('match'), 'category': m.get('category')})
-    # also list images in xl/media
-    imgs = []
-    img_matches = []
-    try:
-        import zipfile
-        z = zipfile.ZipFile(io.BytesIO(data))
-        for name in z.namelist():
-            if name.startswith('xl/media/'):
-                base = name.split('/')[-1]
-                imgs.append(base)
+# the letter rules without their \b anchors
+_LETTER_PATTERNS = {
+    'iban': IBAN_RE.pattern[2:-2],
+    'swift': SWIFT_RE.pattern[2:-2],
+    'pan': PAN_RE.pattern[2:-2],
+    'ifsc': "(?i:" + IFSC_RE.pattern[2:-2] + ")",
+}
+
+# literal-led rules: (rule, pattern, capture group or None for the whole line, lowercase leads)
+_KEYWORD_RULES = (
+    [('health:' + kw, re.compile(re.escape(kw), re.IGNORECASE), None, (kw,)) for kw in HEALTH_KEYWORDS]
+    + [('biometric:' + kw, re.compile(re.escape(kw), re.IGNORECASE), None, (kw,)) for kw in BIOMETRIC_KEYWORDS]
+    + [('credential', CREDENTIAL_RE, 1, ('pwd', 'pass', 'secret')),
+       ('passport', PASSPORT_CTX_RE, 1, ('passport',)),
+       ('driver_license', DL_CTX_RE, 1, ('driver',)),
+       ('jwt', JWT_RE, 0, ('eyj',)),
+       ('credit_card_masked', MASKED_CARD_RE, 0, ('****',))]
+)
+# non-ASCII characters that IGNORECASE matches against ASCII letters but str.lower() does not
+# fold to ASCII (U+0130 also changes length when lowercased)
+_CASE_ODDITIES = ('İ', 'ı', 'ſ')
+_CASE_FOLD_TABLE = str.maketrans({'İ': 'i', 'ı': 'i', 'ſ': 's', 'K': 'k'})
+
+# every digit-led rule (PHONE, E164, CARD, SSN, AADHAAR, ACC_GENERIC, SORTCODE, digit
+# words) starts at a digit or a '+' right before one, and only consumes these characters
+_NUMERIC_RUN_RE = re.compile(r"\d[\d\s\-\(\)\+]*")
+
+_PASS_RULES = {
+    'keywords': frozenset(r[0] for r in _KEYWORD_RULES),
+    'letters': frozenset(_LETTER_PATTERNS),
+    'tokens': frozenset({'email', 'api_key', 'api_key_long'}),
+    'numeric': frozenset({'phone', 'phone_e164', 'credit_card', 'ssn', 'aadhaar', 'account_generic', 'sort_code',
+                          'ssn_digits', 'routing', 'cvv', 'pin', 'otp', 'account', 'digit_sequence'}),
+    'dictionary': frozenset({'denylist'}),
+}
+
+
+class ScanPlan:
+    """A compiled choice of detector categories for scan_text_for_sensitive_data.
+
+    Build plans with compile_scan_plan() / resolve_scan_plan(), which cache them; a plan only
+    carries the passes, patterns and keyword leads its categories need.
+    """
+    __slots__ = ('categories', 'rules', 'passes', 'letter_re', 'keyword_rules', 'keyword_re', 'keyword_leads')
+
+    def __init__(self, categories):
+        self.categories = frozenset(categories)
+        self.rules = frozenset(r for r, c in _RULE_CATEGORY.items() if c in self.categories)
+        # cheapest passes first; the numeric pass carries the context and checksum work
+        self.passes = tuple(p for p in ('keywords', 'letters', 'tokens', 'dictionary', 'numeric') if _PASS_RULES[p] & self.rules)
+        letters = [k for k in _LETTER_PATTERNS if k in self.rules]
+        self.letter_re = None
+        if letters:
+            # the leading class lets the engine skip ahead (it also lists the non-ASCII
+            # letters that IGNORECASE folds onto A-Z, for IFSC)
+            self.letter_re = re.compile(
+                "(?=[A-Za-zİıſK])\\b(?:" + "|".join(f"(?P<{k}>{_LETTER_PATTERNS[k]})" for k in letters) + ")\\b")
+        self.keyword_rules = tuple(r for r in _KEYWORD_RULES if r[0] in self.rules)
+        self.keyword_re = None
+        if self.keyword_rules:
+            leads = sorted({lead for r in self.keyword_rules for lead in r[3]}, key=len, reverse=True)
+            self.keyword_re = re.compile("|".join(re.escape(k) for k in leads))
+        # lead -> rules to try where it matched; the automaton reports the longest lead at a
+        # position, so a lead also brings the rules of the shorter leads it starts with
+        self.keyword_leads = {
+            lead: tuple(r for r in self.keyword_rules if any(lead.startswith(k) for k in r[3]))
+            for r0 in self.keyword_rules for lead in r0[3]
+        }
+
+    def __repr__(self):
+        return f"ScanPlan({sorted(self.categories)})"
+
+    def __reduce__(self):
+        # sent to worker processes as its categories; they rebuild (and cache) the plan
+        return compile_scan_plan, (sorted(self.categories),)
+
+
+@lru_cache(maxsize=128)
+def _compile_plan(categories: frozenset) -> ScanPlan:
+    return ScanPlan(categories)
+
+
+def compile_scan_plan(categories=None) -> ScanPlan:
+    """Return the cached plan for an iterable of categories (None means every category)."""
+    if categories is None:
+        return _compile_plan(frozenset(DETECTOR_CATEGORIES))
+    cats = frozenset(categories)
+    unknown = cats.difference(DETECTOR_CATEGORIES)
+    if unknown:
+        raise ValueError(f"unknown detector categories: {', '.join(sorted(unknown))}")
+    return _compile_plan(cats)
+
+
+# named server-side profiles; REDACT_SCAN_PROFILES may point at a JSON file of extra ones
+SCAN_PROFILES = {
+    'all': list(DETECTOR_CATEGORIES),
+    'contact': ['email', 'phone'],
+    'payments': ['credit_card', 'credit_card_masked', 'cvv', 'pin', 'iban', 'swift', 'ifsc', 'account', 'routing', 'sort_code'],
+    'identity': ['ssn', 'pan', 'aadhaar', 'passport', 'driver_license'],
+    'secrets': ['api_key', 'jwt', 'credential', 'otp'],
+    'health': ['health_info', 'biometric'],
+}
+try:
+    if os.environ.get('REDACT_SCAN_PROFILES'):
+        with open(os.environ['REDACT_SCAN_PROFILES'], encoding='utf-8') as fh:
+            SCAN_PROFILES.update(json.load(fh))
+except Exception as e:
+    print(f"[redact] could not load REDACT_SCAN_PROFILES: {e}")
+
+
+def resolve_scan_plan(categories=None, profile: str = None):
+    """Plan for a request: explicit categories (list or comma-separated string) and/or a profile.
+
+    Returns None when neither is given (scan everything); raises ValueError for unknown names.
+    """
+    if isinstance(categories, str):
+        categories = [c.strip() for c in categories.split(',') if c.strip()]
+    if not categories and not profile:
+        return None
+    chosen = set(categories or [])
+    if profile:
+        if profile not in SCAN_PROFILES:
+            raise ValueError(f"unknown detection profile: {profile}")
+        chosen.update(SCAN_PROFILES[profile])
+    return compile_scan_plan(chosen)
+
+
+class _NumericView:
+    """The digit-bearing runs of a text packed into one string.
+
+    Each run keeps one character on either side (a leading '+', or context so `\b` behaves
+    as in the full text).  Digit-led patterns cannot consume that context, so matches never
+    span two runs; `find()` maps matches in the packed string back to original offsets.
+    """
+    __slots__ = ('text', '_starts', '_shifts')
+
+    def __init__(self, text: str):
+        n = len(text)
+        spans = [(s - 1 if s else s, e + 1 if e < n else e) for s, e in map(re.Match.span, _NUMERIC_RUN_RE.finditer(text))]
+        pieces = [text[s:e] for s, e in spans]
+        starts = list(accumulate(map(len, pieces), initial=0))
+        self.text = ''.join(pieces)
+        self._starts = starts
+        self._shifts = [s - p for (s, _), p in zip(spans, starts)]
+
+    def find(self, pattern):
+        """Original start and end offsets of every match of `pattern`, as two int arrays."""
+        flat = np.fromiter(chain.from_iterable(map(re.Match.span, pattern.finditer(self.text))), dtype=np.int64)
+        spans = flat.reshape(-1, 2)
+        if len(spans):
+            blocks = np.searchsorted(self._starts, spans[:, 0], side='right') - 1
+            spans = spans + np.asarray(self._shifts, dtype=np.int64)[blocks][:, None]
+        return spans[:, 0], spans[:, 1]
+
+
+def _lowered(text: str) -> str:
+    """Lowercase with offsets preserved and IGNORECASE's ASCII folding (for literal search)."""
+    if any(ch in text for ch in _CASE_ODDITIES):
+        return text.translate(_CASE_FOLD_TABLE).lower()
+    return text.lower()
+
+
+def _line_snippet(text: str, start: int, end: int):
+    lo = max(0, text.rfind('\n', 0, start))
+    hi = text.find('\n', end)
+    if hi == -1: hi = min(len(text), end + 120)
+    return text[lo:hi].strip(), lo, hi
+
+
+def _jwt_dead_end(text: str, pos: int) -> int:
+    # JWT_RE failed at pos.  Its first segment cannot contain '.', so every later start in the
+    # same token run ends that segment at the same place; if the rest cannot match there,
+    # none of those starts can either (without this, 'eyJ-eyJ-eyJ-...' is quadratic)
+    r = _JWT_SEGMENT_RE.match(text, pos).end()
+    return r if _JWT_TAIL_RE.match(text, r) is None else pos
+
+
+# rule -> fn(text, pos) giving the position before which the rule cannot match, once it failed at pos
+_KEYWORD_DEAD_ENDS = {'jwt': _jwt_dead_end}
+# how many keyword hits between two looks at the scan budget
+_BUDGET_STRIDE = 1024
+
+
+def _scan_keywords(text: str, emit, plan: ScanPlan, budget=None):
+    low = _lowered(text)
+    automaton = plan.keyword_re
+    leads = plan.keyword_leads
+    resume = {}
+    hits = 0
+    hit = automaton.search(low)
+    while hit is not None:
+        pos = hit.start()
+        hits += 1
+        if budget is not None and hits % _BUDGET_STRIDE == 0 and budget.spent():
+            return
+        for name, pat, group, _ in leads[hit.group(0)]:
+            if pos < resume.get(name, 0):
+                continue
+            m = pat.match(text, pos)
+            if m is None:
+                dead_end = _KEYWORD_DEAD_ENDS.get(name)
+                if dead_end is not None:
+                    resume[name] = dead_end(text, pos)
+                continue
+            # finditer semantics: the next match of this rule starts after this one
+            resume[name] = m.end()
+            if group is None:
+                snippet, lo, hi = _line_snippet(text, m.start(), m.end())
+                emit(name, snippet, lo, hi, m.start(), m.end())
+            else:
+                emit(name, m.group(group), m.start(group), m.end(group))
+        # step one character, not past the hit, so overlapping keywords are all seen
+        hit = automaton.search(low, pos + 1)
+
+
+def _scan_letter_words(text: str, emit, plan: ScanPlan, budget=None):
+    # IBAN candidates are checksummed later, in one batch (see _CHECKSUM_RULES)
+    for m in plan.letter_re.finditer(text):
+        emit(m.lastgroup, m.group(0), m.start(), m.end())
+
+
+def _emit_where(text: str, emit, rule: str, starts, ends, mask):
+    for i in np.flatnonzero(mask).tolist():
+        s = int(starts[i]); e = int(ends[i])
+        emit(rule, text[s:e], s, e)
+
+
+def _near_where(ctx, kind: str, starts, ends, window: int, mask):
+    """Context lookup only for the candidates the cheaper filters in `mask` let through."""
+    out = np.zeros(len(starts), dtype=bool)
+    idx = np.flatnonzero(mask)
+    if len(idx):
+        out[idx] = ctx.near_many(kind, starts[idx], ends[idx], window)
+    return out
+
+
+def _scan_numeric(text: str, emit, plan: ScanPlan, budget=None):
+    view = _NumericView(text)
+    if not view.text:
+        return
+    ctx = _ContextIndex(text)
+    rules = plan.rules
+    # phones: obvious ones (leading +) or with nearby context
+    for rule, pat in (('phone', PHONE_RE), ('phone_e164', E164_RE)):
+        if rule in rules:
+            s, e = view.find(pat)
+            plus = np.fromiter((text[i] == '+' for i in s.tolist()), dtype=bool, count=len(s))
+            _emit_where(text, emit, rule, s, e, plus | _near_where(ctx, 'phone', s, e, 40, ~plus))
+    # card and Aadhaar candidates are checksummed later, in one batch
+    if 'credit_card' in rules:
+        s, e = view.find(CARD_RE)
+        _emit_where(text, emit, 'credit_card', s, e, np.ones(len(s), dtype=bool))
+    if 'ssn' in rules:
+        s, e = view.find(SSN_RE)
+        _emit_where(text, emit, 'ssn', s, e, np.ones(len(s), dtype=bool))
+    if 'aadhaar' in rules:
+        s, e = view.find(AADHAAR_RE)
+        _emit_where(text, emit, 'aadhaar', s, e, np.ones(len(s), dtype=bool))
+    if 'account_generic' in rules:
+        s, e = view.find(ACC_GENERIC_RE)
+        _emit_where(text, emit, 'account_generic', s, e, ctx.near_many('account', s, e, 60))
+    if 'sort_code' in rules:
+        s, e = view.find(SORTCODE_RE)
+        _emit_where(text, emit, 'sort_code', s, e, ctx.near_many('routing', s, e, 60))
+    # digit words, dispatched by length to every `\b\d{m,n}\b` rule
+    if rules.isdisjoint(('ssn_digits', 'routing', 'cvv', 'pin', 'otp', 'account', 'digit_sequence')):
+        return
+    s, e = view.find(DIGIT_WORD_RE)
+    n = e - s
+    if 'ssn_digits' in rules:
+        _emit_where(text, emit, 'ssn_digits', s, e, _near_where(ctx, 'ssn_digits', s, e, 50, n == 9))
+    if 'routing' in rules:
+        _emit_where(text, emit, 'routing', s, e, _near_where(ctx, 'routing', s, e, 60, n == 9))
+    if 'cvv' in rules:
+        _emit_where(text, emit, 'cvv', s, e, _near_where(ctx, 'cvv', s, e, 20, (n >= 3) & (n <= 4)))
+    if 'pin' in rules:
+        _emit_where(text, emit, 'pin', s, e, _near_where(ctx, 'pin', s, e, 20, (n >= 4) & (n <= 6)))
+    if 'otp' in rules:
+        _emit_where(text, emit, 'otp', s, e, _near_where(ctx, 'otp', s, e, 30, (n >= 4) & (n <= 8)))
+    if 'account' in rules or 'digit_sequence' in rules:
+        account = _near_where(ctx, 'account', s, e, 60, n >= 7)
+        if 'account' in rules:
+            _emit_where(text, emit, 'account', s, e, account & (n >= 8) & (n <= 16))
+        if 'digit_sequence' in rules:
+            _emit_where(text, emit, 'digit_sequence', s, e, account)
+
+
+_EMAIL_LOCAL_CHARS = frozenset('abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789_.+-')
+_EMAIL_DOMAIN_RE = re.compile(EMAIL_RE.pattern.split('@', 1)[1])
+
+
+def _email_spans(text: str):
+    """(start, end) of every EMAIL_RE.finditer match, in linear time.
+
+    EMAIL_RE retries its local part from every position of a long run that never reaches an
+    '@' (quadratic).  Here the scan goes from each '@' back over the local-part characters to
+    the start of the run (or the end of the previous match): that is where finditer's
+    leftmost match would start, and the domain is matched forward from the '@'.
+    """
+    last = 0
+    at = text.find('@')
+    while at != -1:
+        start = at
+        while start > last and text[start - 1] in _EMAIL_LOCAL_CHARS:
+            start -= 1
+        m = _EMAIL_DOMAIN_RE.match(text, at + 1) if start < at else None
+        if m is None:
+            at = text.find('@', at + 1)
+            continue
+        yield start, m.end()
+        last = m.end()
+        at = text.find('@', last)
+
+
+def _scan_tokens(text: str, emit, plan: ScanPlan, budget=None):
+    rules = plan.rules
+    if 'email' in rules and '@' in text:
+        for start, end in _email_spans(text):
+            emit('email', text[start:end], start, end)
+    if 'api_key' in rules or 'api_key_long' in rules:
+        for m in API_KEY_RE.finditer(text):
+            tok = m.group(0)
+            # the length test is free; only short tokens pay for the entropy estimate
+            if 'api_key' in rules and (len(tok) >= 20 or _shannon_entropy(tok) > 4.0):
+                emit('api_key', tok, m.start(), m.end())
+            if 'api_key_long' in rules and len(tok) >= 20:
+                emit('api_key_long', tok, m.start(), m.end())
+
+
+# --- server-side dictionaries -----------------------------------------------------------
+# Deny/allow lists too large to send per request (millions of customer names, our own SWIFT
+# codes and support numbers) are compiled offline (compile_dictionary, tools/
+# compile_dictionary.py) into a sorted array of 64-bit hashes behind a small header.  The
+# files are memory-mapped, so every worker process shares the same page-cache copy.
+#   * deny entries are word sequences: text and entries are split into \w+ words and
+#     lowercased; every run of words whose length occurs in the file is hashed (a rolling
+#     hash over per-word hashes, vectorised) and probed with one searchsorted;
+#   * allow entries are compared whole, lowercased with non-alphanumerics removed
+#     ("+1 (800) 555-0100" == "18005550100"); matching detections are dropped.
+# Files live in REDACT_DICTIONARY_DIR; a changed directory is picked up at most every
+# REDACT_DICTIONARY_CHECK_SECONDS, or immediately through reload_dictionaries().
+
+_DICT_MAGIC = b'RDICT001'
+_DICT_HEADER = 64
+_DICT_WORD_RE = re.compile(r"\w+")
+_DICT_MULT = np.uint64(1099511628211)
+_DICT_NON_ALNUM_RE = re.compile(r"[\W_]+")
+_DICT_CHECK_SECONDS = float(os.environ.get('REDACT_DICTIONARY_CHECK_SECONDS', '30'))
+
+
+def _word_hash(word: str) -> int:
+    return int.from_bytes(hashlib.blake2b(word.encode('utf-8'), digest_size=8).digest(), 'little')
+
+
+def _sequence_hashes(word_hashes: np.ndarray, n: int) -> np.ndarray:
+    """Hash of every run of `n` consecutive words (uint64 arithmetic wraps around)."""
+    count = len(word_hashes) - n + 1
+    h = word_hashes[:count].copy()
+    for k in range(1, n):
+        h = h * _DICT_MULT + word_hashes[k:k + count]
+    return h
+
+
+def _allow_key(s: str) -> str:
+    return _DICT_NON_ALNUM_RE.sub('', s.lower())
+
+
+def compile_dictionary(entries, out_path: str, mode: str = 'deny') -> int:
+    """Compile an iterable of entries into a dictionary file; returns the number of keys.
+
+    The file is written next to `out_path` and renamed into place, so readers that still
+    map the old file are not disturbed.
+    """
+    if mode not in ('deny', 'allow'):
+        raise ValueError(f"unknown dictionary mode: {mode}")
+    hashes = []
+    by_length = {}  # deny: word count -> flat word hashes of those entries
+    cache = {}
+    for entry in entries:
+        if mode == 'allow':
+            key = _allow_key(entry)
+            if key:
+                hashes.append(_word_hash(key))
+            continue
+        words = _DICT_WORD_RE.findall(entry.lower())
+        if not words or len(words) > 63:
+            continue
+        row = by_length.setdefault(len(words), [])
+        for w in words:
+            h = cache.get(w)
+            if h is None:
+                h = cache[w] = _word_hash(w)
+            row.append(h)
+    lengths = 0
+    parts = [np.array(hashes, dtype=np.uint64)]
+    for n, flat in by_length.items():
+        lengths |= 1 << n
+        rows = np.array(flat, dtype=np.uint64).reshape(-1, n)
+        # the same rolling hash as _sequence_hashes, one entry per row
+        h = rows[:, 0].copy()
+        for k in range(1, n):
+            h = h * _DICT_MULT + rows[:, k]
+        parts.append(h)
+    keys = np.unique(np.concatenate(parts))
+    header = _DICT_MAGIC + mode.encode('ascii').ljust(8, b'\0') + np.array([len(keys), lengths], dtype=np.uint64).tobytes()
+    tmp = out_path + '.tmp'
+    with open(tmp, 'wb') as fh:
+        fh.write(header.ljust(_DICT_HEADER, b'\0'))
+        fh.write(keys.tobytes())
+    os.replace(tmp, out_path)
+    return len(keys)
+
+
+class CompiledDictionary:
+    """One memory-mapped dictionary file."""
+    __slots__ = ('path', 'mode', 'keys', 'lengths')
+
+    def __init__(self, path: str):
+        with open(path, 'rb') as fh:
+            header = fh.read(_DICT_HEADER)
+        if len(header) < _DICT_HEADER or header[:8] != _DICT_MAGIC:
+            raise ValueError(f"{path}: not a compiled dictionary")
+        self.path = path
+        self.mode = header[8:16].rstrip(b'\0').decode('ascii')
+        count, mask = np.frombuffer(header[16:32], dtype=np.uint64).tolist()
+        self.lengths = [n for n in range(1, 64) if mask >> n & 1]
+        if count:
+            self.keys = np.memmap(path, dtype=np.uint64, mode='r', offset=_DICT_HEADER, shape=(count,))
+        else:
+            self.keys = np.zeros(0, dtype=np.uint64)
+
+    def __len__(self):
+        return len(self.keys)
+
+    def contains(self, hashes: np.ndarray) -> np.ndarray:
+        """Boolean mask: which of `hashes` are keys of this dictionary."""
+        if not len(self.keys) or not len(hashes):
+            return np.zeros(len(hashes), dtype=bool)
+        idx = np.searchsorted(self.keys, hashes)
+        np.minimum(idx, len(self.keys) - 1, out=idx)
+        return np.asarray(self.keys[idx]) == hashes
+
+
+class DictionarySet:
+    """The deny and allow dictionaries loaded from one directory."""
+    __slots__ = ('deny', 'allow', 'signature', 'checked')
+
+    def __init__(self, deny=(), allow=(), signature=None, checked=None):
+        self.deny = list(deny)
+        self.allow = list(allow)
+        self.signature = signature
+        self.checked = time.monotonic() if checked is None else checked
+
+    def deny_spans(self, text: str) -> list:
+        """(start, end) of every denied word sequence, overlapping hits merged."""
+        words = list(_DICT_WORD_RE.finditer(text))
+        if not words:
+            return []
+        cache = {}
+        wh = np.fromiter((cache[w] if w in cache else cache.setdefault(w, _word_hash(w))
+                          for w in (m.group(0).lower() for m in words)), dtype=np.uint64, count=len(words))
+        spans = []
+        for d in self.deny:
+            for n in d.lengths:
+                if n > len(words):
+                    break
+                for i in np.flatnonzero(d.contains(_sequence_hashes(wh, n))).tolist():
+                    spans.append((words[i].start(), words[i + n - 1].end()))
+        spans.sort()
+        merged = []
+        for s, e in spans:
+            if merged and s < merged[-1][1]:
+                merged[-1] = (merged[-1][0], max(merged[-1][1], e))
+            else:
+                merged.append((s, e))
+        return merged
+
+    def allowed(self, texts) -> np.ndarray:
+        """Boolean mask: which of `texts` an allow dictionary lists."""
+        hashes = np.fromiter((_word_hash(_allow_key(t)) for t in texts), dtype=np.uint64)
+        out = np.zeros(len(hashes), dtype=bool)
+        for d in self.allow:
+            out |= d.contains(hashes)
+        return out
+
+    def summary(self) -> dict:
+        return {'deny': {os.path.basename(d.path): len(d) for d in self.deny},
+                'allow': {os.path.basename(d.path): len(d) for d in self.allow}}
+
+
+# nothing loaded yet: the first scan looks at REDACT_DICTIONARY_DIR
+_DICTIONARIES = DictionarySet(checked=float('-inf'))
+
+
+def _dictionary_signature(directory: str):
+    try:
+        names = sorted(n for n in os.listdir(directory) if n.endswith('.rdict'))
+    except OSError:
+        return None
+    sig = []
+    for n in names:
+        try:
+            st = os.stat(os.path.join(directory, n))
+        except OSError:
+            continue
+        sig.append((n, st.st_mtime_ns, st.st_size))
+    return tuple(sig)
+
+
+def reload_dictionaries(directory: str = None, force: bool = True) -> DictionarySet:
+    """(Re)load the *.rdict files of `directory` (default REDACT_DICTIONARY_DIR).
+
+    The new set replaces the old one in a single assignment, so scans in flight keep the
+    dictionaries they started with.  Without `force` nothing is reopened unless the
+    directory listing (names, mtimes, sizes) changed.
+    """
+    global _DICTIONARIES
+    directory = directory or os.environ.get('REDACT_DICTIONARY_DIR')
+    current = _DICTIONARIES
+    if not directory:
+        return current
+    sig = _dictionary_signature(directory)
+    if not force and sig == current.signature:
+        current.checked = time.monotonic()
+        return current
+    deny, allow = [], []
+    for name, _, _ in sig or ():
+        try:
+            d = CompiledDictionary(os.path.join(directory, name))
+            (allow if d.mode == 'allow' else deny).append(d)
+        except Exception as e:
+            print(f"[redact] skipping dictionary {name}: {e}")
+    _DICTIONARIES = DictionarySet(deny, allow, sig)
+    print(f"[redact] dictionaries loaded from {directory}: {_DICTIONARIES.summary()}")
+    return _DICTIONARIES
+
+
+def current_dictionaries() -> DictionarySet:
+    """The loaded dictionaries, re-checking the directory every few seconds."""
+    d = _DICTIONARIES
+    if time.monotonic() - d.checked > _DICT_CHECK_SECONDS and os.environ.get('REDACT_DICTIONARY_DIR'):
+        d = reload_dictionaries(force=False)
+    return d
+
+
+def _scan_dictionary(text: str, emit, plan: ScanPlan, budget=None):
+    dicts = current_dictionaries()
+    if dicts.deny:
+        for s, e in dicts.deny_spans(text):
+            emit('denylist', text[s:e], s, e)
+
+
+def _apply_allowlist(bucket_sets):
+    """Drop detections an allow dictionary lists (line snippets and denylist hits are kept)."""
+    dicts = current_dictionaries()
+    if not dicts.allow:
+        return
+    for b in bucket_sets:
+        for rule in [r for r in b if r != 'denylist' and r not in _SNIPPET_RULES]:
+            hits = b[rule]
+            ok = dicts.allowed([h[4] for h in hits])
+            if ok.any():
+                kept = [h for h, drop in zip(hits, ok.tolist()) if not drop]
+                if kept:
+                    b[rule] = kept
+                else:
+                    del b[rule]
+
+
+_PASSES = {
+    'keywords': _scan_keywords,
+    'letters': _scan_letter_words,
+    'tokens': _scan_tokens,
+    'numeric': _scan_numeric,
+    'dictionary': _scan_dictionary,
+}
+
+
+# rules whose candidates the passes emit unchecked; their checksums run afterwards over
+# every candidate of the scan (or of a batch of texts) at once
+_CHECKSUM_RULES = (('iban', iban_check_many), ('credit_card', luhn_check_many), ('aadhaar', verhoeff_check_many))
+
+
+def _apply_checksums(bucket_sets):
+    """Drop checksum-failing candidates from a list of bucket dicts, one batch per rule."""
+    for rule, check_many in _CHECKSUM_RULES:
+        owners = [b for b in bucket_sets if rule in b]
+        if not owners:
+            continue
+        ok = check_many([h[4] for b in owners for h in b[rule]]).tolist()
+        pos = 0
+        for b in owners:
+            hits = b[rule]
+            kept = [h for h, good in zip(hits, ok[pos:pos + len(hits)]) if good]
+            pos += len(hits)
+            if kept:
+                b[rule] = kept
+            else:
+                del b[rule]
+
+
+def _apply_validators(bucket_sets):
+    _apply_checksums(bucket_sets)
+    _apply_allowlist(bucket_sets)
+
+
+def _budget_seconds(name: str, default: str):
+    raw = os.environ.get(name, default).strip().lower()
+    return None if raw in ('', 'none') else float(raw)
+
+
+# Default CPU-time allowance, in seconds, for scanning one uploaded document: /detect uses
+# SCAN_BUDGET_SECONDS, /redact/auto the larger AUTO_REDACT_BUDGET_SECONDS (a spent budget
+# fails a redaction instead of returning a partial result).  A number is the allowance,
+# including 0 (no scanning at all), exactly like a request's `budget` field; 'none' or an
+# empty value means unlimited.
+SCAN_BUDGET_SECONDS = _budget_seconds('REDACT_SCAN_BUDGET_SECONDS', '20')
+AUTO_REDACT_BUDGET_SECONDS = _budget_seconds('REDACT_AUTO_BUDGET_SECONDS', '300')
+
+
+class ScanBudget:
+    """CPU-time allowance shared by every scan of one document.
+
+    Scans look at it between passes (and every few hundred keyword hits); once it is spent
+    they stop and return what they found so far, and `exhausted` stays set so the caller can
+    flag the result as incomplete.  Thread CPU time is used, so time spent waiting on other
+    requests does not count.
+    """
+    __slots__ = ('seconds', 'deadline', 'exhausted')
+
+    def __init__(self, seconds: float):
+        self.seconds = seconds
+        self.deadline = time.thread_time() + seconds
+        self.exhausted = False
+
+    def spent(self) -> bool:
+        if not self.exhausted and time.thread_time() >= self.deadline:
+            self.exhausted = True
+        return self.exhausted
+
+    def __repr__(self):
+        return f"ScanBudget({self.seconds}, exhausted={self.exhausted})"
+
+
+def _scan_buckets(text: str, plan: ScanPlan, validate: bool = True, budget: ScanBudget = None) -> dict:
+    """Run the plan's passes over `text`: {rule: [(anchor_start, anchor_end, start, end, match), ...]}.
+
+    The anchor is the span the rule actually matched (for line-snippet rules the keyword,
+    not the reported line), which is what the streaming scanner de-duplicates on.  With
+    validate=False checksum rules keep their unchecked candidates and allow-listed matches
+    are kept (see _apply_validators).  With a `budget`, passes stop once it is spent.
+    """
+    buckets = {}
+
+    def emit(rule, match, start, end, anchor_start=None, anchor_end=None):
+        bucket = buckets.get(rule)
+        if bucket is None:
+            bucket = buckets[rule] = []
+        if anchor_start is None:
+            anchor_start, anchor_end = start, end
+        bucket.append((anchor_start, anchor_end, start, end, match))
+
+    for name in plan.passes:
+        if budget is not None and budget.spent():
+            break
+        _PASSES[name](text, emit, plan, budget)
+    if validate:
+        _apply_validators((buckets,))
+    return buckets
+
+
+# streaming: text kept on the right of a chunk cut so matches crossing it (plus their context
+# window) are complete, and on the left so the next window still sees context and line starts
+STREAM_OVERLAP = 1024
+_STREAM_BACK = 256
+
+
+def iter_sensitive_data(chunks, plan: ScanPlan = None, overlap: int = STREAM_OVERLAP, budget: ScanBudget = None):
+    """Scan an iterable of text chunks, yielding matches with offsets into the whole stream.
+
+    Memory is bounded by the chunk size plus ~2*overlap characters.  Text is scanned in
+    windows cut at a line break where possible; each window carries `overlap` characters of
+    look-ahead and a little look-behind, and a match is only yielded by the window its anchor
+    starts in, so nothing is reported twice.  Matches longer than `overlap` (or line snippets
+    of lines longer than that) may come out truncated.  Within a window matches are ordered
+    like scan_text_for_sensitive_data; across windows they follow the text.  Once `budget`
+    is spent the stream is not read any further.
+    """
+    if plan is None:
+        plan = compile_scan_plan()
+    buf = ''
+    base = 0      # stream offset of buf[0]
+    done = 0      # anchors before this stream offset have been reported
+    last_end = {}  # rule -> stream offset where its last reported anchor ended
+
+    def flush(stop):
+        buckets = _scan_buckets(buf, plan, budget=budget)
+        for rule in _SCAN_RULES:
+            hits = buckets.get(rule)
+            if not hits:
+                continue
+            category = _RULE_CATEGORY[rule]
+            resume = max(done, last_end.get(rule, 0))
+            for a_start, a_end, start, end, match in hits:
+                a_start += base
+                if a_start < resume or (stop is not None and a_start >= stop):
+                    continue
+                resume = last_end[rule] = a_end + base
+                yield {'category': category, 'match': match, 'start': start + base, 'end': end + base}
+
+    for chunk in chunks:
+        if not chunk:
+            continue
+        buf += chunk
+        lo = done - base
+        if len(buf) - lo < 2 * overlap:
+            continue
+        hi = len(buf) - overlap
+        nl = buf.rfind('\n', lo, hi)
+        cut = nl + 1 if nl >= 0 else hi
+        yield from flush(base + cut)
+        if budget is not None and budget.spent():
+            return
+        done = base + cut
+        keep = max(0, cut - _STREAM_BACK)
+        buf = buf[keep:]
+        base += keep
+    if buf:
+        yield from flush(None)
+
+
+def scan_text_for_sensitive_data(text: str, require_context_for=('acc',), plan: ScanPlan = None,
+                                 budget: ScanBudget = None) -> list:
+    """Return list of matches: {'category','match','start','end'}
+
+    `plan` (from compile_scan_plan / resolve_scan_plan) limits the scan to its categories.
+    With a `budget` the list may be partial; check budget.exhausted.
+    """
+    if not text:
+        return []
+    # a single window (no cut) over the whole text
+    return list(iter_sensitive_data((text,), plan=plan, overlap=len(text), budget=budget))
+
+
+def scan_texts_for_sensitive_data(texts, plan: ScanPlan = None, budget: ScanBudget = None) -> list:
+    """scan_text_for_sensitive_data for many short texts (e.g. spreadsheet cells).
+
+    Returns one match list per text; checksum validation runs as one batch for all of them.
+    """
+    if plan is None:
+        plan = compile_scan_plan()
+    bucket_sets = [_scan_buckets(t, plan, validate=False, budget=budget) if t else {} for t in texts]
+    _apply_validators(bucket_sets)
+    return [[{'category': _RULE_CATEGORY[rule], 'match': h[4], 'start': h[2], 'end': h[3]}
+             for rule in _SCAN_RULES if rule in b for h in b[rule]] for b in bucket_sets]
+
+
+# --- match table ------------------------------------------------------------------------
+# Detection paths keep matches as a MatchTable: parallel arrays of category id, start and
+# end, where the matched text is always text[start:end] (line snippets are stored with their
+# stripped bounds).  Dicts are only built at the JSON boundary.
+#
+# De-duplication of precise detections (PHONE/E164, ACC/ACC_GENERIC/DIGITSEQ, the two
+# api_key rules, ...): rows whose spans overlap or coincide are merged into their union by
+# one interval sweep, and the union reports the category listed first in
+# CATEGORY_PRECEDENCE: checksum-validated identifiers, then other structured identifiers and
+# secrets, then context-only numbers.  A row lying inside another one is only kept on its
+# own when it ranks above the merged span's category (a Luhn-valid card inside a longer
+# generic account number), otherwise it is dropped.  The whole-line health/biometric
+# snippets are kept apart: they never absorb the precise detections inside them (the
+# redaction phrase lists need those on their own); among themselves only equal or nested
+# snippets are dropped.
+CATEGORY_PRECEDENCE = (
+    'credit_card', 'iban', 'aadhaar', 'ssn', 'pan', 'passport', 'driver_license', 'jwt', 'api_key',
+    'credential', 'denylist', 'email', 'phone', 'credit_card_masked', 'swift', 'ifsc', 'routing', 'sort_code',
+    'account', 'cvv', 'pin', 'otp', 'digit_sequence', 'health_info', 'biometric',
+)
+_CATEGORY_ID = {c: i for i, c in enumerate(DETECTOR_CATEGORIES)}
+_RULE_CATEGORY_ID = {r: _CATEGORY_ID[c] for r, c in _RULE_CATEGORY.items()}
+_CATEGORY_RANK = np.array([CATEGORY_PRECEDENCE.index(c) for c in DETECTOR_CATEGORIES], dtype=np.intp)
+_RANK_CATEGORY = np.array([_CATEGORY_ID[c] for c in CATEGORY_PRECEDENCE], dtype=np.intp)
+_SNIPPET_RULES = frozenset(r[0] for r in _KEYWORD_RULES if r[2] is None)
+_SNIPPET_CATEGORY = np.array([c in {_RULE_CATEGORY[r] for r in _SNIPPET_RULES} for c in DETECTOR_CATEGORIES])
+_NO_ROWS = np.zeros(0, dtype=np.int64)
+
+
+class MatchTable:
+    """Scanner matches over one text as arrays of category id, start and end."""
+    __slots__ = ('text', 'cat', 'start', 'end')
+
+    def __init__(self, text: str, cat=_NO_ROWS, start=_NO_ROWS, end=_NO_ROWS):
+        self.text = text
+        self.cat = cat
+        self.start = start
+        self.end = end
+
+    @classmethod
+    def _from_buckets(cls, text: str, buckets: dict) -> 'MatchTable':
+        if not buckets:
+            return cls(text)
+        cats, starts, ends = [], [], []
+        for rule in _SCAN_RULES:
+            hits = buckets.get(rule)
+            if not hits:
+                continue
+            cats.extend([_RULE_CATEGORY_ID[rule]] * len(hits))
+            if rule in _SNIPPET_RULES:
+                for _, _, lo, hi, snippet in hits:
+                    raw = text[lo:hi]
+                    lo += len(raw) - len(raw.lstrip())
+                    starts.append(lo)
+                    ends.append(lo + len(snippet))
+            else:
+                for h in hits:
+                    # without surrounding blanks, so the same value from two rules has one span
+                    lo, hi = h[2], h[3]
+                    while hi > lo and text[hi - 1].isspace():
+                        hi -= 1
+                    while lo < hi and text[lo].isspace():
+                        lo += 1
+                    starts.append(lo)
+                    ends.append(hi)
+        return cls(text, np.array(cats, dtype=np.int64), np.array(starts, dtype=np.int64), np.array(ends, dtype=np.int64))
+
+    def __len__(self):
+        return len(self.cat)
+
+    def deduplicated(self) -> 'MatchTable':
+        """Merge overlapping/identical spans (interval sweep, see CATEGORY_PRECEDENCE)."""
+        if len(self.cat) < 2:
+            return self
+        rank = _CATEGORY_RANK[self.cat]
+        snippet = _SNIPPET_CATEGORY[self.cat]
+        cats, starts, ends = [], [], []
+        for k in (False, True):
+            idx = np.flatnonzero(snippet == k)
+            if not len(idx):
+                continue
+            # start, longest first, best category first
+            idx = idx[np.lexsort((rank[idx], -self.end[idx], self.start[idx]))]
+            s, e, r = self.start[idx], self.end[idx], rank[idx]
+            reach = np.r_[-1, np.maximum.accumulate(e)[:-1]]
+            # rows inside an earlier row (starts are sorted, so inside the one reaching furthest)
+            nested = e <= reach
+            if k:
+                keep = ~nested
+                cats.append(self.cat[idx[keep]]); starts.append(s[keep]); ends.append(e[keep])
+                continue
+            # a new group starts where a row begins at or after everything before it has ended
+            first = s >= reach
+            group = np.cumsum(first) - 1
+            outer = np.flatnonzero(~nested)
+            heads = np.flatnonzero(first[outer])
+            best = np.minimum.reduceat(r[outer], heads)
+            cats.append(_RANK_CATEGORY[best])
+            starts.append(s[outer[heads]])
+            ends.append(np.maximum.reduceat(e[outer], heads))
+            inner = nested & (r < best[group])
+            cats.append(self.cat[idx[inner]]); starts.append(s[inner]); ends.append(e[inner])
+        cat, start, end = np.concatenate(cats), np.concatenate(starts), np.concatenate(ends)
+        order = np.lexsort((-end, start))
+        return MatchTable(self.text, cat[order], start[order], end[order])
+
+    def rows(self):
+        """Iterate (category, start, end, match text)."""
+        text = self.text
+        for c, s, e in zip(self.cat.tolist(), self.start.tolist(), self.end.tolist()):
+            yield DETECTOR_CATEGORIES[c], s, e, text[s:e]
+
+    def to_dicts(self) -> list:
+        return [{'category': c, 'match': m, 'start': s, 'end': e} for c, s, e, m in self.rows()]
+
+
+def scan_text_table(text: str, plan: ScanPlan = None, budget: ScanBudget = None) -> MatchTable:
+    """Scan `text` into a MatchTable (call .deduplicated() before geometry work)."""
+    if not text:
+        return MatchTable(text or '')
+    return MatchTable._from_buckets(text, _scan_buckets(text, plan or compile_scan_plan(), budget=budget))
+
+
+def scan_texts_tables(texts, plan: ScanPlan = None, budget: ScanBudget = None) -> list:
+    """scan_text_table for many short texts, with one checksum batch for all of them."""
+    if plan is None:
+        plan = compile_scan_plan()
+    bucket_sets = [_scan_buckets(t, plan, validate=False, budget=budget) if t else {} for t in texts]
+    _apply_validators(bucket_sets)
+    return [MatchTable._from_buckets(t, b) for t, b in zip(texts, bucket_sets)]
+
+
+def detect_text_file(fileobj, plan: ScanPlan = None, chunk_size: int = 1 << 20, encoding: str = 'utf-8',
+                     budget: ScanBudget = None):
+    """Scan a binary text file object chunk by chunk (the file is never read whole).
+
+    Returns the iter_sensitive_data generator: nothing is read until it is iterated, and
+    matches come out as the file is scanned."""
+    decoder = codecs.getincrementaldecoder(encoding)(errors='replace')
+
+    def chunks():
+        while True:
+            raw = fileobj.read(chunk_size)
+            if not raw:
+                break
+            yield decoder.decode(raw)
+        yield decoder.decode(b'', final=True)
+
+    return iter_sensitive_data(chunks(), plan=plan, budget=budget)
+
+
+def mask_email_addr(s: str) -> str:
+    try:
+        parts = s.split('@', 1)
+        if len(parts) != 2:
+            return s
+        local, domain = parts
+        if not local:
+            return s
+        return ('*' * max(3, len(local))) + '@' + domain
+    except Exception:
+        return s
+
+
+# --- phrase matching ------------------------------------------------------------------
+# User phrase lists (thousands of names per job) are matched with one PhraseMatcher per
+# request: the phrases are folded into a trie and compiled to a single regex, so each text
+# unit is scanned once instead of once per phrase.  The trie is wrapped in a lookahead, so
+# at every position the longest phrase starting there is reported and overlapping phrases
+# are all found.
+
+_SPACE_RUN_RE = re.compile(r"\s+")
+
+
+def _trie_regex(words) -> str:
+    trie = {}
+    for w in words:
+        node = trie
+        for ch in w:
+            node = node.setdefault(ch, {})
+        node[''] = None
+
+    def build(node):
+        branches = [re.escape(ch) + build(child) for ch, child in sorted(node.items()) if ch]
+        if not branches:
+            return ''
+        if len(branches) == 1 and '' not in node:
+            return branches[0]
+        alt = '(?:' + '|'.join(branches) + ')'
+        # a phrase ends here: the longer continuations are optional (and tried first)
+        return alt + '?' if '' in node else alt
+
+    return build(trie)
+
+
+class PhraseMatcher:
+    """Find any of many literal phrases in one pass over a text.
+
+    case_fold compares lowercased text; normalize_space treats any whitespace run as a
+    single space (phrases are stripped).  Offsets are always into the original text.
+    """
+    __slots__ = ('case_fold', 'normalize_space', '_keys', '_prefixes', '_re')
+
+    def __init__(self, phrases, case_fold: bool = False, normalize_space: bool = False):
+        self.case_fold = case_fold
+        self.normalize_space = normalize_space
+        self._keys = {}
+        for ph in phrases or []:
+            if not isinstance(ph, str):
+                continue
+            key = self._key(ph)
+            if key:
+                self._keys.setdefault(key, []).append(ph)
+        # phrases that are prefixes of a longer one starting at the same place
+        self._prefixes = {k: [k[:i] for i in range(1, len(k)) if k[:i] in self._keys] for k in self._keys}
+        self._re = re.compile('(?=(' + _trie_regex(self._keys) + '))') if self._keys else None
+
+    def _key(self, s: str) -> str:
+        if self.normalize_space:
+            s = _SPACE_RUN_RE.sub(' ', s).strip()
+        return s.lower() if self.case_fold else s
+
+    def _normalised(self, text: str):
+        """The text as the phrases are compared against it, plus the original offset of each
+        character (None when offsets are unchanged)."""
+        index = None
+        if self.normalize_space and _SPACE_RUN_RE.search(text):
+            parts = []
+            index = []
+            pos = 0
+            for m in _SPACE_RUN_RE.finditer(text):
+                parts.append(text[pos:m.start()])
+                index.extend(range(pos, m.start()))
+                parts.append(' ')
+                index.append(m.start())
+                pos = m.end()
+            parts.append(text[pos:])
+            index.extend(range(pos, len(text)))
+            text = ''.join(parts)
+        if self.case_fold:
+            low = text.lower()
+            if len(low) != len(text):
+                # a few characters (e.g. U+0130) grow when lowercased: map them one by one
+                parts = [ch.lower() for ch in text]
+                base = index if index is not None else range(len(text))
+                index = [i for part, i in zip(parts, base) for _ in part]
+                low = ''.join(parts)
+            text = low
+        return text, index
+
+    def __bool__(self):
+        return self._re is not None
+
+    def finditer(self, text: str):
+        """Yield (start, end, key) of the longest phrase starting at each position."""
+        if self._re is None or not text:
+            return
+        norm, index = self._normalised(text)
+        for m in self._re.finditer(norm):
+            s, e = m.span(1)
+            if index is not None:
+                s, e = index[s], index[e - 1] + 1
+            yield s, e, m.group(1)
+
+    def found(self, text: str) -> set:
+        """The original phrases that occur in `text`."""
+        keys = set()
+        for _, _, key in self.finditer(text):
+            if key not in keys:
+                keys.add(key)
+                keys.update(self._prefixes[key])
+        return {ph for key in keys for ph in self._keys[key]}
+
+    def search(self, text: str) -> bool:
+        return next(self.finditer(text), None) is not None
+
+    def mask(self, text: str, char: str = '█') -> str:
+        """Replace every character covered by a phrase occurrence with `char`."""
+        spans = list(self.finditer(text))
+        if not spans:
+            return text
+        out = []
+        pos = 0
+        for s, e, _ in spans:
+            if e <= pos:
+                continue
+            s = max(s, pos)
+            out.append(text[pos:s])
+            out.append(char * (e - s))
+            pos = e
+        out.append(text[pos:])
+        return ''.join(out)
+
+
+def preview_pdf_first_page(data: bytes, zoom: float = 2.0) -> bytes:
+    with PdfSession(data) as session:
+        return preview_pdf_session(session, zoom)
+
+
+def preview_pdf_session(session: PdfSession, zoom: float = 2.0) -> bytes:
+    """All pages rendered at `zoom` and stacked vertically into one PNG (the canvas that
+    pdf_page_geometry describes)."""
+    images = []
+    for pno in range(len(session)):
+        page = session.page(pno)
+        mat = fitz.Matrix(zoom, zoom)
+        pix = page.get_pixmap(matrix=mat)
+        img = Image.open(io.BytesIO(pix.tobytes("png"))).convert("RGB")
+        images.append(img)
+    if not images:
+        return b""
+    # concatenate vertically
+    widths = [im.width for im in images]
+    heights = [im.height for im in images]
+    maxw = max(widths)
+    totalh = sum(heights)
+    out_img = Image.new('RGB', (maxw, totalh), color='white')
+    y = 0
+    for im in images:
+        out_img.paste(im, (0, y))
+        y += im.height
+    out = io.BytesIO()
+    out_img.save(out, format='PNG')
+    return out.getvalue()
+
+
+# --- paged PDF preview -------------------------------------------------------------------
+# A preview upload is kept open (a PdfSession over its bytes) by content hash so single
+# pages and thumbnails can be rendered later without sending or parsing the file again: at
+# most PREVIEW_DOCS documents and PREVIEW_DOCS_BYTES in all (least recently used go first),
+# each closed PREVIEW_TTL seconds after it was last used.  Rendered images are cached by
+# (hash, page, size, format) up to their own byte budget, so scrolling back over a page
+# costs nothing.  _preview_lock guards both caches and the open documents (MuPDF objects
+# must not be used from two threads at once).
+PREVIEW_FORMATS = IMAGE_FORMATS
+PREVIEW_DOCS = int(os.environ.get('REDACT_PREVIEW_DOCS', '32'))
+PREVIEW_DOCS_BYTES = int(float(os.environ.get('REDACT_PREVIEW_DOCS_MB', '256')) * 2 ** 20)
+PREVIEW_TTL = float(os.environ.get('REDACT_PREVIEW_TTL_SECONDS', '900'))
+PREVIEW_CACHE_BYTES = int(float(os.environ.get('REDACT_PREVIEW_CACHE_MB', '256')) * 2 ** 20)
+PREVIEW_THUMB_WIDTH = 160
+_PREVIEW_DOCS = {}   # doc id -> (open PdfSession, last use)
+_preview_docs_bytes = 0
+_PAGE_RENDER_CACHE = {}
+_page_render_bytes = 0
+_preview_lock = threading.Lock()
+
+
+def _drop_preview(doc_id: str):
+    # callers hold _preview_lock
+    global _preview_docs_bytes, _page_render_bytes
+    session, _ = _PREVIEW_DOCS.pop(doc_id)
+    _preview_docs_bytes -= len(session.data)
+    session.close()
+    for key in [k for k in _PAGE_RENDER_CACHE if k[0] == doc_id]:
+        _page_render_bytes -= len(_PAGE_RENDER_CACHE.pop(key))
+
+
+def _expire_previews():
+    # callers hold _preview_lock; oldest use first, so expired documents are at the front
+    cutoff = time.monotonic() - PREVIEW_TTL
+    while _PREVIEW_DOCS:
+        doc_id, (_, used) = next(iter(_PREVIEW_DOCS.items()))
+        if used > cutoff:
+            break
+        _drop_preview(doc_id)
+
+
+def register_pdf_preview(session: PdfSession) -> str:
+    """Keep the session's document open for page requests; returns the document id (its
+    sha256).  The cache opens its own session, so the caller still closes `session`.
+    Raises ValueError for a document larger than PREVIEW_DOCS_BYTES."""
+    global _preview_docs_bytes
+    data = session.data
+    if len(data) > PREVIEW_DOCS_BYTES:
+        raise ValueError(f"document too large for the paged preview ({len(data) // 2 ** 20} MB, "
+                         f"limit {PREVIEW_DOCS_BYTES // 2 ** 20} MB)")
+    doc_id = session.digest
+    kept = PdfSession(data)
+    with _preview_lock:
+        _expire_previews()
+        if doc_id in _PREVIEW_DOCS:
+            _drop_preview(doc_id)
+        while _PREVIEW_DOCS and (len(_PREVIEW_DOCS) >= PREVIEW_DOCS or _preview_docs_bytes + len(data) > PREVIEW_DOCS_BYTES):
+            _drop_preview(next(iter(_PREVIEW_DOCS)))
+        _PREVIEW_DOCS[doc_id] = (kept, time.monotonic())
+        _preview_docs_bytes += len(data)
+    return doc_id
+
+
+def render_pdf_page(doc_id: str, pno: int, zoom: float = 2.0, fmt: str = 'png', quality: int = 80,
+                    width: int = None) -> bytes:
+    """One page of a registered preview document as `fmt` (see PREVIEW_FORMATS), at `zoom`
+    or scaled to `width` pixels (thumbnails).  Raises KeyError for an unknown (or evicted)
+    document, IndexError for a page out of range and ValueError for a bad format."""
+    global _page_render_bytes
+    if fmt not in PREVIEW_FORMATS:
+        raise ValueError(f"unknown preview format '{fmt}' (expected one of {', '.join(PREVIEW_FORMATS)})")
+    key = (doc_id, pno, float(zoom), width, fmt, quality if fmt != 'png' else None)
+    with _preview_lock:
+        _expire_previews()
+        entry = _PREVIEW_DOCS.pop(doc_id, None)
+        if entry is None:
+            raise KeyError(doc_id)
+        session = entry[0]
+        _PREVIEW_DOCS[doc_id] = (session, time.monotonic())
+        out = _PAGE_RENDER_CACHE.pop(key, None)
+        if out is not None:
+            _PAGE_RENDER_CACHE[key] = out
+            return out
+        # rendered under the lock: the document may not be closed (evicted) meanwhile
+        if not 0 <= pno < len(session):
+            raise IndexError(f"page {pno} out of range (document has {len(session)})")
+        page = session.page(pno)
+        if width:
+            zoom = width / max(1.0, page.rect.width)
+        pix = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom), alpha=False)
+    if fmt == 'png':
+        out = pix.tobytes('png')
+    elif fmt == 'jpeg':
+        out = pix.tobytes('jpeg', jpg_quality=quality)
+    else:
+        img = Image.frombytes('RGB', (pix.width, pix.height), pix.samples)
+        buf = io.BytesIO()
+        img.save(buf, format='WEBP', quality=quality)
+        out = buf.getvalue()
+    with _preview_lock:
+        # the document may have been dropped while encoding; its pages are not cached then
+        if doc_id in _PREVIEW_DOCS and key not in _PAGE_RENDER_CACHE:
+            _page_render_bytes += len(out)
+            _PAGE_RENDER_CACHE[key] = out
+            while _PAGE_RENDER_CACHE and _page_render_bytes > PREVIEW_CACHE_BYTES:
+                _page_render_bytes -= len(_PAGE_RENDER_CACHE.pop(next(iter(_PAGE_RENDER_CACHE))))
+    return out
+
+
+# --- page-sharded PDF work ---------------------------------------------------------------
+# PyMuPDF objects cannot be shared between processes, so for long documents each worker
+# opens the bytes itself and handles a range of pages; results come back in page order and
+# the caller does everything that touches the output document (drawing, saving) once.
+PDF_POOL_MIN_PAGES = int(os.environ.get('REDACT_PDF_POOL_MIN_PAGES', '64'))
+PDF_POOL_WORKERS = int(os.environ.get('REDACT_PDF_WORKERS', '0')) or (os.cpu_count() or 1)
+_PDF_POOLS = {}
+
+
+def _pdf_pool_init():
+    try:
+        reload_dictionaries()
+    except Exception as e:
+        print(f"[pdf_pool] dictionaries not loaded in worker: {e}")
+
+
+def _pdf_pool(workers: int) -> ProcessPoolExecutor:
+    pool = _PDF_POOLS.get(workers)
+    if pool is None:
+        # spawned, not forked: the server process has threads and open MuPDF state
+        pool = _PDF_POOLS[workers] = ProcessPoolExecutor(
+            max_workers=workers, mp_context=multiprocessing.get_context('spawn'), initializer=_pdf_pool_init)
+    return pool
+
+
+def shutdown_pdf_pools():
+    for pool in _PDF_POOLS.values():
+        pool.shutdown(wait=False, cancel_futures=True)
+    _PDF_POOLS.clear()
+
+
+def _pdf_shard(path: str, pnos: list, fn, args: tuple, seconds):
+    budget = ScanBudget(seconds) if seconds is not None else None
+    with PdfSession(path=path) as session:
+        out = []
+        for pno in pnos:
+            out.append(None if budget is not None and budget.spent() else fn(session, pno, *args, budget))
+    return out, budget is not None and budget.exhausted
+
+
+def pdf_map_pages(session: PdfSession, fn, args: tuple = (), budget: ScanBudget = None, workers: int = None,
+                  pages: list = None) -> list:
+    """[fn(session, pno, *args, budget) for every page], in page order.
+
+    With at least PDF_POOL_MIN_PAGES pages to do and more than one worker (PDF_POOL_WORKERS
+    by default) the pages are split into ranges run by a process pool; `fn` must then be a
+    module-level function and its arguments and results picklable.  The document reaches
+    the workers as one temporary file that MuPDF reads from disk, not as bytes pickled into
+    every task.  Each range gets a share of the remaining budget.  Pages skipped because the
+    budget ran out, or not listed in `pages` (all by default), come back as None.
+    """
+    n = len(session)
+    todo = list(range(n)) if pages is None else sorted(set(p for p in pages if 0 <= p < n))
+    out = [None] * n
+    workers = workers or PDF_POOL_WORKERS
+    if len(todo) >= max(2, PDF_POOL_MIN_PAGES) and workers > 1:
+        size = max(1, -(-len(todo) // (workers * 4)))
+        chunks = [todo[lo:lo + size] for lo in range(0, len(todo), size)]
+        remaining = None if budget is None else max(0.0, budget.deadline - time.thread_time())
+        path = None
+        try:
+            if session.path is not None:
+                path = session.path
+            else:
+                with tempfile.NamedTemporaryFile(suffix='.pdf', delete=False) as fh:
+                    fh.write(session.data)
+                path = fh.name
+            pool = _pdf_pool(workers)
+            futures = [pool.submit(_pdf_shard, path, chunk, fn, args,
+                                   None if remaining is None else remaining * len(chunk) / len(todo)) for chunk in chunks]
+            for chunk, f in zip(chunks, futures):
+                results, exhausted = f.result()
+                for pno, res in zip(chunk, results):
+                    out[pno] = res
+                if exhausted:
+                    budget.exhausted = True
+            return out
+        except Exception as e:
+            print(f"[pdf_pool] falling back to one process: {e}")
+        finally:
+            if path is not None and path != session.path:
                 try:
-                    raw = z.read(name)
-                    if pytesseract is not None:
-                        det = detect_image_bytes(raw)
-                        if isinstance(det, dict):
-                            matches = det.get('matches', [])
-                            ft = det.get('full_text', '')
-                        else:
-                            matches = det
-                            ft = ''
-                        if matches:
-                            img_matches.append({'image': base, 'matches': matches, 'full_text': ft})
-                except Exception:
+                    os.unlink(path)
+                except OSError:
                     pass
+    for pno in todo:
+        out[pno] = None if budget is not None and budget.spent() else fn(session, pno, *args, budget)
+    return out
+
+
+_PAGE_RANGE_RE = re.compile(r"^(\d*)\s*(-?)\s*(\d*)$")
+
+
+def parse_page_ranges(spec, count: int) -> list:
+    """Sorted page numbers (0-based, like every "page" in this API) from a list of numbers
+    or a string such as "0-3, 7, 10-" (open-ended ranges run to the first / last page).
+    Pages past the end are dropped; anything unparseable raises ValueError."""
+    if isinstance(spec, str) and spec.strip().startswith('['):
+        spec = json.loads(spec)
+    pages = set()
+    if isinstance(spec, (list, tuple)):
+        for p in spec:
+            if isinstance(p, bool) or not isinstance(p, int) or p < 0:
+                raise ValueError(f"bad page number {p!r}")
+            pages.add(p)
+    else:
+        for part in str(spec).split(','):
+            m = _PAGE_RANGE_RE.match(part.strip())
+            if not m or not (m.group(1) or m.group(3)):
+                raise ValueError(f"bad page range '{part.strip()}'")
+            lo, dash, hi = m.groups()
+            if not dash:
+                pages.add(int(lo))
+                continue
+            if lo and hi and int(hi) < int(lo):
+                raise ValueError(f"bad page range '{part.strip()}'")
+            lo = int(lo) if lo else 0
+            hi = int(hi) if hi else count - 1
+            pages.update(range(lo, min(hi, count - 1) + 1))
+    return sorted(p for p in pages if p < count)
+
+
+def detect_pdf_bytes(data: bytes, plan: ScanPlan = None, budget: ScanBudget = None, ocr: bool = None,
+                     pages: list = None):
+    with PdfSession(data) as session:
+        return detect_pdf_session(session, plan, budget, ocr=ocr, pages=pages)
+
+
+def _search_pdf_text(session: PdfSession, pno: int, txt: str, category: str) -> list:
+    """Boxes of every occurrence of `txt` on a page by searching for it (used when the page's
+    characters cannot be lined up with its text)."""
+    page = session.page(pno)
+    matches = []
+    try:
+        areas = page.search_for(txt)
+        if not areas:
+            # fallback: the page's word index, for text split or punctuated differently
+            areas = [fitz.Rect(r) for r in session.word_index(pno).rects(txt)]
+        for r in areas:
+            matches.append({"text": txt, "rect": [r.x0, r.y0, r.x1, r.y1], "category": category})
+    except Exception:
+        pass
+    return matches
+
+
+def _char_rects(chars, start: int, end: int) -> list:
+    """One [x0, y0, x1, y1] per text line that characters start..end-1 are on."""
+    boxes, line = chars
+    b = boxes[start:end]
+    keep = ~np.isnan(b[:, 0])
+    b = b[keep]
+    if not len(b):
+        return []
+    ln = line[start:end][keep]
+    first = np.flatnonzero(np.r_[True, ln[1:] != ln[:-1]])
+    x0 = np.minimum.reduceat(b[:, 0], first)
+    y0 = np.minimum.reduceat(b[:, 1], first)
+    x1 = np.maximum.reduceat(b[:, 2], first)
+    y1 = np.maximum.reduceat(b[:, 3], first)
+    return np.stack([x0, y0, x1, y1], axis=1).tolist()
+
+
+def detect_pdf_session(session: PdfSession, plan: ScanPlan = None, budget: ScanBudget = None, workers: int = None,
+                       ocr: bool = None, pages: list = None):
+    """detect_pdf_bytes on an open PdfSession (reuses its pages and extracted text).
+
+    Matches are located from the character boxes of the page's TextPage, so each scanner hit
+    gets the boxes of exactly that occurrence (one per text line it spans).  Long documents
+    are scanned in page ranges by the PDF process pool (see pdf_map_pages).  With `ocr`
+    (PDF_OCR by default) image-only pages are read by tesseract (see ocr_pdf_pages).  With
+    `pages` only those pages are looked at.
+    """
+    plan = plan or compile_scan_plan()
+    found = pdf_map_pages(session, _detect_pdf_page, (plan,), budget=budget, workers=workers, pages=pages)
+    if PDF_OCR if ocr is None else ocr:
+        scans = [pno for pno in pdf_image_only_pages(session, pages) if not found[pno]]
+        for pno, matches in ocr_pdf_pages(session, scans, plan, budget).items():
+            found[pno] = matches
+    return [{"page": pno, "matches": matches} for pno, matches in enumerate(found) if matches]
+
+
+def _detect_pdf_page(session: PdfSession, pno: int, plan: ScanPlan, budget: ScanBudget = None) -> list:
+    text = session.text(pno)
+    table = scan_text_table(text, plan, budget).deduplicated()
+    if not len(table):
+        return []
+    chars = session.chars(pno)
+    matches = []
+    searched = set()
+    for category, start, end, txt in table.rows():
+        if chars is not None:
+            for rect in _char_rects(chars, start, end):
+                matches.append({"text": txt, "rect": rect, "category": category})
+            continue
+        # search_for already returns every occurrence of a text on the page
+        if txt in searched:
+            continue
+        searched.add(txt)
+        matches.extend(_search_pdf_text(session, pno, txt, category))
+    return matches
+
+
+# --- OCR of scanned PDF pages --------------------------------------------------------------
+# Pages with images but (almost) no extractable text are treated as scans.  Only those are
+# rasterised (grayscale, PDF_OCR_DPI) and handed to the OCR engines (see OcrPool), a few
+# pages at a time; the words go through the same scanner and box mapping as
+# detect_image_bytes on the calling thread, and the pixel boxes are mapped back to PDF points.
+PDF_OCR = os.environ.get('REDACT_PDF_OCR', '1') != '0'
+PDF_OCR_DPI = int(os.environ.get('REDACT_PDF_OCR_DPI', '300'))
+PDF_OCR_PAGE_TIMEOUT = float(os.environ.get('REDACT_OCR_PAGE_TIMEOUT', '60'))
+# a page with fewer extractable characters than this (and an image) counts as a scan
+_OCR_MIN_TEXT_CHARS = 16
+
+
+def pdf_image_only_pages(session: PdfSession, pages: list = None) -> list:
+    """Page numbers (of `pages`, all by default) that carry images but next to no text."""
+    out = []
+    for pno in (range(len(session)) if pages is None else pages):
+        try:
+            # most digital pages have no images, which is cheaper to see than their text
+            if session.page(pno).get_images() and len(session.text(pno).strip()) < _OCR_MIN_TEXT_CHARS:
+                out.append(pno)
+        except Exception:
+            continue
+    return out
+
+
+def _ocr_pdf_matches(words: list, back, plan: ScanPlan, budget: ScanBudget = None) -> list:
+    found, _ = _locate_ocr_matches(words, plan, budget)
+    matches = []
+    for m in found:
+        x, y, w, h = m['rect']
+        r = fitz.Rect(x, y, x + w, y + h) * back
+        matches.append({"text": m['text'], "rect": [r.x0, r.y0, r.x1, r.y1], "category": m['category'], "ocr": True})
+    return matches
+
+
+def ocr_pdf_pages(session: PdfSession, pages: list, plan: ScanPlan = None, budget: ScanBudget = None,
+                  dpi: int = None, workers: int = None) -> dict:
+    """{page: matches} for OCR-ed `pages`, rects in PDF points like the text path.  Pages
+    left once the budget is spent are not rasterised; pages tesseract fails on are skipped."""
+    if not ocr_available() or not pages:
+        return {}
+    plan = plan or compile_scan_plan()
+    scale = (dpi or PDF_OCR_DPI) / 72.0
+    workers = max(1, min(workers or OCR_WORKERS, len(pages)))
+    out = {}
+    pending = {}
+
+    def collect(done):
+        for f in done:
+            pno, back = pending.pop(f)
+            try:
+                out[pno] = _ocr_pdf_matches(f.result(), back, plan, budget)
+            except Exception as e:
+                print(f"[ocr_pdf_pages] page {pno} skipped: {e}")
+
+    for pno in pages:
+        if budget is not None and budget.spent():
+            break
+        page = session.page(pno)
+        # MuPDF is not thread-safe: pages are rasterised here, only OCR runs in the background
+        pix = page.get_pixmap(matrix=fitz.Matrix(scale, scale), colorspace=fitz.csGRAY, alpha=False)
+        img = np.frombuffer(pix.samples, np.uint8).reshape(pix.height, pix.stride)[:, :pix.width]
+        # OCR pixels -> rotated page -> unrotated page space (where text boxes live)
+        back = fitz.Matrix(1 / scale, 1 / scale) * page.derotation_matrix
+        pending[submit_ocr_words(img, PDF_OCR_PAGE_TIMEOUT)] = (pno, back)
+        # at most two rasters per worker in memory
+        if len(pending) >= workers * 2:
+            collect(wait(pending, return_when=FIRST_COMPLETED).done)
+    collect(wait(pending).done)
+    return out
+
+
+def detect_docx_bytes(data: bytes, plan: ScanPlan = None, budget: ScanBudget = None):
+    buf = io.BytesIO(data)
+    doc = Document(buf)
+    found = []
+    # check paragraphs
+    for p in doc.paragraphs:
+        t = p.text
+        for category, _, _, match in scan_text_table(t, plan, budget).deduplicated().rows():
+            found.append({'match': match, 'category': category})
+    # check tables (cells)
+    try:
+        for table in doc.tables:
+            for row in table.rows:
+                for cell in row.cells:
+                    t = cell.text
+                    for category, _, _, match in scan_text_table(t, plan, budget).deduplicated().rows():
+                        found.append({'match': match, 'category': category})
+    except Exception:
+        pass
+    # also report embedded images (filenames) if present
+    imgs = []
+    img_matches = []
+    try:
+        # inspect package for word/media
+        import zipfile
+        z = zipfile.ZipFile(io.BytesIO(data))
+        imgs, img_matches = _ooxml_image_matches(z, 'word/media/', plan, budget)
+        z.close()
+    except Exception:
+        pass
+    # dedupe while preserving order
+    seen = set()
+    unique = []
+    for it in found:
+        try:
+            if isinstance(it, dict):
+                key = (it.get('match'), it.get('category'))
+            else:
+                key = (it, None)
+        except Exception:
+            key = (str(it), None)
+        if key not in seen:
+            seen.add(key)
+            unique.append(it)
+    return {'text_matches': unique, 'images': imgs, 'image_matches': img_matches}
+
+
+def detect_xlsx_bytes(data: bytes, plan: ScanPlan = None, budget: ScanBudget = None):
+    buf = io.BytesIO(data)
+    wb = load_workbook(filename=buf)
+    found = []
+    cells = []
+    for ws in wb.worksheets:
+        for row in ws.iter_rows(values_only=False):
+            for cell in row:
+                val = cell.value
+                if not isinstance(val, str):
+                    continue
+                cells.append((ws.title, cell.coordinate, val))
+    # scan all string cells together so card/Aadhaar/IBAN checksums run as one batch
+    for (title, coord, _), table in zip(cells, scan_texts_tables([c[2] for c in cells], plan=plan, budget=budget)):
+        for category, _, _, match in table.deduplicated().rows():
+            found.append({"sheet": title, "cell": coord, "match": match, 'category': category})
+    # also list images in xl/media
+    imgs = []
+    img_matches = []
+    try:
+        import zipfile
+        z = zipfile.ZipFile(io.BytesIO(data))
+        imgs, img_matches = _ooxml_image_matches(z, 'xl/media/', plan, budget)
         z.close()
     except Exception:
         pass
     return {'text_matches': found, 'images': imgs, 'image_matches': img_matches}
 
 
+def _ooxml_image_matches(z, prefix: str, plan: ScanPlan = None, budget: ScanBudget = None):
+    """(media basenames under `prefix`, [{'image', 'matches', 'full_text'}] for the ones OCR
+    finds something in); the images are OCR-ed together (see detect_image_batch)."""
+    names = [n for n in z.namelist() if n.startswith(prefix)]
+    imgs = [n.split('/')[-1] for n in names]
+    img_matches = []
+    if not ocr_available() or not names:
+        return imgs, img_matches
+    for base, det in zip(imgs, detect_image_batch([z.read(n) for n in names], plan=plan, budget=budget)):
+        matches = det.get('matches', [])
+        if matches:
+            img_matches.append({'image': base, 'matches': matches, 'full_text': det.get('full_text', '')})
+    return imgs, img_matches
+
+
 def blur_media_in_ooxml(data: bytes, prefixes=('word/media/', 'xl/media/'), only_names: list = None) -> bytes:
     """Open OOXML package bytes, blur images under given prefixes, and return new package bytes.
     If `only_names` is provided, only those media file basenames will be blurred; others are preserved.
@@ -825,16 +2797,298 @@ def blur_media_in_ooxml(data: bytes, prefixes=('word/media/', 'xl/media/'), only
     return outbuf.getvalue()
 
 
-def detect_image_bytes(data: bytes):
-    if pytesseract is None:
-        return {"error": "pytesseract not installed"}
-    arr = np.frombuffer(data, np.uint8)
-    img = cv2.imdecode(arr, cv2.IMREAD_COLOR)
-    if img is None:
-        return {"error": "cannot decode image"}
-    # use pytesseract to get word boxes and full text
-    d = pytesseract.image_to_data(img, output_type=pytesseract.Output.DICT)
-    matches = []
+# --- OCR engines ----------------------------------------------------------------------------
+# With tesserocr installed, OCR runs on a pool of long-lived in-process tesseract engines
+# (language data loaded once per engine, no subprocess or temp files per image), fed from a
+# bounded queue; tesserocr releases the GIL while recognising, so the engines run in
+# parallel.  Otherwise each image goes through pytesseract (one tesseract process per
+# call), several at a time in threads.  REDACT_OCR_ENGINE=pytesseract forces the fallback.
+OCR_ENGINE = os.environ.get('REDACT_OCR_ENGINE', 'auto')
+OCR_LANG = os.environ.get('REDACT_OCR_LANG', 'eng')
+OCR_WORKERS = int(os.environ.get('REDACT_OCR_WORKERS', '0')) or (os.cpu_count() or 1)
+OCR_QUEUE_SIZE = int(os.environ.get('REDACT_OCR_QUEUE', '64'))
+_OCR_POOL = None
+_OCR_THREADS = None
+_ocr_lock = threading.Lock()
+
+
+def _pil_image(img):
+    if isinstance(img, Image.Image):
+        return img
+    if img.ndim == 3:
+        img = cv2.cvtColor(img, cv2.COLOR_BGRA2RGB if img.shape[2] == 4 else cv2.COLOR_BGR2RGB)
+    return Image.fromarray(img)
+
+
+def _tesserocr_words(api, img) -> list:
+    return _prepared_words(img, lambda crop: _tesserocr_read(api, crop))
+
+
+def _tesserocr_read(api, img) -> list:
+    api.SetImage(_pil_image(img))
+    api.Recognize()
+    words = []
+    level = tesserocr.RIL.WORD
+    it = api.GetIterator()
+    if it is None:
+        return words
+    for r in tesserocr.iterate_level(it, level):
+        txt = (r.GetUTF8Text(level) or '').strip()
+        box = r.BoundingBox(level)
+        if not txt or not box:
+            continue
+        x0, y0, x1, y1 = box
+        words.append({'text': txt, 'x': x0, 'y': y0, 'w': x1 - x0, 'h': y1 - y0})
+    return words
+
+
+def _tesserocr_text(api, img) -> str:
+    def read(crop):
+        api.SetImage(_pil_image(crop))
+        return api.GetUTF8Text()
+    return _prepared_text(img, read)
+
+
+# Pre-processing: tesseract's time grows with the pixel count, so an image is first scaled
+# until its glyphs are about OCR_TEXT_HEIGHT pixels tall (10-pt text at 300 dpi), turned
+# level if the text lines are tilted, binarised, and only the blocks of text found by a
+# morphological pass are OCR-ed; margins and blank areas never reach tesseract.  Word
+# boxes are mapped back to the pixels of the image passed in.  REDACT_OCR_PREPROCESS=0
+# sends images as they are.
+OCR_PREPROCESS = os.environ.get('REDACT_OCR_PREPROCESS', '1') != '0'
+OCR_TEXT_HEIGHT = int(os.environ.get('REDACT_OCR_TEXT_HEIGHT', '24'))
+OCR_MAX_REGIONS = int(os.environ.get('REDACT_OCR_MAX_REGIONS', '12'))
+_OCR_ANALYSIS_PIXELS = 4_000_000   # glyphs are measured on a copy at most this large
+_OCR_DESKEW_PIXELS = 500_000       # and the skew on one at most this large
+_OCR_MAX_SKEW = 10                 # degrees either way
+_OCR_MIN_SKEW = 0.5                # smaller tilts are left alone
+
+
+def _binarize(gray):
+    # Otsu; text black on white whichever way round the image is
+    _, bw = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+    if cv2.countNonZero(bw) < bw.size // 2:
+        bw = cv2.bitwise_not(bw)
+    return bw
+
+
+def _shrink(img, pixels: int):
+    # (copy with at most `pixels` pixels, factor applied)
+    f = min(1.0, (pixels / img.size) ** 0.5)
+    if f == 1.0:
+        return img, 1.0
+    h, w = img.shape[:2]
+    return cv2.resize(img, (max(1, round(w * f)), max(1, round(h * f))), interpolation=cv2.INTER_AREA), f
+
+
+def _glyph_height(ink) -> float:
+    """Median height of the glyph-like blobs of a binary image (ink 255), 0 with fewer than 3."""
+    _, _, stats, _ = cv2.connectedComponentsWithStats(ink, connectivity=8)
+    w = stats[1:, cv2.CC_STAT_WIDTH]
+    h = stats[1:, cv2.CC_STAT_HEIGHT]
+    # specks, rules, frames and pictures are not glyphs (text may fill a tightly cropped line)
+    keep = (h >= 4) & (h < ink.shape[0]) & (w <= 4 * h) & (stats[1:, cv2.CC_STAT_AREA] >= 8)
+    if keep.sum() < 3:
+        return 0.0
+    return float(np.median(h[keep]))
+
+
+def _skew_angle(ink) -> float:
+    """Degrees to rotate by (counter-clockwise) to level the text lines: the angle giving the
+    sharpest row profile, to a quarter degree; 0 for tilts under _OCR_MIN_SKEW."""
+    h, w = ink.shape
+    centre = (w / 2, h / 2)
+
+    def score(a):
+        r = cv2.warpAffine(ink, cv2.getRotationMatrix2D(centre, float(a), 1.0), (w, h), flags=cv2.INTER_NEAREST)
+        rows = cv2.reduce(r, 1, cv2.REDUCE_SUM, dtype=cv2.CV_64F).ravel()
+        return float(np.square(np.diff(rows)).sum())
+
+    best = max(range(-_OCR_MAX_SKEW, _OCR_MAX_SKEW + 1), key=score)
+    best = max((best + d / 4 for d in range(-4, 5)), key=score)
+    return best if abs(best) >= _OCR_MIN_SKEW else 0.0
+
+
+def prepare_ocr_image(img) -> list:
+    """[(crop, back)] to OCR in place of `img`: binarised blocks of text scaled to
+    OCR_TEXT_HEIGHT, `back` a 2x3 matrix taking crop pixels to `img` pixels (None: the
+    crop is `img`, also what is returned when no glyphs or blocks of text are found)."""
+    if img.ndim == 3:
+        gray = cv2.cvtColor(img, cv2.COLOR_BGRA2GRAY if img.shape[2] == 4 else cv2.COLOR_BGR2GRAY)
+    else:
+        gray = img
+    h, w = gray.shape
+    if min(h, w) < 2 * OCR_TEXT_HEIGHT:
+        return [(img, None)]
+    small, f = _shrink(gray, _OCR_ANALYSIS_PIXELS)
+    ink = cv2.bitwise_not(_binarize(small))
+    glyph = _glyph_height(ink) / f
+    if not glyph:
+        return [(img, None)]
+    scale = OCR_TEXT_HEIGHT / glyph
+    if 0.8 <= scale <= 1.5:
+        # close enough: resampling would cost more than it saves
+        scale = 1.0
+    scale = min(scale, 2.0)
+    # blocks are found at the downscaled size (or the original one); only crops are enlarged
+    base, up = min(scale, 1.0), max(scale, 1.0)
+    angle = _skew_angle(_shrink(ink, _OCR_DESKEW_PIXELS)[0])
+    sw, sh = max(1, round(w * base)), max(1, round(h * base))
+    work = gray if base == 1.0 else cv2.resize(gray, (sw, sh), interpolation=cv2.INTER_AREA)
+    fwd = np.diag([sw / w, sh / h, 1.0])
+    if angle:
+        rot = cv2.getRotationMatrix2D((sw / 2, sh / 2), angle, 1.0)
+        cos, sin = abs(rot[0, 0]), abs(rot[0, 1])
+        nw, nh = int(sh * sin + sw * cos + 0.5), int(sh * cos + sw * sin + 0.5)
+        rot[0, 2] += (nw - sw) / 2
+        rot[1, 2] += (nh - sh) / 2
+        work = cv2.warpAffine(work, rot, (nw, nh), flags=cv2.INTER_LINEAR, borderMode=cv2.BORDER_REPLICATE)
+        fwd = np.vstack([rot, [0.0, 0.0, 1.0]]) @ fwd
+    H, W = work.shape
+    # blocks of text: glyphs smeared into words, lines and paragraphs
+    g = max(2, int(glyph * base))
+    blocks = cv2.dilate(cv2.bitwise_not(_binarize(work)), cv2.getStructuringElement(cv2.MORPH_RECT, (2 * g, g)))
+    _, _, stats, _ = cv2.connectedComponentsWithStats(blocks, connectivity=8)
+    pad = g // 2
+    boxes = [[x - pad, y - pad, bw + 2 * pad, bh + 2 * pad] for x, y, bw, bh, _ in stats[1:].tolist()
+             if bh >= 1.5 * g or bw >= 3 * g]
+    boxes = coalesce_rects(boxes, W, H, gap=pad)
+    if not boxes:
+        return [(img, None)]
+    if len(boxes) > OCR_MAX_REGIONS or sum(b[2] * b[3] for b in boxes) > 0.6 * W * H:
+        # many small blocks or mostly text: one crop without the margins costs less
+        x0 = min(b[0] for b in boxes); y0 = min(b[1] for b in boxes)
+        x1 = max(b[0] + b[2] for b in boxes); y1 = max(b[1] + b[3] for b in boxes)
+        boxes = [[x0, y0, x1 - x0, y1 - y0]]
+    inv = np.linalg.inv(fwd)
+    out = []
+    for x, y, bw, bh in sorted(boxes, key=lambda b: (b[1], b[0])):
+        crop = work[y:y + bh, x:x + bw]
+        if up != 1.0:
+            crop = cv2.resize(crop, (round(bw * up), round(bh * up)), interpolation=cv2.INTER_CUBIC)
+        back = inv @ np.array([[bw / crop.shape[1], 0.0, x], [0.0, bh / crop.shape[0], y], [0.0, 0.0, 1.0]])
+        # each crop on its own threshold, so light text on a dark bar comes out dark on light too
+        out.append((_binarize(crop), back[:2]))
+    return out
+
+
+def _map_words(words: list, back, width: int, height: int) -> list:
+    # boxes of the four corners through `back`, clipped to the image
+    if not words:
+        return []
+    b = np.array([[w['x'], w['y'], w['x'] + w['w'], w['y'] + w['h']] for w in words], dtype=np.float64)
+    xs = np.stack([b[:, 0], b[:, 2], b[:, 0], b[:, 2]], axis=1)
+    ys = np.stack([b[:, 1], b[:, 1], b[:, 3], b[:, 3]], axis=1)
+    px = back[0, 0] * xs + back[0, 1] * ys + back[0, 2]
+    py = back[1, 0] * xs + back[1, 1] * ys + back[1, 2]
+    x0 = np.clip(np.floor(px.min(axis=1)), 0, width).astype(int)
+    y0 = np.clip(np.floor(py.min(axis=1)), 0, height).astype(int)
+    x1 = np.clip(np.ceil(px.max(axis=1)), 0, width).astype(int)
+    y1 = np.clip(np.ceil(py.max(axis=1)), 0, height).astype(int)
+    return [{'text': w['text'], 'x': int(a), 'y': int(c), 'w': int(e - a), 'h': int(d - c)}
+            for w, a, c, e, d in zip(words, x0, y0, x1, y1)]
+
+
+def _prepared_words(img, read) -> list:
+    """read(image) -> word boxes, run on the crops prepare_ocr_image picks, boxes in `img` pixels."""
+    if not OCR_PREPROCESS:
+        return read(img)
+    words = []
+    for crop, back in prepare_ocr_image(img):
+        got = read(crop)
+        words.extend(got if back is None else _map_words(got, back, img.shape[1], img.shape[0]))
+    return words
+
+
+def _prepared_text(img, read) -> str:
+    if not OCR_PREPROCESS:
+        return read(img)
+    if isinstance(img, Image.Image):
+        img = np.asarray(img.convert('L'))
+    return '\n'.join(read(crop) for crop, _ in prepare_ocr_image(img))
+
+
+class OcrPool:
+    """Long-lived tesserocr engines, one per worker thread, taking jobs from a bounded queue.
+
+    submit(fn, img) queues fn(engine, img) and returns a concurrent.futures.Future; it blocks
+    while the queue is full, so callers producing images faster than they are read slow down
+    instead of piling them up in memory.
+    """
+
+    def __init__(self, workers: int = None, queue_size: int = None, lang: str = None):
+        self.workers = workers or OCR_WORKERS
+        self.queue = queue.Queue(maxsize=queue_size or OCR_QUEUE_SIZE)
+        # engines are created here so a missing language file fails now, not in a thread
+        self.engines = [tesserocr.PyTessBaseAPI(lang=lang or OCR_LANG) for _ in range(self.workers)]
+        self.threads = [threading.Thread(target=self._run, args=(api,), daemon=True, name=f"ocr-{i}")
+                        for i, api in enumerate(self.engines)]
+        for t in self.threads:
+            t.start()
+
+    def _run(self, api):
+        while True:
+            job = self.queue.get()
+            if job is None:
+                break
+            fn, img, fut = job
+            if not fut.set_running_or_notify_cancel():
+                continue
+            try:
+                fut.set_result(fn(api, img))
+            except Exception as e:
+                fut.set_exception(e)
+            finally:
+                api.Clear()
+        api.End()
+
+    def submit(self, fn, img) -> Future:
+        fut = Future()
+        self.queue.put((fn, img, fut))
+        return fut
+
+    def close(self):
+        for _ in self.threads:
+            self.queue.put(None)
+        for t in self.threads:
+            t.join(timeout=5)
+
+
+def ocr_available() -> bool:
+    return tesserocr is not None or pytesseract is not None
+
+
+def ocr_pool():
+    """The shared OcrPool, started on first use; None when tesserocr is not usable."""
+    global _OCR_POOL, OCR_ENGINE
+    if _OCR_POOL is None and tesserocr is not None and OCR_ENGINE in ('auto', 'tesserocr'):
+        with _ocr_lock:
+            if _OCR_POOL is None:
+                try:
+                    _OCR_POOL = OcrPool()
+                except Exception as e:
+                    print(f"[ocr] tesserocr engines not started, using pytesseract: {e}")
+                    OCR_ENGINE = 'pytesseract'
+    return _OCR_POOL
+
+
+def shutdown_ocr():
+    global _OCR_POOL, _OCR_THREADS
+    if _OCR_POOL is not None:
+        _OCR_POOL.close()
+        _OCR_POOL = None
+    if _OCR_THREADS is not None:
+        _OCR_THREADS.shutdown(wait=False, cancel_futures=True)
+        _OCR_THREADS = None
+
+
+def _pytesseract_words(img, timeout: float = 0) -> list:
+    """Tesseract word boxes of an image: [{'text', 'x', 'y', 'w', 'h'}] in pixels."""
+    return _prepared_words(img, lambda crop: _pytesseract_read(crop, timeout))
+
+
+def _pytesseract_read(img, timeout: float = 0) -> list:
+    d = pytesseract.image_to_data(img, output_type=pytesseract.Output.DICT, timeout=timeout)
     words = []
     n = len(d.get('text', []))
     for i in range(n):
@@ -843,59 +3097,98 @@ def detect_image_bytes(data: bytes):
             continue
         x = int(d.get('left', [0])[i]); y = int(d.get('top', [0])[i]); w = int(d.get('width', [0])[i]); h = int(d.get('height', [0])[i])
         words.append({'text': txt, 'x': x, 'y': y, 'w': w, 'h': h})
-    # build full text (words separated by spaces)
+    return words
+
+
+def submit_ocr_words(img, timeout: float = 0) -> Future:
+    """Word boxes of an image (see _ocr_words), computed in the background."""
+    global _OCR_THREADS
+    pool = ocr_pool()
+    if pool is not None:
+        return pool.submit(_tesserocr_words, img)
+    if _OCR_THREADS is None:
+        with _ocr_lock:
+            if _OCR_THREADS is None:
+                _OCR_THREADS = ThreadPoolExecutor(max_workers=OCR_WORKERS, thread_name_prefix='pytesseract')
+    return _OCR_THREADS.submit(_pytesseract_words, img, timeout)
+
+
+def _ocr_words(img, timeout: float = 0) -> list:
+    """OCR word boxes of an image: [{'text', 'x', 'y', 'w', 'h'}] in pixels."""
+    pool = ocr_pool()
+    if pool is not None:
+        return pool.submit(_tesserocr_words, img).result(timeout or None)
+    return _pytesseract_words(img, timeout)
+
+
+def ocr_text(img) -> str:
+    """Plain OCR text of an image, with tesseract's line breaks."""
+    pool = ocr_pool()
+    if pool is not None:
+        return pool.submit(_tesserocr_text, img).result()
+    return _prepared_text(img, pytesseract.image_to_string)
+
+
+def _locate_ocr_matches(words: list, plan: ScanPlan = None, budget: ScanBudget = None):
+    """Scan OCR words as one text and box each match: (matches with [x, y, w, h] pixel
+    rects, full text)."""
     full_text = ' '.join([w['text'] for w in words])
-    # scan for sensitive items in the full text
-    found = scan_text_for_sensitive_data(full_text)
-    # map each found match back to word boxes by searching words sequence
-    for f in found:
-        mtxt = f.get('match')
-        if not mtxt:
+    table = scan_text_table(full_text, plan, budget).deduplicated()
+    if not len(table):
+        return [], full_text
+    # character span of every word in full_text (one space between words), built once
+    lens = np.fromiter((len(w['text']) for w in words), dtype=np.int64, count=len(words))
+    wend = np.cumsum(lens + 1) - 1
+    wstart = wend - lens
+    # words overlapping [start, end): the first ending after start .. the last starting before end
+    first = np.searchsorted(wend, table.start, side='right')
+    last = np.searchsorted(wstart, table.end, side='left')
+    x0 = np.fromiter((w['x'] for w in words), dtype=np.int64, count=len(words))
+    y0 = np.fromiter((w['y'] for w in words), dtype=np.int64, count=len(words))
+    x1 = x0 + np.fromiter((w['w'] for w in words), dtype=np.int64, count=len(words))
+    y1 = y0 + np.fromiter((w['h'] for w in words), dtype=np.int64, count=len(words))
+    matches = []
+    for (cat, s, e, mtxt), i, j in zip(table.rows(), first.tolist(), last.tolist()):
+        if i >= j:
             continue
-        mlow = mtxt.lower()
-        # try to find contiguous sequence of words that contain the match
-        joined = ' '.join([w['text'] for w in words]).lower()
-        idx = joined.find(mlow)
-        if idx == -1:
-            # fallback: try to find single word containing substring
-            for w in words:
-                if mlow in w['text'].lower():
-                    matches.append({'text': mtxt, 'rect': [w['x'], w['y'], w['w'], w['h']], 'category': f.get('category')})
-                    break
+        bx, by = int(x0[i:j].min()), int(y0[i:j].min())
+        matches.append({'text': mtxt, 'rect': [bx, by, int(x1[i:j].max()) - bx, int(y1[i:j].max()) - by], 'category': cat})
+    return matches, full_text
+
+
+def detect_image_bytes(data: bytes, plan: ScanPlan = None, budget: ScanBudget = None):
+    if not ocr_available():
+        return {"error": "no OCR engine installed (tesserocr or pytesseract)"}
+    arr = np.frombuffer(data, np.uint8)
+    img = cv2.imdecode(arr, cv2.IMREAD_COLOR)
+    if img is None:
+        return {"error": "cannot decode image"}
+    # OCR word boxes and full text
+    words = _ocr_words(img)
+    matches, full_text = _locate_ocr_matches(words, plan, budget)
+    return {'matches': matches, 'full_text': full_text}
+
+
+def detect_image_batch(images: list, plan: ScanPlan = None, budget: ScanBudget = None) -> list:
+    """detect_image_bytes for several images, OCR-ed concurrently by the OCR engines (results
+    in input order; an image that cannot be read gets {'error': ...})."""
+    if not ocr_available():
+        return [{"error": "no OCR engine installed (tesserocr or pytesseract)"} for _ in images]
+    futures = []
+    for data in images:
+        img = cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+        futures.append(submit_ocr_words(img) if img is not None else None)
+    out = []
+    for fut in futures:
+        if fut is None:
+            out.append({"error": "cannot decode image"})
             continue
-        # map character index back to word indices
-        # compute cumulative lengths
-        cum = []
-        s = ''
-        for wi, w in enumerate(words):
-            if s:
-                s += ' ' + w['text']
-            else:
-                s = w['text']
-            cum.append(len(s))
-        # find start/end word indices covering idx..idx+len(mlow)-1
-        start_char = idx; end_char = idx + len(mlow) - 1
-        start_w = 0
-        while start_w < len(cum) and cum[start_w] <= start_char:
-            start_w += 1
-        end_w = start_w
-        while end_w < len(cum) and cum[end_w] <= end_char:
-            end_w += 1
-        # build bounding box across words start_w..end_w
         try:
-            xs = [words[k]['x'] for k in range(start_w, end_w+1)]
-            ys = [words[k]['y'] for k in range(start_w, end_w+1)]
-            xe = [words[k]['x'] + words[k]['w'] for k in range(start_w, end_w+1)]
-            ye = [words[k]['y'] + words[k]['h'] for k in range(start_w, end_w+1)]
-            x0 = min(xs); y0 = min(ys); x1 = max(xe); y1 = max(ye)
-            matches.append({'text': mtxt, 'rect': [int(x0), int(y0), int(x1 - x0), int(y1 - y0)], 'category': f.get('category')})
-        except Exception:
-            # last-resort: single word fallback
-            for w in words:
-                if mlow in w['text'].lower():
-                    matches.append({'text': mtxt, 'rect': [w['x'], w['y'], w['w'], w['h']], 'category': f.get('category')})
-                    break
-    return {'matches': matches, 'full_text': full_text}
+            matches, full_text = _locate_ocr_matches(fut.result(), plan, budget)
+            out.append({'matches': matches, 'full_text': full_text})
+        except Exception as e:
+            out.append({"error": str(e)})
+    return out
 
 
 def preview_docx_bytes(data: bytes, width: int = 800, line_height: int = 18) -> bytes:
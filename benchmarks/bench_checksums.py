@@ -0,0 +1,77 @@
+"""Throughput of the batch checksum validators against the scalar ones.
+
+Usage:  python -m benchmarks.bench_checksums [--rows 200000]
+
+Generates a column of card numbers, Aadhaar numbers and IBANs (about half of them valid),
+checks that luhn/verhoeff/iban_check_many agree with the scalar functions row for row, and
+prints candidates per second for both.
+"""
+import argparse
+import random
+import time
+
+from app.redact import (
+    iban_check, iban_check_many, luhn_check, luhn_check_many, verhoeff_check, verhoeff_check_many,
+)
+
+
+def _luhn_digit(body: str) -> str:
+    for d in '0123456789':
+        if luhn_check(body + d):
+            return d
+
+
+def _verhoeff_digit(body: str) -> str:
+    for d in '0123456789':
+        if verhoeff_check(body + d):
+            return d
+
+
+def _iban(rnd) -> str:
+    bban = ''.join(rnd.choice('0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ') for _ in range(18))
+    for cc in range(100):
+        s = f"DE{cc:02d}{bban}"
+        if iban_check(s):
+            return s
+
+
+def build_columns(rows: int, seed: int = 11):
+    rnd = random.Random(seed)
+    cards, aadhaar, ibans = [], [], []
+    for i in range(rows):
+        body = '4' + ''.join(rnd.choice('0123456789') for _ in range(14))
+        card = body + (_luhn_digit(body) if i % 2 else rnd.choice('0123456789'))
+        cards.append(' '.join(card[k:k + 4] for k in range(0, 16, 4)))
+        body = ''.join(rnd.choice('23456789') for _ in range(11))
+        num = body + (_verhoeff_digit(body) if i % 2 else rnd.choice('0123456789'))
+        aadhaar.append(f"{num[:4]} {num[4:8]} {num[8:]}")
+        if i % 20 == 0:
+            iban = _iban(rnd)
+        ibans.append(iban if i % 2 else iban[:-1] + rnd.choice('0123456789'))
+    return cards, aadhaar, ibans
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument('--rows', type=int, default=200000)
+    args = ap.parse_args()
+    cards, aadhaar, ibans = build_columns(args.rows)
+    print(f"{args.rows} candidates per column")
+    for name, col, scalar, batch in (('luhn', cards, luhn_check, luhn_check_many),
+                                     ('verhoeff', aadhaar, verhoeff_check, verhoeff_check_many),
+                                     ('iban', ibans, iban_check, iban_check_many)):
+        t0 = time.perf_counter()
+        ref = [scalar(c) for c in col]
+        t_scalar = time.perf_counter() - t0
+        batch(col[:100])  # warm-up
+        t0 = time.perf_counter()
+        mask = batch(col)
+        t_batch = time.perf_counter() - t0
+        if mask.tolist() != ref:
+            raise SystemExit(f"{name}: batch results differ from the scalar check")
+        print(f"{name:9s} scalar {len(col) / t_scalar / 1e3:8.0f} k/s   batch {len(col) / t_batch / 1e3:8.0f} k/s"
+              f"   {t_scalar / t_batch:5.1f}x   ({int(mask.sum())} valid)")
+
+
+if __name__ == '__main__':
+    main()
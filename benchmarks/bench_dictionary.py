@@ -0,0 +1,62 @@
+"""Load and lookup speed of a large compiled denylist.
+
+Usage:  python -m benchmarks.bench_dictionary [--entries 1000000] [--pages 100]
+
+Compiles a synthetic list of customer names into a temporary dictionary, memory-maps it,
+then reports load time, key probes per second and denylist scan throughput over the
+synthetic statement from benchmarks.bench_scanner (with some listed names mixed in).
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+import numpy as np
+
+from app.redact import CompiledDictionary, DictionarySet, compile_dictionary
+from benchmarks.bench_scanner import build_statement
+
+_FIRST = ['john', 'mary', 'ravi', 'anna', 'li', 'olga', 'pedro', 'fatima', 'yusuf', 'emma', 'noah', 'sofia']
+
+
+def _names(n: int, seed: int = 3):
+    rnd = random.Random(seed)
+    for _ in range(n):
+        yield f"{rnd.choice(_FIRST)} {''.join(rnd.choice('abcdefghijklmnopqrstuvwxyz') for _ in range(rnd.randint(5, 9)))}"
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument('--entries', type=int, default=1000000)
+    ap.add_argument('--pages', type=int, default=100)
+    args = ap.parse_args()
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'names.rdict')
+        t0 = time.perf_counter()
+        n = compile_dictionary(_names(args.entries), path)
+        t_compile = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        d = CompiledDictionary(path)
+        t_load = time.perf_counter() - t0
+        print(f"{n} keys, {os.path.getsize(path) / 1e6:.1f} MB on disk, compile {t_compile:.1f} s, load {t_load * 1000:.2f} ms")
+
+        probes = np.random.default_rng(1).integers(0, 2 ** 63, size=1000000, dtype=np.int64).astype(np.uint64)
+        probes[::2] = np.asarray(d.keys[:len(probes[::2])])
+        t0 = time.perf_counter()
+        hits = int(d.contains(probes).sum())
+        dt = time.perf_counter() - t0
+        print(f"probes : {len(probes) / dt / 1e6:6.2f} M/s ({hits} hits)")
+
+        listed = list(_names(200))
+        text = build_statement(args.pages).replace("Thank you for banking with us.", "Payee: " + listed[7].title() + ".")
+        mb = len(text.encode('utf-8')) / 1e6
+        dicts = DictionarySet([d])
+        t0 = time.perf_counter()
+        spans = dicts.deny_spans(text)
+        dt = time.perf_counter() - t0
+        print(f"scan   : {mb / dt:6.2f} MB/s ({len(spans)} denied spans in {mb:.2f} MB)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+"""Cost of the image obfuscation modes over region count and image size.
+
+Usage:  python -m benchmarks.bench_image_modes [--megapixels 1 4 12] [--regions 10 100 1000] [--repeat 3]
+
+Regions look like OCR word hits: boxes along text lines, each reported two or three times
+with small offsets, so they overlap.  For every size and count it times obfuscate_regions
+per mode (the pixel work only, no decode/encode), and "blur (before)", the previous loop:
+one Gaussian per reported box, overlaps done again each time.
+"""
+import argparse
+import random
+import time
+
+import cv2
+import numpy as np
+
+from app import redact
+
+
+def ocr_like_regions(width: int, height: int, count: int, seed: int = 11) -> list:
+    rnd = random.Random(seed)
+    line_h = max(12, height // 80)
+    out = []
+    y = line_h
+    x = 0
+    while len(out) < count:
+        w = rnd.randint(line_h * 2, line_h * 8)
+        if x + w > width:
+            x = 0
+            y += line_h * 2
+            if y + line_h > height:
+                y = line_h
+        for _ in range(rnd.randint(1, 3)):
+            out.append([max(0, x + rnd.randint(-2, 2)), max(0, y + rnd.randint(-2, 2)), w + rnd.randint(-2, 2), line_h])
+        # the gap between words is wider than on most lines, so words stay separate boxes
+        x += w + rnd.randint(line_h, line_h * 6)
+    return out[:count]
+
+
+def blur_before(img, regions):
+    for x, y, w, h in regions:
+        x, y, w, h = int(x), int(y), int(w), int(h)
+        roi = img[y:y+h, x:x+w]
+        k = max(3, (w//7)|1)
+        img[y:y+h, x:x+w] = cv2.GaussianBlur(roi, (k, k), 0)
+    return img
+
+
+def _best(fn, img, regions, repeat):
+    best = None
+    for _ in range(repeat):
+        work = img.copy()
+        t0 = time.perf_counter()
+        fn(work, regions)
+        dt = time.perf_counter() - t0
+        best = dt if best is None else min(best, dt)
+    return best
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument('--megapixels', type=float, nargs='+', default=[1, 4, 12])
+    ap.add_argument('--regions', type=int, nargs='+', default=[10, 100, 1000])
+    ap.add_argument('--repeat', type=int, default=3)
+    args = ap.parse_args()
+    modes = [('blur (before)', blur_before)] + [
+        (m, lambda img, r, m=m: redact.obfuscate_regions(img, r, m)) for m in redact.IMAGE_REDACT_MODES]
+    print(f"{'MP':>4s} {'regions':>7s} {'merged':>6s} " + ' '.join(f"{name:>13s}" for name, _ in modes) + "   (ms)")
+    for mp in args.megapixels:
+        w = int((mp * 1e6 * 4 / 3) ** 0.5)
+        h = int(w * 3 / 4)
+        img = np.random.default_rng(1).integers(0, 256, (h, w, 3), dtype=np.uint8)
+        for n in args.regions:
+            regions = ocr_like_regions(w, h, n)
+            merged = len(redact.coalesce_rects(regions, w, h))
+            times = [_best(fn, img, regions, args.repeat) for _, fn in modes]
+            print(f"{mp:4g} {n:7d} {merged:6d} " + ' '.join(f"{t * 1000:13.1f}" for t in times))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+"""OCR throughput: pooled in-process tesserocr engines vs a pytesseract process per image.
+
+Usage:  python -m benchmarks.bench_ocr_engine [--images 40] [--workers 1 2 4] [--engines tesserocr pytesseract]
+
+Renders --images small text images (a few lines each, one email address) and runs them
+through detect_image_batch with each engine and worker count, printing images/s and how
+many of the addresses were found.  Engines that are not installed are skipped.
+"""
+import argparse
+import time
+
+import cv2
+import numpy as np
+from PIL import Image, ImageDraw, ImageFont
+
+from app import redact
+
+_LINES = (
+    'Statement for the period ending {n:02d} March',
+    'Questions can go to billing{n}@example.com',
+    'Closing balance carried to the next page',
+)
+
+
+def build_images(count: int) -> list:
+    try:
+        font = ImageFont.truetype('DejaVuSans.ttf', 28)
+    except Exception:
+        font = ImageFont.load_default()
+    out = []
+    for n in range(count):
+        img = Image.new('L', (900, 160), 255)
+        draw = ImageDraw.Draw(img)
+        for i, line in enumerate(_LINES):
+            draw.text((20, 15 + 45 * i), line.format(n=n), fill=0, font=font)
+        out.append(cv2.imencode('.png', np.asarray(img))[1].tobytes())
+    return out
+
+
+def _engine_ok(name: str) -> str:
+    """'' when the engine can run here, else why not."""
+    try:
+        if name == 'tesserocr':
+            if redact.tesserocr is None:
+                return 'tesserocr not installed'
+            redact.tesserocr.PyTessBaseAPI(lang=redact.OCR_LANG).End()
+        else:
+            if redact.pytesseract is None:
+                return 'pytesseract not installed'
+            redact.pytesseract.get_tesseract_version()
+    except Exception as e:
+        return str(e).splitlines()[0] if str(e) else type(e).__name__
+    return ''
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument('--images', type=int, default=40)
+    ap.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4])
+    ap.add_argument('--engines', nargs='+', default=['tesserocr', 'pytesseract'])
+    args = ap.parse_args()
+    images = build_images(args.images)
+    plan = redact.compile_scan_plan(['email'])
+    print(f"{args.images} images, {sum(map(len, images)) / 1e3:.0f} KB of PNG")
+    print(f"{'engine':12s} {'workers':>7s} {'seconds':>8s} {'images/s':>9s} {'emails':>7s}")
+    for name in args.engines:
+        why = _engine_ok(name)
+        if why:
+            print(f"{name:12s} skipped: {why}")
+            continue
+        for w in args.workers:
+            redact.shutdown_ocr()
+            redact.OCR_ENGINE = name
+            redact.OCR_WORKERS = w
+            # start the engines outside the timing, as the server does once at first use
+            redact.ocr_pool()
+            t0 = time.perf_counter()
+            res = redact.detect_image_batch(images, plan)
+            dt = time.perf_counter() - t0
+            found = sum(len(r.get('matches', [])) for r in res)
+            print(f"{name:12s} {w:7d} {dt:8.2f} {len(images) / dt:9.1f} {found:7d}")
+    redact.shutdown_ocr()
+
+
+if __name__ == '__main__':
+    main()
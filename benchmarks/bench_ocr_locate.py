@@ -0,0 +1,66 @@
+"""Mapping scanner matches back to OCR word boxes on dense pages.
+
+Usage:  python -m benchmarks.bench_ocr_locate [--words 1000 5000 20000] [--every 25] [--repeat 3]
+
+Builds synthetic OCR output (word boxes laid out in lines) with an email or a phone number
+split over three words every --every words, and times _locate_ocr_matches, which scans the
+joined text and boxes every match.  Scanning alone is timed too, so the rest is the cost
+of the mapping; every match should come back with its own box.
+"""
+import argparse
+import random
+import time
+
+from app import redact
+
+_VOCAB = 'the balance of each ledger please review items below and closing statement'.split()
+
+
+def build_words(count: int, every: int) -> list:
+    rnd = random.Random(7)
+    words = []
+    x = y = 0
+    n = 0
+    while len(words) < count:
+        n += 1
+        if n % every == 0:
+            texts = rnd.choice([[f"user{n}@example.com"], ['+91', f"98{n % 1000:03d}", f"4{n % 10000:04d}"]])
+        else:
+            texts = [rnd.choice(_VOCAB)]
+        for t in texts:
+            words.append({'text': t, 'x': x, 'y': y, 'w': 9 * len(t), 'h': 14})
+            x += 9 * len(t) + 7
+            if x > 2000:
+                x, y = 0, y + 20
+    return words
+
+
+def _best(fn, repeat):
+    best = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        out = fn()
+        dt = time.perf_counter() - t0
+        best = dt if best is None else min(best, dt)
+    return best, out
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument('--words', type=int, nargs='+', default=[1000, 5000, 20000])
+    ap.add_argument('--every', type=int, default=25)
+    ap.add_argument('--repeat', type=int, default=3)
+    args = ap.parse_args()
+    plan = redact.compile_scan_plan()
+    print(f"{'words':>7s} {'matches':>8s} {'boxes':>6s} {'scan ms':>8s} {'total ms':>9s}")
+    for n in args.words:
+        words = build_words(n, args.every)
+        text = ' '.join(w['text'] for w in words)
+        scan, _ = _best(lambda: redact.scan_text_table(text, plan).deduplicated(), args.repeat)
+        total, (matches, _) = _best(lambda: redact._locate_ocr_matches(words, plan), args.repeat)
+        boxes = len({tuple(m['rect']) for m in matches})
+        print(f"{n:7d} {len(matches):8d} {boxes:6d} {scan * 1000:8.1f} {total * 1000:9.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+"""OCR pre-processing: pixels sent to tesseract and OCR time with and without it.
+
+Usage:  python -m benchmarks.bench_ocr_preprocess [--dpi 600] [--tilt 2.5] [--repeat 3]
+
+Builds a tilted A4 scan at --dpi with a short letter in the middle of wide margins and a
+2560x1440 screenshot with a few small blocks of text, times prepare_ocr_image on each and
+prints the share of pixels left to OCR.  With an OCR engine installed it also times
+detect_image_bytes with REDACT_OCR_PREPROCESS on and off and reports the emails found.
+"""
+import argparse
+import time
+
+import cv2
+import numpy as np
+from PIL import Image, ImageDraw, ImageFont
+
+from app import redact
+
+
+def _font(size):
+    try:
+        return ImageFont.truetype('DejaVuSans.ttf', size)
+    except Exception:
+        return ImageFont.load_default()
+
+
+def build_scan(dpi: int, tilt: float):
+    w, h = int(8.27 * dpi), int(11.69 * dpi)
+    img = Image.new('L', (w, h), 235)
+    draw = ImageDraw.Draw(img)
+    font = _font(int(10 / 72 * dpi))
+    y = int(1.5 * dpi)
+    for i in range(14):
+        line = f"Transfer {i:02d} was booked to the account ending {1000 + 37 * i}"
+        if i % 5 == 2:
+            line = f"Questions about item {i} can go to billing{i}@example.com"
+        draw.text((dpi, y), line, fill=20, font=font)
+        y += int(16 / 72 * dpi)
+    a = cv2.warpAffine(np.asarray(img), cv2.getRotationMatrix2D((w / 2, h / 2), tilt, 1.0), (w, h), borderValue=235)
+    noise = np.random.default_rng(0).normal(0, 6, a.shape)
+    return np.clip(a + noise, 0, 255).astype(np.uint8)
+
+
+def build_screenshot():
+    img = Image.new('RGB', (2560, 1440), (250, 250, 250))
+    draw = ImageDraw.Draw(img)
+    font = _font(16)
+    draw.rectangle((0, 0, 2560, 40), fill=(40, 40, 60))
+    draw.text((20, 10), 'Inbox - Mail', fill=(230, 230, 230), font=font)
+    for i in range(8):
+        draw.text((300, 200 + 24 * i), f"From: user{i}@example.com  Subject: invoice {i}", fill=(30, 30, 30), font=font)
+    draw.text((1800, 1200), 'Call 555-0100 for help', fill=(30, 30, 30), font=font)
+    return cv2.cvtColor(np.asarray(img), cv2.COLOR_RGB2BGR)
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument('--dpi', type=int, default=600)
+    ap.add_argument('--tilt', type=float, default=2.5)
+    ap.add_argument('--repeat', type=int, default=3)
+    args = ap.parse_args()
+    images = {'scan': build_scan(args.dpi, args.tilt), 'screenshot': build_screenshot()}
+    print(f"{'image':11s} {'pixels':>8s} {'crops':>6s} {'to OCR':>8s} {'prep ms':>8s}")
+    for name, img in images.items():
+        best = None
+        for _ in range(args.repeat):
+            t0 = time.perf_counter()
+            parts = redact.prepare_ocr_image(img)
+            dt = time.perf_counter() - t0
+            best = dt if best is None else min(best, dt)
+        px = sum(c.shape[0] * c.shape[1] for c, _ in parts)
+        total = img.shape[0] * img.shape[1]
+        print(f"{name:11s} {total / 1e6:7.1f}M {len(parts):6d} {px / total:8.1%} {best * 1000:8.1f}")
+    try:
+        if redact.ocr_pool() is None:
+            redact.pytesseract.get_tesseract_version()
+    except Exception as e:
+        print(f"tesseract not available ({e}); OCR timings skipped")
+        return
+    plan = redact.compile_scan_plan(['email'])
+    print(f"{'image':11s} {'preprocess':>10s} {'seconds':>8s} {'emails':>7s}")
+    for name, img in images.items():
+        data = cv2.imencode('.png', img)[1].tobytes()
+        for on in (False, True):
+            redact.OCR_PREPROCESS = on
+            t0 = time.perf_counter()
+            res = redact.detect_image_bytes(data, plan)
+            dt = time.perf_counter() - t0
+            print(f"{name:11s} {'on' if on else 'off':>10s} {dt:8.2f} {len(res.get('matches', [])):7d}")
+    redact.shutdown_ocr()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+"""Worst-case scan time per MB over a corpus of backtracking-prone inputs.
+
+Usage:  python -m benchmarks.bench_pathological [--kb 64 256] [--budget 0.5]
+
+Each input is built at every size in --kb; the scan time per MB should stay flat as the
+input grows (a quadratic detector shows up as s/MB growing with the size).  With --budget
+every input is scanned once more under a ScanBudget, to show the scan stops near the budget
+and reports itself incomplete.
+"""
+import argparse
+import time
+
+from app.redact import ScanBudget, scan_text_for_sensitive_data
+
+# name -> repeating unit; each one keeps some detector retrying over a long run
+CORPUS = {
+    'email_no_at': 'a',                        # local-part run that never reaches an '@'
+    'email_many_at': 'a@',                     # '@' with no domain, over and over
+    'jwt_no_dots': 'eyJ-',                     # JWT starts inside one token run
+    'jwt_one_dot': 'eyJa.',                    # first segment ok, the rest never is
+    'masked_stars': '*',                       # a '****' lead at every position
+    'digits_spaces': '1 ',                     # CARD / ACC_GENERIC / PHONE separators
+    'digits_dashes': '1-',
+    'digit_wide_gaps': '1' + ' ' * 30,         # CARD_RE's lazy separator loop
+    'digits_parens': '1(',
+    'digit_run': '1',
+    'card_almost': '4111 1111 1111 111x ',     # 15 digits, never a full card
+    'api_key_run': 'A',                        # one token run longer than API_KEY_RE allows
+    'passport_repeat': 'passport ',
+    'password_repeat': 'pass=',
+    'iban_like': 'DE89 ',
+}
+
+
+def build(unit: str, kb: int) -> str:
+    n = kb * 1024
+    return (unit * (n // len(unit) + 1))[:n]
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument('--kb', type=int, nargs='+', default=[64, 256])
+    ap.add_argument('--budget', type=float, default=None)
+    args = ap.parse_args()
+    print(f"{'input':18s}" + ''.join(f"{f'{kb} KB s/MB':>14s}" for kb in args.kb))
+    worst = 0.0
+    for name, unit in CORPUS.items():
+        rates = []
+        for kb in args.kb:
+            text = build(unit, kb)
+            t0 = time.perf_counter()
+            scan_text_for_sensitive_data(text)
+            rates.append((time.perf_counter() - t0) / (len(text) / 1e6))
+        worst = max(worst, max(rates))
+        print(f"{name:18s}" + ''.join(f"{r:14.2f}" for r in rates))
+    print(f"worst case: {worst:.2f} s/MB")
+    if args.budget:
+        kb = max(args.kb)
+        print(f"\nwith ScanBudget({args.budget}) at {kb} KB:")
+        for name, unit in CORPUS.items():
+            budget = ScanBudget(args.budget)
+            t0 = time.perf_counter()
+            found = scan_text_for_sensitive_data(build(unit, kb), budget=budget)
+            dt = time.perf_counter() - t0
+            flag = 'incomplete' if budget.exhausted else 'complete'
+            print(f"{name:18s} {dt * 1000:8.1f} ms  {len(found):6d} matches  {flag}")
+
+
+if __name__ == '__main__':
+    main()
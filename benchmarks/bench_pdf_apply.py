@@ -0,0 +1,83 @@
+"""Batched redaction annotations against one drawn shape per rect.
+
+Usage:  python -m benchmarks.bench_pdf_apply [--pages 40]
+
+Collects the marks redact_pdf_session would apply to a statement-like PDF (detections,
+masked emails, phone boxes), then applies them two ways on fresh copies of the document:
+the previous approach (new_shape/commit per rect, white box plus insert_textbox per email,
+text left underneath) and apply_pdf_redactions (annotations plus one apply_redactions per
+page).  Prints time, output size and how many of the detected strings are still
+extractable from the output.
+"""
+import argparse
+import io
+import time
+
+import fitz
+
+from app import redact
+from benchmarks.bench_pdf_pool import build_pdf
+
+
+def collect_marks(data: bytes) -> dict:
+    marks = {}
+    with redact.PdfSession(data) as session:
+        for pno in range(len(session)):
+            auto = redact._pdf_auto_marks(session, pno)
+            if auto:
+                for x0, y0, x1, y1, masked in auto[0]:
+                    marks.setdefault(pno, []).append(((x0, y0, x1, y1), (1, 1, 1), masked, True))
+                for rect in auto[1]:
+                    marks.setdefault(pno, []).append((rect, (0, 0, 0), None, True))
+        for p in redact.detect_pdf_session(session):
+            for m in p['matches']:
+                marks.setdefault(p['page'], []).append((tuple(m['rect']), (0, 0, 0), None, True))
+    return marks
+
+
+def apply_shapes(page, marks):
+    # the shape-per-rect drawing redact_pdf_session used before
+    for rect, fill, text, _ in marks:
+        r = fitz.Rect(rect)
+        shape = page.new_shape()
+        shape.draw_rect(r)
+        shape.finish(fill=fill)
+        shape.commit()
+        if text:
+            page.insert_textbox(r, text, fontsize=max(6, (r.y1 - r.y0) * 0.7), color=(0, 0, 0))
+
+
+def _run(data, marks, apply):
+    doc = fitz.open(stream=data, filetype='pdf')
+    t0 = time.perf_counter()
+    for pno in sorted(marks):
+        apply(doc.load_page(pno), marks[pno])
+    buf = io.BytesIO()
+    doc.save(buf)
+    dt = time.perf_counter() - t0
+    out = buf.getvalue()
+    text = '\n'.join(page.get_text() for page in fitz.open(stream=out, filetype='pdf'))
+    doc.close()
+    return dt, out, text
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument('--pages', type=int, default=40)
+    args = ap.parse_args()
+    data = build_pdf(args.pages)
+    marks = collect_marks(data)
+    secrets = set()
+    with redact.PdfSession(data) as session:
+        for p in redact.detect_pdf_session(session):
+            secrets.update(m['text'] for m in p['matches'] if len(m['text']) >= 6)
+    print(f"{args.pages} pages, {len(data) / 1e3:.0f} KB, {sum(map(len, marks.values()))} rects, "
+          f"{len(secrets)} distinct detected strings")
+    for name, apply in (('shape per rect', apply_shapes), ('annotations', redact.apply_pdf_redactions)):
+        dt, out, text = _run(data, marks, apply)
+        left = sum(1 for s in secrets if s in text)
+        print(f"{name:15s} {dt:7.2f} s  {len(out) / 1e3:8.0f} KB  {left:5d} detected strings still in the text")
+
+
+if __name__ == '__main__':
+    main()
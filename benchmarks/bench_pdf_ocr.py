@@ -0,0 +1,85 @@
+"""OCR of scanned pages in a mixed digital/scanned PDF.
+
+Usage:  python -m benchmarks.bench_pdf_ocr [--pages 40] [--scan-every 4] [--dpi 300] [--workers 1 2 4]
+
+Builds a statement PDF where every --scan-every'th page is replaced by a 150 dpi picture of
+itself, then times detection without OCR, with OCR of the image-only pages (per worker
+count, with the OCR engines restarted for each) and OCR of every page (the naive approach),
+and prints how many of the detections on the digital originals of the scanned pages were
+found again by OCR.  Needs tesserocr or the tesseract binary; without them only the page
+classification is timed.
+"""
+import argparse
+import time
+
+import fitz
+
+from app import redact
+from benchmarks.bench_pdf_pool import build_pdf
+
+
+def build_mixed(pages: int, scan_every: int):
+    digital = fitz.open(stream=build_pdf(pages), filetype='pdf')
+    doc = fitz.open()
+    scanned = []
+    for pno in range(pages):
+        if pno % scan_every == scan_every - 1:
+            src = digital.load_page(pno)
+            page = doc.new_page(width=src.rect.width, height=src.rect.height)
+            page.insert_image(page.rect, stream=src.get_pixmap(dpi=150).tobytes('jpeg'))
+            scanned.append(pno)
+        else:
+            doc.insert_pdf(digital, from_page=pno, to_page=pno)
+    return digital.tobytes(), doc.tobytes(), scanned
+
+
+def _count(found, pages):
+    return sum(len(p['matches']) for p in found if p['page'] in pages)
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument('--pages', type=int, default=40)
+    ap.add_argument('--scan-every', type=int, default=4)
+    ap.add_argument('--dpi', type=int, default=300)
+    ap.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4])
+    args = ap.parse_args()
+    digital, mixed, scanned = build_mixed(args.pages, args.scan_every)
+    want = _count(redact.detect_pdf_bytes(digital, ocr=False), set(scanned))
+    with redact.PdfSession(mixed) as session:
+        t0 = time.perf_counter()
+        image_only = redact.pdf_image_only_pages(session)
+        dt = time.perf_counter() - t0
+    print(f"{args.pages} pages, {len(scanned)} scanned ({len(mixed) / 1e6:.1f} MB); "
+          f"classified {len(image_only)} as image-only in {dt * 1000:.1f} ms")
+    assert image_only == scanned
+    try:
+        if redact.ocr_pool() is None:
+            redact.pytesseract.get_tesseract_version()
+    except Exception as e:
+        print(f"tesseract not available ({e}); OCR timings skipped")
+        return
+    t0 = time.perf_counter()
+    redact.detect_pdf_bytes(mixed, ocr=False)
+    print(f"{'text only':22s} {time.perf_counter() - t0:8.2f} s")
+    plan = redact.compile_scan_plan()
+    for w in args.workers:
+        redact.shutdown_ocr()
+        redact.OCR_WORKERS = w
+        redact.ocr_pool()
+        with redact.PdfSession(mixed) as session:
+            t0 = time.perf_counter()
+            pages = redact.pdf_map_pages(session, redact._detect_pdf_page, (plan,))
+            ocr = redact.ocr_pdf_pages(session, redact.pdf_image_only_pages(session), plan, dpi=args.dpi, workers=w)
+            dt = time.perf_counter() - t0
+        got = sum(len(m) for m in ocr.values())
+        print(f"{'image-only OCR, ' + str(w) + ' eng':22s} {dt:8.2f} s  {got} OCR matches "
+              f"({want} on the digital originals)  {sum(map(len, filter(None, pages)))} text matches")
+    with redact.PdfSession(mixed) as session:
+        t0 = time.perf_counter()
+        redact.ocr_pdf_pages(session, list(range(len(session))), plan, dpi=args.dpi, workers=max(args.workers))
+        print(f"{'OCR every page':22s} {time.perf_counter() - t0:8.2f} s")
+
+
+if __name__ == '__main__':
+    main()
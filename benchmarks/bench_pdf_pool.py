@@ -0,0 +1,72 @@
+"""Scaling of page-sharded PDF detection and redaction with the number of worker processes.
+
+Usage:  python -m benchmarks.bench_pdf_pool [--pages 400] [--workers 1 2 4 8]
+
+Builds a statement-like PDF, runs detect_pdf_session and redact_pdf_session with each
+worker count (1 = in-process), checks that every run finds the same matches, and prints
+the time and speedup over one process.  Pool start-up is excluded (one warm-up call per
+worker count); the threshold REDACT_PDF_POOL_MIN_PAGES is ignored here.
+"""
+import argparse
+import contextlib
+import io
+import os
+import time
+
+import fitz
+
+from app import redact
+from benchmarks.bench_scanner import build_statement
+
+
+def build_pdf(pages: int) -> bytes:
+    doc = fitz.open()
+    for text in build_statement(pages).split('\f'):
+        page = doc.new_page()
+        y = 40
+        for line in text.strip('\n').split('\n')[:45]:
+            page.insert_text((30, y), line, fontsize=8)
+            y += 16
+    return doc.tobytes()
+
+
+def _run(data, workers):
+    redact.PDF_POOL_WORKERS = workers
+    with redact.PdfSession(data) as session:
+        t0 = time.perf_counter()
+        found = redact.detect_pdf_session(session, workers=workers)
+        t1 = time.perf_counter()
+        regions = [{'page': p['page'], 'rect': m['rect']} for p in found for m in p['matches']]
+        with contextlib.redirect_stdout(io.StringIO()):
+            out = redact.redact_pdf_session(session, regions)
+        t2 = time.perf_counter()
+    return t1 - t0, t2 - t1, found, len(out)
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument('--pages', type=int, default=400)
+    ap.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4, 8])
+    args = ap.parse_args()
+    data = build_pdf(args.pages)
+    redact.PDF_POOL_MIN_PAGES = 2
+    print(f"{args.pages} pages, {len(data) / 1e6:.1f} MB, {os.cpu_count()} CPUs")
+    print(f"{'workers':>7s} {'detect s':>9s} {'redact s':>9s} {'speedup':>8s}")
+    base = None
+    ref = None
+    for w in args.workers:
+        if w > 1:
+            _run(build_pdf(4), w)  # start the pool
+        det, red, found, _ = _run(data, w)
+        if ref is None:
+            ref = found
+        elif found != ref:
+            raise SystemExit(f"{w} workers found different matches")
+        total = det + red
+        base = base or total
+        print(f"{w:7d} {det:9.2f} {red:9.2f} {base / total:7.2f}x")
+    redact.shutdown_pdf_pools()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,78 @@
+"""Latency and output size of the PDF save modes (full, compact, incremental).
+
+Usage:  python -m benchmarks.bench_pdf_save [--pages 200] [--repeat 3]
+
+Three documents: a clean one (nothing to redact, so no save at all; the previous
+save-and-compare cost is shown next to it), a long one with a single email address on one
+page (few edits), and a statement with every detection redacted (many edits).  Each is
+redacted with redact_pdf_session in every save mode; the best time per mode and the output
+size are printed.
+"""
+import argparse
+import contextlib
+import io
+import time
+
+import fitz
+
+from app import redact
+from benchmarks.bench_pdf_pool import build_pdf
+from benchmarks.corpus import _FILLER
+
+
+def filler_pdf(pages: int, email_page: int = None) -> bytes:
+    doc = fitz.open()
+    words = _FILLER * 3
+    for pno in range(pages):
+        page = doc.new_page()
+        for i in range(45):
+            line = ' '.join(words[(pno * 7 + i * 5) % len(_FILLER):][:12])
+            if pno == email_page and i == 20:
+                line = 'Questions can go to jane.roe@example.com at any time.'
+            page.insert_text((30, 40 + 16 * i), line, fontsize=8)
+    return doc.tobytes()
+
+
+def _regions(data):
+    with redact.PdfSession(data) as session:
+        return [{'page': p['page'], 'rect': m['rect']} for p in redact.detect_pdf_session(session) for m in p['matches']]
+
+
+def _time(data, regions, mode, repeat):
+    best = None
+    for _ in range(repeat):
+        with redact.PdfSession(data) as session, contextlib.redirect_stdout(io.StringIO()):
+            t0 = time.perf_counter()
+            out = redact.redact_pdf_session(session, regions, save_mode=mode)
+            dt = time.perf_counter() - t0
+        best = dt if best is None else min(best, dt)
+    return best, out
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument('--pages', type=int, default=200)
+    ap.add_argument('--repeat', type=int, default=3)
+    args = ap.parse_args()
+    docs = [
+        ('clean', filler_pdf(args.pages), False),
+        ('one edit', filler_pdf(args.pages, email_page=args.pages // 2), False),
+        ('statement', build_pdf(args.pages), True),
+    ]
+    print(f"{'document':10s} {'input KB':>9s} {'mode':>12s} {'time ms':>9s} {'output KB':>10s}")
+    for name, data, detect in docs:
+        regions = _regions(data) if detect else []
+        for mode in redact.PDF_SAVE_MODES:
+            dt, out = _time(data, regions, mode, args.repeat)
+            note = '  (unchanged, not saved)' if out is data else ''
+            print(f"{name:10s} {len(data) / 1e3:9.0f} {mode:>12s} {dt * 1000:9.1f} {len(out) / 1e3:10.0f}{note}")
+        if name == 'clean':
+            # what every request paid before: a full save and a byte comparison
+            with redact.PdfSession(data) as session:
+                t0 = time.perf_counter()
+                same = redact.save_pdf(session.doc) == data
+                print(f"{name:10s} {'':9s} {'save+compare':>12s} {(time.perf_counter() - t0) * 1000:9.1f} {'':10s}  (identical={same})")
+
+
+if __name__ == '__main__':
+    main()
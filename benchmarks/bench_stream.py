@@ -0,0 +1,51 @@
+"""Peak memory and throughput of the streaming scanner against a whole-text scan.
+
+Usage:  python -m benchmarks.bench_stream [--pages 300] [--chunk 65536]
+
+Streams the synthetic statement from benchmarks.bench_scanner in fixed-size chunks through
+iter_sensitive_data, checks it finds the same matches as scan_text_for_sensitive_data, and
+prints time and tracemalloc peak for both (the text itself is excluded from the peaks).
+"""
+import argparse
+import time
+import tracemalloc
+
+from app.redact import iter_sensitive_data, scan_text_for_sensitive_data
+from benchmarks.bench_scanner import build_statement
+
+
+def _measure(fn):
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    res = fn()
+    dt = time.perf_counter() - t0
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return dt, peak, res
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument('--pages', type=int, default=300)
+    ap.add_argument('--chunk', type=int, default=1 << 16)
+    args = ap.parse_args()
+    text = build_statement(args.pages)
+    mb = len(text.encode('utf-8')) / 1e6
+
+    def chunks():
+        for i in range(0, len(text), args.chunk):
+            yield text[i:i + args.chunk]
+
+    # count matches only, so the streamed run holds no result list
+    t_whole, p_whole, n_whole = _measure(lambda: len(scan_text_for_sensitive_data(text)))
+    t_stream, p_stream, n_stream = _measure(lambda: sum(1 for _ in iter_sensitive_data(chunks())))
+    key = lambda m: (m['start'], m['end'], m['category'])
+    if sorted(map(key, iter_sensitive_data(chunks()))) != sorted(map(key, scan_text_for_sensitive_data(text))):
+        raise SystemExit("streamed matches differ from the whole-text scan")
+    print(f"text: {args.pages} pages, {mb:.2f} MB, {n_whole} matches, chunk {args.chunk} chars")
+    print(f"whole : {t_whole * 1000:8.1f} ms  {mb / t_whole:6.2f} MB/s  peak {p_whole / 1e6:7.2f} MB")
+    print(f"stream: {t_stream * 1000:8.1f} ms  {mb / t_stream:6.2f} MB/s  peak {p_stream / 1e6:7.2f} MB")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,134 @@
+"""Scanner throughput and accuracy per category on the synthetic corpus, with baselines.
+
+Usage:  python -m benchmarks.bench_suite [--lines 20000] [--repeat 3] [--density email=0.1 ...]
+                                          [--baseline benchmarks/baseline.json] [--save] [--threshold 0.2]
+
+For the full detector set and for a plan limited to each corpus category it prints MB/s and
+matches/s, then precision and recall of the de-duplicated matches against the corpus labels
+(a match counts when it overlaps a label of the same category).  --save stores the numbers
+as the baseline; otherwise an existing baseline is compared and any throughput more than
+--threshold below it is reported as a regression (exit status 1).  Baselines are only
+comparable on the same machine and corpus settings.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+from app.redact import compile_scan_plan, scan_text_table
+from benchmarks.corpus import CORPUS_CATEGORIES, generate_corpus
+
+_DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), 'baseline.json')
+
+
+def _time_scan(text, plan, repeat):
+    best = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        table = scan_text_table(text, plan).deduplicated()
+        dt = time.perf_counter() - t0
+        best = dt if best is None else min(best, dt)
+    return best, table
+
+
+def _accuracy(rows, labels, categories):
+    """{category: (true positives, false positives, missed labels, labels)} by span overlap."""
+    out = {}
+    for cat in categories:
+        want = [(s, e) for c, s, e in labels if c == cat]
+        got = [(s, e) for c, s, e, _ in rows if c == cat]
+        ws = np.array([s for s, _ in want], dtype=np.int64)
+        we = np.array([e for _, e in want], dtype=np.int64)
+        hit = np.zeros(len(want), dtype=bool)
+        tp = fp = 0
+        for s, e in got:
+            # labels are disjoint and sorted: only the ones starting before e can overlap
+            i = np.searchsorted(ws, e)
+            j = np.searchsorted(we, s, side='right')
+            if j < i:
+                hit[j:i] = True
+                tp += 1
+            else:
+                fp += 1
+        out[cat] = (tp, fp, int((~hit).sum()), len(want))
+    return out
+
+
+def run(lines, density, repeat):
+    text, labels = generate_corpus(lines, density)
+    mb = len(text.encode('utf-8')) / 1e6
+    results = {}
+    seconds, table = _time_scan(text, compile_scan_plan(), repeat)
+    rows = list(table.rows())
+    results['overall'] = {'mb_s': mb / seconds, 'matches_s': len(rows) / seconds}
+    for cat in CORPUS_CATEGORIES:
+        dt, t = _time_scan(text, compile_scan_plan([cat]), repeat)
+        results[cat] = {'mb_s': mb / dt, 'matches_s': len(t) / dt}
+    acc = _accuracy(rows, labels, CORPUS_CATEGORIES)
+    for cat, (tp, fp, missed, n) in acc.items():
+        results[cat]['precision'] = tp / (tp + fp) if tp + fp else 1.0
+        results[cat]['recall'] = (n - missed) / n if n else 1.0
+    labelled = set(CORPUS_CATEGORIES)
+    stray = sum(1 for c, _, _, _ in rows if c not in labelled)
+    tp = sum(a[0] for a in acc.values())
+    fn = sum(a[2] for a in acc.values())
+    results['overall']['precision'] = tp / max(1, len(rows))
+    results['overall']['recall'] = (len(labels) - fn) / max(1, len(labels))
+    info = {'lines': lines, 'density': density, 'mb': round(mb, 3), 'labels': len(labels), 'stray': stray}
+    return info, results
+
+
+def _parse_density(items):
+    out = {}
+    for item in items or []:
+        cat, _, rate = item.partition('=')
+        out[cat] = float(rate)
+    return out
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument('--lines', type=int, default=20000)
+    ap.add_argument('--repeat', type=int, default=3)
+    ap.add_argument('--density', nargs='*', metavar='CATEGORY=RATE')
+    ap.add_argument('--baseline', default=_DEFAULT_BASELINE)
+    ap.add_argument('--save', action='store_true', help='store this run as the baseline')
+    ap.add_argument('--threshold', type=float, default=0.2, help='allowed slowdown vs the baseline (0.2 = 20%%)')
+    args = ap.parse_args()
+    density = _parse_density(args.density)
+    info, results = run(args.lines, density, args.repeat)
+    print(f"corpus: {info['lines']} lines, {info['mb']:.2f} MB, {info['labels']} labelled items, "
+          f"{info['stray']} matches in unlabelled categories")
+    print(f"{'category':14s} {'MB/s':>8s} {'matches/s':>11s} {'precision':>10s} {'recall':>8s}")
+    for name, r in results.items():
+        print(f"{name:14s} {r['mb_s']:8.2f} {r['matches_s']:11.0f} {r['precision']:10.3f} {r['recall']:8.3f}")
+    if args.save:
+        with open(args.baseline, 'w') as f:
+            json.dump({'corpus': info, 'results': results}, f, indent=2, sort_keys=True)
+        print(f"baseline saved to {args.baseline}")
+        return
+    if not os.path.exists(args.baseline):
+        print(f"no baseline at {args.baseline}; run with --save to record one")
+        return
+    with open(args.baseline) as f:
+        base = json.load(f)
+    if base.get('corpus', {}).get('lines') != info['lines'] or base['corpus'].get('density') != info['density']:
+        print("warning: the baseline was recorded with different corpus settings")
+    slow = []
+    for name, r in results.items():
+        old = base['results'].get(name)
+        if old and r['mb_s'] < old['mb_s'] * (1 - args.threshold):
+            slow.append(f"{name}: {r['mb_s']:.2f} MB/s vs {old['mb_s']:.2f} baseline ({r['mb_s'] / old['mb_s'] - 1:+.0%})")
+    if slow:
+        print("REGRESSION beyond {:.0%}:".format(args.threshold))
+        for line in slow:
+            print("  " + line)
+        sys.exit(1)
+    print(f"no slowdown beyond {args.threshold:.0%} against {args.baseline}")
+
+
+if __name__ == '__main__':
+    main()
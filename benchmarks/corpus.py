@@ -0,0 +1,123 @@
+"""Deterministic synthetic text with labelled PII, for the scanner benchmarks.
+
+    text, labels = generate_corpus(lines=20000, density={'email': 0.05}, seed=3)
+
+Every line is either bland filler or a template carrying exactly one item of one category;
+`density` is the fraction of lines per category (DEFAULT_DENSITY for the rest).  Labels
+are (category, start, end) spans into `text`, named like the scanner's categories, so a
+labelled item is what the detector is expected to report (for keyword lines, the line).
+Values are valid where the scanner checks them: Luhn cards, Verhoeff Aadhaar numbers,
+mod-97 IBANs.
+"""
+import base64
+import json
+import random
+
+from app.redact import iban_check, luhn_check, verhoeff_check
+
+DEFAULT_DENSITY = {
+    'email': 0.03,
+    'credit_card': 0.03,
+    'aadhaar': 0.02,
+    'iban': 0.02,
+    'jwt': 0.01,
+    'routing': 0.02,
+    'otp': 0.02,
+    'health_info': 0.02,
+}
+
+# filler vocabulary: no context tokens, keywords or digits, so filler should match nothing
+_FILLER = (
+    'the quarterly summary lists every transfer made during the period and the closing balance '
+    'of each ledger please review the items below and let us know about anything unexpected '
+    'our branch hours change next month while the online service stays available for all '
+    'customers who would like to check recent activity or download older statements'
+).split()
+
+_NAMES = ['jane.roe', 'j.smith', 'anita_k', 'm.oconnor+billing', 'li.wei', 'ops-team', 'r.garcia']
+_DOMAINS = ['example.com', 'mail.example.org', 'corp.example.net']
+_HEALTH = ['patient', 'diagnosis', 'prescription', 'medical record', 'lab result']
+
+
+def _luhn_card(rnd) -> str:
+    body = rnd.choice('45') + ''.join(rnd.choice('0123456789') for _ in range(14))
+    digits = next(body + d for d in '0123456789' if luhn_check(body + d))
+    return ' '.join(digits[i:i + 4] for i in range(0, 16, 4))
+
+
+def _aadhaar(rnd) -> str:
+    body = rnd.choice('23456789') + ''.join(rnd.choice('0123456789') for _ in range(10))
+    digits = next(body + d for d in '0123456789' if verhoeff_check(body + d))
+    return ' '.join(digits[i:i + 4] for i in range(0, 12, 4))
+
+
+def _iban(rnd) -> str:
+    bban = ''.join(rnd.choice('0123456789') for _ in range(18))
+    return next(s for s in (f"DE{cc:02d}{bban}" for cc in range(2, 100)) if iban_check(s))
+
+
+def _b64(raw: bytes) -> str:
+    return base64.urlsafe_b64encode(raw).rstrip(b'=').decode('ascii')
+
+
+def _jwt(rnd) -> str:
+    header = _b64(json.dumps({'alg': 'HS256', 'typ': 'JWT'}).encode())
+    payload = _b64(json.dumps({'sub': str(rnd.randint(10 ** 5, 10 ** 6)), 'iat': rnd.randint(10 ** 9, 2 * 10 ** 9)}).encode())
+    return f"{header}.{payload}.{_b64(rnd.randbytes(32))}"
+
+
+# category -> (template with {v} for the value, value generator); None: the whole line is the item
+_TEMPLATES = {
+    'email': ("Questions about this letter can go to {v} at any time.",
+              lambda r: f"{r.choice(_NAMES)}@{r.choice(_DOMAINS)}"),
+    'credit_card': ("Charged to card {v} on the date shown.", _luhn_card),
+    'aadhaar': ("Aadhaar {v} was linked to the profile.", _aadhaar),
+    'iban': ("Funds will be sent to {v} after review.", _iban),
+    'jwt': ("Session header Bearer {v} was rejected.", _jwt),
+    'routing': ("Routing number {v} applies to wires.", lambda r: str(r.randint(10 ** 8, 10 ** 9 - 1))),
+    'otp': ("Your verification code is {v}", lambda r: str(r.randint(10 ** 5, 10 ** 6 - 1))),
+    'health_info': ("Attached {v} summary from the clinic visit.", lambda r: r.choice(_HEALTH)),
+}
+CORPUS_CATEGORIES = tuple(_TEMPLATES)
+
+
+def _filler(rnd) -> str:
+    words = [rnd.choice(_FILLER) for _ in range(rnd.randint(6, 16))]
+    return ' '.join(words).capitalize() + '.'
+
+
+def generate_corpus(lines: int = 20000, density: dict = None, seed: int = 3):
+    """Return (text, labels) for `lines` lines of synthetic text (see the module docstring)."""
+    rates = dict(DEFAULT_DENSITY, **(density or {}))
+    unknown = set(rates) - set(_TEMPLATES)
+    if unknown:
+        raise ValueError(f"no generator for categories: {', '.join(sorted(unknown))}")
+    if sum(rates.values()) > 1:
+        raise ValueError("densities add up to more than one item per line")
+    rnd = random.Random(seed)
+    cats = list(rates)
+    cum = []
+    acc = 0.0
+    for c in cats:
+        acc += rates[c]
+        cum.append(acc)
+    out = []
+    labels = []
+    pos = 0
+    for _ in range(lines):
+        x = rnd.random()
+        cat = next((c for c, edge in zip(cats, cum) if x < edge), None)
+        if cat is None:
+            line = _filler(rnd)
+        else:
+            template, make = _TEMPLATES[cat]
+            value = make(rnd)
+            line = template.format(v=value)
+            if cat == 'health_info':
+                labels.append((cat, pos, pos + len(line)))
+            else:
+                start = pos + line.index(value)
+                labels.append((cat, start, start + len(value)))
+        out.append(line)
+        pos += len(line) + 1
+    return '\n'.join(out), labels
@@ -0,0 +1,280 @@
+"""Frozen copy of the original per-pattern scanner, used as the reference by the benchmarks.
+
+Every pattern is run as its own finditer pass, exactly as scan_text_for_sensitive_data did
+before the compiled engine; the patterns and checksum functions are copied too, so later
+changes to app.redact do not move the reference.  Keep this file unchanged so speedups stay
+comparable.
+"""
+import re
+
+# patterns and checksums as they were in app/redact.py
+EMAIL_RE = re.compile(r"[a-zA-Z0-9_.+-]+@[a-zA-Z0-9-]+\.[a-zA-Z0-9-.]+")
+PHONE_RE = re.compile(r"\+?\d[\d\s\-\(\)]{6,}\d")
+# E.164-like generic phone pattern (validate with context unless leading +)
+E164_RE = re.compile(r"\+?[1-9]\d{6,14}\b")
+# account numeric-only (8-16 digits) and generic allowing separators
+ACC_RE = re.compile(r"\b\d{8,16}\b")
+ACC_GENERIC_RE = re.compile(r"\b(?:\d[ \-]?){8,16}\b")
+# sequences of 7+ digits (catch common phone formats without punctuation)
+DIGITSEQ_RE = re.compile(r"\b\d{7,}\b")
+
+# Additional detection rules
+CARD_RE = re.compile(r"\b(?:\d[ -]*?){13,19}\b")
+IBAN_RE = re.compile(r"\b[A-Z]{2}\d{2}[A-Z0-9]{4,30}\b")
+SWIFT_RE = re.compile(r"\b[A-Z]{6}[A-Z0-9]{2}(?:[A-Z0-9]{3})?\b")
+API_KEY_RE = re.compile(r"\b(?:AKIA[0-9A-Z]{16}|[A-Za-z0-9_\-]{32,64})\b")
+
+# Routing / bank-specific patterns
+ROUTING_RE = re.compile(r"\b\d{9}\b")
+SORTCODE_RE = re.compile(r"\b\d{2}[- ]?\d{2}[- ]?\d{2}\b")
+
+# More sensitive patterns
+SSN_RE = re.compile(r"\b\d{3}-\d{2}-\d{4}\b")
+SSN_RE2 = re.compile(r"\b\d{9}\b")
+PAN_RE = re.compile(r"\b[A-Z]{5}\d{4}[A-Z]\b")
+AADHAAR_RE = re.compile(r"\b\d{4}[\s-]?\d{4}[\s-]?\d{4}\b")
+IFSC_RE = re.compile(r"\b[A-Z]{4}0[A-Z0-9]{6}\b", re.IGNORECASE)
+MASKED_CARD_RE = re.compile(r"(?:\*{4}[ \-]?){1,3}\d{4}")
+CVV_RE = re.compile(r"\b\d{3,4}\b")
+PIN_RE = re.compile(r"\b\d{4,6}\b")
+JWT_RE = re.compile(r"\beyJ[A-Za-z0-9_\-]+\.[A-Za-z0-9_\-]+\.[A-Za-z0-9_\-]+\b")
+
+# OTP / 2FA codes (detect with context)
+OTP_RE = re.compile(r"\b\d{4,8}\b")
+
+# Biometric heuristics (keywords)
+BIOMETRIC_KEYWORDS = ['fingerprint', 'retina', 'iris', 'voice', 'dna', 'facial', 'face recognition', 'biometric']
+
+
+def _shannon_entropy(s: str) -> float:
+    # simple entropy estimator for strings
+    from math import log2
+    if not s:
+        return 0.0
+    probs = [float(s.count(c)) / len(s) for c in set(s)]
+    return -sum(p * log2(p) for p in probs)
+
+
+def _digits_only(s: str) -> str:
+    return re.sub(r"\D", "", s)
+
+
+def luhn_check(num: str) -> bool:
+    s = _digits_only(num)
+    if len(s) < 13 or len(s) > 19:
+        return False
+    total = 0
+    alt = False
+    for ch in s[::-1]:
+        d = ord(ch) - 48
+        if alt:
+            d = d * 2
+            if d > 9:
+                d -= 9
+        total += d
+        alt = not alt
+    return (total % 10) == 0
+
+
+def iban_check(iban: str) -> bool:
+    try:
+        s = iban.replace(' ', '').upper()
+        if len(s) < 5:
+            return False
+        # move first four chars to end
+        rearr = s[4:] + s[:4]
+        # convert letters to numbers A=10 ... Z=35
+        conv = ''
+        for ch in rearr:
+            if ch.isalpha():
+                conv += str(ord(ch) - 55)
+            else:
+                conv += ch
+        # perform mod 97 (do in chunks)
+        remainder = 0
+        for i in range(0, len(conv), 9):
+            part = str(remainder) + conv[i:i+9]
+            remainder = int(part) % 97
+        return remainder == 1
+    except Exception:
+        return False
+
+
+def verhoeff_check(num: str) -> bool:
+    """Validate a numeric string using the Verhoeff algorithm (used for Aadhaar)."""
+    try:
+        s = _digits_only(num)
+        if not s or not s.isdigit():
+            return False
+        # multiplication table d
+        d_table = [
+            [0,1,2,3,4,5,6,7,8,9],
+            [1,2,3,4,0,6,7,8,9,5],
+            [2,3,4,0,1,7,8,9,5,6],
+            [3,4,0,1,2,8,9,5,6,7],
+            [4,0,1,2,3,9,5,6,7,8],
+            [5,9,8,7,6,0,4,3,2,1],
+            [6,5,9,8,7,1,0,4,3,2],
+            [7,6,5,9,8,2,1,0,4,3],
+            [8,7,6,5,9,3,2,1,0,4],
+            [9,8,7,6,5,4,3,2,1,0]
+        ]
+        # permutation table p
+        p_table = [
+            [0,1,2,3,4,5,6,7,8,9],
+            [1,5,7,6,2,8,3,0,9,4],
+            [5,8,0,3,7,9,6,1,4,2],
+            [8,9,1,6,0,4,3,5,2,7],
+            [9,4,5,3,1,2,6,8,7,0],
+            [4,2,8,6,5,7,3,9,0,1],
+            [2,7,9,3,8,0,6,4,1,5],
+            [7,0,4,6,9,1,3,2,5,8]
+        ]
+        # inverse table
+        inv = [0,4,3,2,1,5,6,7,8,9]
+        c = 0
+        # process digits from right to left
+        for i, ch in enumerate(reversed(s)):
+            c = d_table[c][p_table[i % 8][int(ch)]]
+        return c == 0
+    except Exception:
+        return False
+
+
+_CONTEXT_TOKENS = {
+    'account': ['account', 'acct', 'iban', 'routing', 'bank', 'acct no', 'account no', 'accno'],
+    'otp': ['otp', 'one-time', '2fa', 'two-factor', 'verification', 'code'],
+    'routing': ['routing', 'aba', 'routing number', 'sort code'],
+    'phone': ['phone', 'tel', 'mobile', 'msisdn', 'contact'],
+}
+
+
+def _has_context(text: str, start: int, end: int, tokens: list, window: int = 80) -> bool:
+    lo = max(0, start - window)
+    hi = min(len(text), end + window)
+    ctx = text[lo:hi].lower()
+    for t in tokens:
+        if t in ctx:
+            return True
+    return False
+
+
+def legacy_scan_text_for_sensitive_data(text: str, require_context_for=('acc',)) -> list:
+    """Return list of matches: {'category','match','start','end'}"""
+    out = []
+    if not text:
+        return out
+    # emails
+    for m in EMAIL_RE.finditer(text):
+        out.append({'category': 'email', 'match': m.group(0), 'start': m.start(), 'end': m.end()})
+    # phones
+    for m in PHONE_RE.finditer(text):
+        # include obvious phone matches (contain separators or leading +) or require context
+        s = m.group(0)
+        if s.strip().startswith('+') or _has_context(text, m.start(), m.end(), _CONTEXT_TOKENS.get('phone', []), window=40):
+            out.append({'category': 'phone', 'match': s, 'start': m.start(), 'end': m.end()})
+    # also catch E.164-like sequences but require context unless a + is present
+    for m in E164_RE.finditer(text):
+        s = m.group(0)
+        if s.startswith('+') or _has_context(text, m.start(), m.end(), _CONTEXT_TOKENS.get('phone', []), window=40):
+            out.append({'category': 'phone', 'match': s, 'start': m.start(), 'end': m.end()})
+    # IBAN
+    for m in IBAN_RE.finditer(text):
+        if iban_check(m.group(0)):
+            out.append({'category': 'iban', 'match': m.group(0), 'start': m.start(), 'end': m.end()})
+    # credit cards (use Luhn)
+    for m in CARD_RE.finditer(text):
+        candidate = _digits_only(m.group(0))
+        if luhn_check(candidate):
+            out.append({'category': 'credit_card', 'match': m.group(0), 'start': m.start(), 'end': m.end()})
+    # SSN (US) patterns
+    for m in SSN_RE.finditer(text):
+        out.append({'category': 'ssn', 'match': m.group(0), 'start': m.start(), 'end': m.end()})
+    for m in SSN_RE2.finditer(text):
+        # numeric-only 9-digit could be SSN but check context
+        if _has_context(text, m.start(), m.end(), ['ssn', 'social security', 'ssn:'], window=50):
+            out.append({'category': 'ssn', 'match': m.group(0), 'start': m.start(), 'end': m.end()})
+    # PAN (India)
+    for m in PAN_RE.finditer(text):
+        out.append({'category': 'pan', 'match': m.group(0), 'start': m.start(), 'end': m.end()})
+    # Aadhaar (India) 12-digit - validate with Verhoeff checksum when possible
+    for m in AADHAAR_RE.finditer(text):
+        digits = _digits_only(m.group(0))
+        if verhoeff_check(digits):
+            out.append({'category': 'aadhaar', 'match': m.group(0), 'start': m.start(), 'end': m.end()})
+    # CVV / PIN: only include when context nearby mentions cvv/pin/cvc
+    for m in CVV_RE.finditer(text):
+        if _has_context(text, m.start(), m.end(), ['cvv', 'cvc', 'security code', 'cvv:'], window=20):
+            out.append({'category': 'cvv', 'match': m.group(0), 'start': m.start(), 'end': m.end()})
+    for m in PIN_RE.finditer(text):
+        if _has_context(text, m.start(), m.end(), ['pin', 'passcode', 'pin:'], window=20):
+            out.append({'category': 'pin', 'match': m.group(0), 'start': m.start(), 'end': m.end()})
+    # masked card numbers like **** **** **** 1234
+    for m in MASKED_CARD_RE.finditer(text):
+        out.append({'category': 'credit_card_masked', 'match': m.group(0), 'start': m.start(), 'end': m.end()})
+    # JWT-like tokens and high-entropy strings (credentials/secrets)
+    for m in JWT_RE.finditer(text):
+        out.append({'category': 'jwt', 'match': m.group(0), 'start': m.start(), 'end': m.end()})
+    for m in API_KEY_RE.finditer(text):
+        tok = m.group(0)
+        if len(tok) >= 20 or _shannon_entropy(tok) > 4.0:
+            out.append({'category': 'api_key', 'match': tok, 'start': m.start(), 'end': m.end()})
+    # Credentials: look for password patterns like 'password: xyz' or 'pwd='
+    for m in re.finditer(r"(?:password|pwd|pass|secret)\s*[:=]\s*(\S{4,})", text, re.IGNORECASE):
+        out.append({'category': 'credential', 'match': m.group(1), 'start': m.start(1), 'end': m.end(1)})
+    # Health / PHI heuristics: keyword detection
+    health_keywords = ['medical', 'patient', 'diagnosis', 'prescription', 'mrn', 'medical record', 'lab result']
+    for hk in health_keywords:
+        for m in re.finditer(re.escape(hk), text, re.IGNORECASE):
+            # include surrounding line
+            lo = max(0, text.rfind('\n', 0, m.start()))
+            hi = text.find('\n', m.end())
+            if hi == -1: hi = min(len(text), m.end() + 120)
+            snippet = text[lo:hi].strip()
+            out.append({'category': 'health_info', 'match': snippet, 'start': lo, 'end': hi})
+    # account-like numbers (require nearby context to reduce false positives)
+    for pat in (ACC_RE, ACC_GENERIC_RE):
+        for m in pat.finditer(text):
+            if _has_context(text, m.start(), m.end(), _CONTEXT_TOKENS.get('account', []), window=60):
+                out.append({'category': 'account', 'match': m.group(0), 'start': m.start(), 'end': m.end()})
+    # routing numbers (9-digit) - require context
+    for m in ROUTING_RE.finditer(text):
+        if _has_context(text, m.start(), m.end(), _CONTEXT_TOKENS.get('routing', []), window=60):
+            out.append({'category': 'routing', 'match': m.group(0), 'start': m.start(), 'end': m.end()})
+    # sort codes (UK) - require context
+    for m in SORTCODE_RE.finditer(text):
+        if _has_context(text, m.start(), m.end(), _CONTEXT_TOKENS.get('routing', []), window=60):
+            out.append({'category': 'sort_code', 'match': m.group(0), 'start': m.start(), 'end': m.end()})
+    # generic digit sequences (long) - include only with context
+    for m in DIGITSEQ_RE.finditer(text):
+        if _has_context(text, m.start(), m.end(), _CONTEXT_TOKENS.get('account', []), window=60):
+            out.append({'category': 'digit_sequence', 'match': m.group(0), 'start': m.start(), 'end': m.end()})
+    # API keys / high-entropy tokens (simple heuristic)
+    for m in API_KEY_RE.finditer(text):
+        tok = m.group(0)
+        if len(tok) >= 20:
+            out.append({'category': 'api_key', 'match': tok, 'start': m.start(), 'end': m.end()})
+    # OTP / two-factor codes: only include when nearby context suggests OTP/2FA
+    for m in OTP_RE.finditer(text):
+        if _has_context(text, m.start(), m.end(), _CONTEXT_TOKENS.get('otp', []), window=30):
+            out.append({'category': 'otp', 'match': m.group(0), 'start': m.start(), 'end': m.end()})
+    # SWIFT/BIC
+    for m in SWIFT_RE.finditer(text):
+        out.append({'category': 'swift', 'match': m.group(0), 'start': m.start(), 'end': m.end()})
+    # IFSC / bank codes (India)
+    for m in IFSC_RE.finditer(text):
+        out.append({'category': 'ifsc', 'match': m.group(0), 'start': m.start(), 'end': m.end()})
+    # biometric / passport / driver's license heuristics
+    for kw in BIOMETRIC_KEYWORDS:
+        for m in re.finditer(re.escape(kw), text, re.IGNORECASE):
+            lo = max(0, text.rfind('\n', 0, m.start()))
+            hi = text.find('\n', m.end())
+            if hi == -1: hi = min(len(text), m.end() + 120)
+            snippet = text[lo:hi].strip()
+            out.append({'category': 'biometric', 'match': snippet, 'start': lo, 'end': hi})
+    # passports / driver's license: look for nearby keywords and an alnum token
+    for m in re.finditer(r"passport\s*[:#\-]?\s*([A-Z0-9\-]{6,9})", text, re.IGNORECASE):
+        out.append({'category': 'passport', 'match': m.group(1), 'start': m.start(1), 'end': m.end(1)})
+    for m in re.finditer(r"driver(?:'s)?\s+licen[cs]e\s*[:#\-]?\s*([A-Z0-9\-]{5,12})", text, re.IGNORECASE):
+        out.append({'category': 'driver_license', 'match': m.group(1), 'start': m.start(1), 'end': m.end(1)})
+    return out
@@ -0,0 +1,91 @@
+import requests
+import os
+
+def test_detect_selected_categories(base_url):
+    path = "test_data/sample_sensitive.pdf"
+    assert os.path.exists(path)
+
+    with open(path, "rb") as f:
+        r = requests.post(
+            f"{base_url}/detect",
+            files={"file": f},
+            data={"categories": '["email"]'}
+        )
+
+    assert r.status_code == 200
+    cats = {m["category"] for pg in r.json() for m in pg["matches"]}
+    assert cats <= {"email"}
+    print("DETECT TEST: only selected categories reported")
+
+
+def test_detect_unknown_profile(base_url):
+    path = "test_data/sample_sensitive.pdf"
+    with open(path, "rb") as f:
+        r = requests.post(
+            f"{base_url}/detect",
+            files={"file": f},
+            data={"profile": "no-such-profile"}
+        )
+
+    assert r.status_code == 400
+    print("DETECT TEST: unknown profile rejected")
+
+
+def test_detect_text_stream(base_url):
+    text = ("filler line without anything interesting\n" * 5000) + "contact: jane.roe@example.com\n"
+    r = requests.post(
+        f"{base_url}/detect",
+        files={"file": ("export.txt", text.encode("utf-8"))}
+    )
+
+    assert r.status_code == 200
+    emails = [m for m in r.json()["matches"] if m["category"] == "email"]
+    assert emails and text[emails[0]["start"]:emails[0]["end"]] == "jane.roe@example.com"
+    print("DETECT TEST: text export scanned as a stream")
+
+
+def test_detect_budget_incomplete(base_url):
+    text = "contact: jane.roe@example.com\n" * 100
+    r = requests.post(
+        f"{base_url}/detect",
+        files={"file": ("export.txt", text.encode("utf-8"))},
+        data={"budget": "0"}
+    )
+
+    assert r.status_code == 200
+    assert r.headers.get("X-Scan-Incomplete") == "true"
+    assert r.json()["incomplete"] is True
+    print("DETECT TEST: spent budget flags the result incomplete")
+
+
+def test_auto_redaction_refuses_spent_budget(base_url):
+    # a partially scanned document must not come back as a "redacted" file
+    path = "test_data/sample_sensitive.pdf"
+    with open(path, "rb") as f:
+        r = requests.post(
+            f"{base_url}/redact/auto",
+            files={"file": f},
+            data={"budget": "0"}
+        )
+
+    assert r.status_code == 422
+    assert r.headers.get("X-Scan-Incomplete") == "true"
+    assert r.json()["incomplete"] is True
+    print("DETECT TEST: auto redaction with a spent budget is an error")
+
+
+def test_detect_page_ranges(base_url):
+    path = "test_data/sample_sensitive.pdf"
+    with open(path, "rb") as f:
+        data = f.read()
+
+    full = requests.post(f"{base_url}/detect", files={"file": ("s.pdf", data)})
+    first = requests.post(f"{base_url}/detect", files={"file": ("s.pdf", data)}, data={"pages": "0"})
+    beyond = requests.post(f"{base_url}/detect", files={"file": ("s.pdf", data)}, data={"pages": "1-"})
+    bad = requests.post(f"{base_url}/detect", files={"file": ("s.pdf", data)}, data={"pages": "two"})
+
+    assert full.status_code == first.status_code == beyond.status_code == 200
+    assert first.json() == full.json() and full.json()
+    assert beyond.json() == []
+    assert bad.status_code == 400
+    print("DETECT TEST: only the selected pages are scanned")
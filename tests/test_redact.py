@@ -1,5 +1,6 @@
 import requests
 import os
+import json
 
 def test_pdf_redaction(base_url):
     file_path = "test_data/sample_sensitive.pdf"
@@ -30,3 +31,121 @@ def test_docx_redaction(base_url):
 
     assert response.status_code == 200
     print("DOCX redaction test PASSED")
+
+
+def test_pdf_preview_geometry(base_url):
+    file_path = "test_data/sample_sensitive.pdf"
+    assert os.path.exists(file_path)
+
+    with open(file_path, "rb") as f:
+        response = requests.post(f"{base_url}/preview/pdf/geometry", files={"file": f})
+
+    assert response.status_code == 200
+    geo = response.json()
+    assert geo["zoom"] == 2.0 and geo["pages"]
+    assert geo["pages"][0]["offset"] == 0
+    assert geo["pixel_height"] == sum(p["pixel_height"] for p in geo["pages"])
+    print("PDF geometry manifest test PASSED")
+
+
+def test_pdf_redaction_save_modes(base_url):
+    file_path = "test_data/sample_sensitive.pdf"
+    assert os.path.exists(file_path)
+    with open(file_path, "rb") as f:
+        original = f.read()
+
+    sizes = {}
+    for mode in ("full", "compact"):
+        response = requests.post(
+            f"{base_url}/redact/pdf",
+            files={"file": ("sample_sensitive.pdf", original)},
+            data={"phrases": '["ravi.kumar92@example.com"]', "save_mode": mode}
+        )
+        assert response.status_code == 200
+        assert response.headers.get("X-Redacted") == "true"
+        assert response.content.startswith(b"%PDF")
+        sizes[mode] = len(response.content)
+    assert sizes["compact"] <= sizes["full"]
+
+    # an incremental save would keep the unredacted original in the file
+    response = requests.post(
+        f"{base_url}/redact/pdf",
+        files={"file": ("sample_sensitive.pdf", original)},
+        data={"phrases": '["ravi.kumar92@example.com"]', "save_mode": "incremental"}
+    )
+    assert response.status_code == 400
+
+    response = requests.post(f"{base_url}/redact/pdf", files={"file": ("x.pdf", original)}, data={"save_mode": "zip"})
+    assert response.status_code == 400
+    print("PDF save modes test PASSED")
+
+
+def test_pdf_paged_preview(base_url):
+    file_path = "test_data/sample_sensitive.pdf"
+    assert os.path.exists(file_path)
+
+    with open(file_path, "rb") as f:
+        response = requests.post(f"{base_url}/preview/pdf/pages", files={"file": f})
+    assert response.status_code == 200
+    info = response.json()
+    assert info["page_count"] == len(info["pages"]) > 0
+
+    page = requests.get(f"{base_url}/preview/pdf/{info['doc']}/pages/0")
+    assert page.status_code == 200
+    assert page.headers["content-type"] == "image/png"
+    assert page.content.startswith(b"\x89PNG")
+    thumb = requests.get(f"{base_url}/preview/pdf/{info['doc']}/thumbs/0", params={"format": "webp"})
+    assert thumb.status_code == 200
+    assert thumb.content[8:12] == b"WEBP"
+    assert len(thumb.content) < len(page.content)
+
+    assert requests.get(f"{base_url}/preview/pdf/{info['doc']}/pages/{info['page_count']}").status_code == 404
+    assert requests.get(f"{base_url}/preview/pdf/{'0' * 64}/pages/0").status_code == 404
+    print("PDF paged preview test PASSED")
+
+
+def test_auto_redaction_keeps_ids_inside_health_lines(base_url):
+    # a whole-line health snippet must not swallow the email and passport inside it
+    import io
+    from docx import Document
+    from openpyxl import Workbook, load_workbook
+
+    line = "Patient john@x.com passport: K1234567"
+    doc = Document()
+    doc.add_paragraph(line)
+    buf = io.BytesIO()
+    doc.save(buf)
+    response = requests.post(f"{base_url}/redact/auto", files={"file": ("mixed.docx", buf.getvalue())})
+    assert response.status_code == 200
+    text = Document(io.BytesIO(response.content)).paragraphs[0].text
+    assert "K1234567" not in text and "john@" not in text
+
+    wb = Workbook()
+    wb.active["A1"] = line
+    buf = io.BytesIO()
+    wb.save(buf)
+    response = requests.post(f"{base_url}/redact/auto", files={"file": ("mixed.xlsx", buf.getvalue())})
+    assert response.status_code == 200
+    value = load_workbook(io.BytesIO(response.content)).active["A1"].value
+    assert "K1234567" not in value and "john@" not in value
+
+
+def test_pdf_drawn_region_applied_as_drawn(base_url):
+    # a short hand-drawn box is blacked out in full, not trimmed like located text lines
+    import fitz
+
+    doc = fitz.open()
+    page = doc.new_page()
+    page.insert_text((72, 100), "Signature: Ravi Kumar", fontsize=14)
+    original = doc.tobytes()
+    rect = [70, 84, 260, 104]
+    response = requests.post(
+        f"{base_url}/redact/pdf",
+        files={"file": ("drawn.pdf", original)},
+        data={"regions": json.dumps([{"page": 0, "rect": rect}])}
+    )
+    assert response.status_code == 200
+    assert response.headers.get("X-Redacted") == "true"
+    out = fitz.open(stream=response.content, filetype="pdf")
+    pix = out[0].get_pixmap(clip=fitz.Rect(rect[0] + 1, rect[1] + 0.5, rect[2] - 1, rect[3] - 0.5), alpha=False)
+    assert max(pix.samples) < 40
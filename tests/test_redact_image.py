@@ -14,3 +14,95 @@ def test_image_redaction(base_url):
 
     assert response.status_code == 200
     print("Image redaction test PASSED")
+
+
+def test_image_format_kept_and_metadata_stripped(base_url):
+    import io
+    from PIL import Image
+
+    img = Image.new("RGB", (64, 32), (200, 200, 200))
+    exif = img.getexif()
+    exif[0x0112] = 6                     # orientation: rotate 90 clockwise to display
+    exif[0x8825] = {2: (52.0, 31.0, 0.0)}  # GPS latitude
+    buf = io.BytesIO()
+    img.save(buf, "JPEG", exif=exif)
+
+    r = requests.post(
+        f"{base_url}/redact/image",
+        files={"file": ("photo.jpg", buf.getvalue(), "image/jpeg")},
+        data={"regions": "[[0, 0, 8, 8]]"}
+    )
+    assert r.status_code == 200
+    assert r.headers["content-type"] == "image/jpeg"
+    out = Image.open(io.BytesIO(r.content))
+    assert out.format == "JPEG" and not out.getexif()
+    # orientation applied to the pixels, so it still shows upright without the tag
+    assert out.size == (32, 64)
+    assert max(out.getpixel((2, 2))) < 40
+
+    r = requests.post(
+        f"{base_url}/redact/image",
+        files={"file": ("photo.jpg", buf.getvalue(), "image/jpeg")},
+        data={"format": "webp"}
+    )
+    assert r.status_code == 200
+    assert r.headers["content-type"] == "image/webp"
+    assert 'filename="redacted-photo.webp"' in r.headers["content-disposition"]
+    print("Image format and metadata test PASSED")
+
+
+def test_image_fast_modes_cover_overlapping_regions(base_url):
+    import io
+    from PIL import Image
+
+    img = Image.new("RGB", (120, 60), (255, 255, 255))
+    for x in range(0, 120, 2):
+        for y in range(10, 30):
+            img.putpixel((x, y), (0, 0, 0))
+    buf = io.BytesIO()
+    img.save(buf, "PNG")
+    # overlapping boxes, as repeated OCR hits come in
+    regions = "[[0, 10, 60, 20], [40, 10, 60, 20], [50, 12, 10, 10]]"
+
+    for mode in ("boxblur", "pixelate", "blackout"):
+        r = requests.post(
+            f"{base_url}/redact/image",
+            files={"file": ("stripes.png", buf.getvalue(), "image/png")},
+            data={"regions": regions, "mode": mode}
+        )
+        assert r.status_code == 200
+        out = Image.open(io.BytesIO(r.content)).convert("L")
+        row = [out.getpixel((x, 20)) for x in range(0, 100)]
+        # the 1-pixel stripes are gone everywhere under the boxes
+        assert max(abs(a - b) for a, b in zip(row, row[1:])) < 60, mode
+        assert out.getpixel((110, 20)) != out.getpixel((111, 20))
+    print("Image fast modes test PASSED")
+
+
+def test_ocr_preprocess_keeps_tightly_cropped_lines():
+    # a banner whose text fills the height must still reach OCR, and its boxes map back onto it
+    import numpy as np
+    from PIL import Image, ImageDraw, ImageFont
+    from app import redact
+
+    for h, w in ((60, 700), (200, 1600)):
+        img = Image.new("L", (w, h), 255)
+        draw = ImageDraw.Draw(img)
+        try:
+            font = ImageFont.truetype("DejaVuSans.ttf", int(h * 0.7))
+        except Exception:
+            font = ImageFont.load_default()
+        draw.text((5, 2), "4111 1111 1111 1111", fill=0, font=font)
+        arr = np.asarray(img)
+        parts = redact.prepare_ocr_image(arr)
+        assert parts
+        ys, xs = np.nonzero(arr < 128)
+        covered = np.zeros(arr.shape, dtype=bool)
+        for crop, back in parts:
+            word = {"text": "x", "x": 0, "y": 0, "w": crop.shape[1], "h": crop.shape[0]}
+            box = word if back is None else redact._map_words([word], back, w, h)[0]
+            covered[box["y"]:box["y"] + box["h"], box["x"]:box["x"] + box["w"]] = True
+        assert covered[ys, xs].all()
+
+    blank = np.full((400, 400), 255, dtype=np.uint8)
+    assert [back for _, back in redact.prepare_ocr_image(blank)] == [None]
@@ -0,0 +1,33 @@
+"""Compile a deny/allow list (one entry per line) into a memory-mappable dictionary file.
+
+Usage:  python tools/compile_dictionary.py customers.txt $REDACT_DICTIONARY_DIR/customers.rdict
+        python tools/compile_dictionary.py --allow our_codes.txt $REDACT_DICTIONARY_DIR/allow.rdict
+
+The server picks new or replaced *.rdict files up within REDACT_DICTIONARY_CHECK_SECONDS,
+or at once after POST /dictionaries/reload.
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.redact import compile_dictionary  # noqa: E402
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument('source', help='text file, one entry per line')
+    ap.add_argument('output', help='compiled .rdict file')
+    ap.add_argument('--allow', action='store_true', help='compile an allowlist (default: denylist)')
+    args = ap.parse_args()
+    t0 = time.perf_counter()
+    with open(args.source, encoding='utf-8') as fh:
+        n = compile_dictionary((line.strip() for line in fh if line.strip()), args.output,
+                               mode='allow' if args.allow else 'deny')
+    print(f"{args.output}: {n} keys, {os.path.getsize(args.output) / 1e6:.1f} MB, {time.perf_counter() - t0:.1f} s")
+
+
+if __name__ == '__main__':
+    main()